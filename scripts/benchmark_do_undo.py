@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of do_move/undo_move throughput against the number of appointments sharing a timeslot.
+Stacks k single-timeslot meetings in day 1, timeslot 1 and moves one of them to timeslot 2 and back. Compares the
+O(1) removal through the appointment's slot_index with the linear identity scan used when the index is unknown.
+"""
+
+import sys
+import time
+
+sys.path.append('.')
+from src.base_model.attribute_enum import Attribute
+from src.base_model.case import Case
+from src.base_model.judge import Judge
+from src.base_model.room import Room
+from src.base_model.meeting import Meeting
+from src.base_model.appointment import Appointment
+from src.base_model.schedule import Schedule
+from src.local_search.move import Move, do_move, undo_move
+
+
+def build_stacked_schedule(occupancy: int, granularity: int = 5) -> Schedule:
+    """A schedule with occupancy appointments in day 1, timeslot 1, each with its own meeting, judge and room."""
+    cases, meetings, judges, rooms = [], [], [], []
+    schedule = Schedule(work_days=1, granularity=granularity)
+    for i in range(1, occupancy + 1):
+        case = Case(case_id=i, characteristics={Attribute.CIVIL})
+        meeting = Meeting(i, granularity, 0, None, None, case)
+        case.meetings = [meeting]
+        judge = Judge(judge_id=i, characteristics={Attribute.CIVIL})
+        room = Room(room_id=i, characteristics=set())
+        cases.append(case); meetings.append(meeting); judges.append(judge); rooms.append(room)
+        schedule.add_meeting_to_schedule(Appointment(meeting, judge, room, 1, 1))
+    schedule.all_cases, schedule.all_meetings, schedule.all_judges, schedule.all_rooms = cases, meetings, judges, rooms
+    schedule.initialize_appointment_chains()
+    return schedule
+
+
+def moves_per_second(occupancy: int, use_slot_index: bool, repetitions: int = 2000) -> float:
+    """do_move + undo_move pairs per second, moving the appointment in the middle of the stacked slot."""
+    schedule = build_stacked_schedule(occupancy)
+    app = schedule.appointments_by_day_and_timeslot[1][1][occupancy // 2]
+    move = Move(app.meeting.meeting_id, [app], old_judge=app.judge, old_room=app.room, old_day=1, new_day=1,
+                old_start_timeslot=1, new_start_timeslot=2)
+
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        if not use_slot_index:
+            app.slot_index = -1 # forces the scan of the slot list
+        do_move(move, schedule)
+        undo_move(move, schedule)
+    return repetitions / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'occupancy':>10}{'slot index/s':>16}{'scan/s':>12}{'speedup':>10}")
+    for occupancy in (1, 10, 100, 1000, 5000):
+        indexed = moves_per_second(occupancy, use_slot_index=True)
+        scanned = moves_per_second(occupancy, use_slot_index=False)
+        print(f"{occupancy:>10}{indexed:>16.0f}{scanned:>12.0f}{indexed / scanned:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ from src.util.data_generator import generate_test_data_parsed
 from src.base_model.compatibility_checks import initialize_compatibility_matricies
 from src.construction.heuristic.linear_assignment import generate_schedule
 from src.local_search.simulated_annealing import run_local_search
-from src.local_search.rules_engine import calculate_full_score
+from src.local_search.vectorized_scoring import calculate_full_score_vectorized
 
 
 def calculate_days_for_cases(n_cases: int) -> int:
@@ -54,7 +54,7 @@ def run_single_test(n_cases: int) -> float:
         final_schedule = run_local_search(initial_schedule)  # 5 min timeout
         
         # Check if we eliminated hard constraints
-        result = calculate_full_score(final_schedule)
+        result = calculate_full_score_vectorized(final_schedule)
         hard_violations = result[1]
         
         end_time = time.time()
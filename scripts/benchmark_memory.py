@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the entity classes.
+Measures the bytes allocated per Appointment and per Move with tracemalloc, for the slotted classes and for
+subclasses that get a per-instance __dict__ again (the layout before the classes were slotted).
+"""
+
+import sys
+import time
+import tracemalloc
+
+sys.path.append('.')
+from src.util.data_generator import generate_test_data_parsed
+from src.base_model.compatibility_checks import initialize_compatibility_matricies
+from src.base_model.appointment import Appointment
+from src.construction.heuristic.linear_assignment import generate_schedule
+from src.local_search.move import Move
+
+
+class DictAppointment(Appointment):
+    """Appointment with a __dict__, for comparison."""
+
+
+class DictMove(Move):
+    """Move with a __dict__, for comparison."""
+
+
+def bytes_per_instance(factory, n: int) -> float:
+    """Average bytes allocated per object when creating n objects with factory(i)."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(objects) == n
+    return (after - before) / n
+
+
+def seconds_per_instance(factory, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        factory(i)
+    return (time.perf_counter() - start) / n
+
+
+def main(n_cases: int = 500):
+    parsed_data = generate_test_data_parsed(n_cases=n_cases, work_days=30, granularity=5, min_per_work_day=390)
+    initialize_compatibility_matricies(parsed_data)
+    schedule = generate_schedule(parsed_data)
+    appointments = schedule.get_all_appointments()
+    n = len(appointments)
+    print(f"{n_cases} cases, {n} appointments")
+
+    factories = {
+        "Appointment": lambda i: Appointment(appointments[i].meeting, appointments[i].judge, appointments[i].room, appointments[i].day, appointments[i].timeslot_in_day),
+        "Appointment (__dict__)": lambda i: DictAppointment(appointments[i].meeting, appointments[i].judge, appointments[i].room, appointments[i].day, appointments[i].timeslot_in_day),
+        "Move": lambda i: Move(appointments[i].meeting.meeting_id, appointments, new_day=i),
+        "Move (__dict__)": lambda i: DictMove(appointments[i].meeting.meeting_id, appointments, new_day=i),
+    }
+    print(f"{'class':<24}{'bytes/instance':>16}{'ns/instance':>14}")
+    for name, factory in factories.items():
+        print(f"{name:<24}{bytes_per_instance(factory, n):>16.1f}{seconds_per_instance(factory, n) * 1e9:>14.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
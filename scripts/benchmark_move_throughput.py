@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Throughput of the local search inner loop: generate a random single move, score it with calculate_delta_score, apply it
+and undo it again 70% of the time (roughly the rejection rate of simulated annealing). Index maintenance in
+do_move/undo_move is part of every step, so changes to the schedule indexes show up here.
+
+Usage: python scripts/benchmark_move_throughput.py [n_cases] [work_days] [seconds]
+"""
+
+import random
+import sys
+import time
+
+sys.path.append('.')
+from src.util.data_generator import generate_test_data_parsed
+from src.base_model.compatibility_checks import initialize_compatibility_matricies, calculate_compatible_judges, calculate_compatible_rooms
+from src.construction.heuristic.linear_assignment import generate_schedule
+from src.local_search.move import do_move, undo_move
+from src.local_search.move_generator import generate_single_random_move
+from src.local_search.rules_engine import calculate_full_score, calculate_delta_score, build_scoring_context
+
+
+def moves_per_second(n_cases: int, work_days: int, seconds: float, seed: int = 0) -> float:
+    random.seed(seed)
+    parsed_data = generate_test_data_parsed(n_cases=n_cases, work_days=work_days, granularity=5, min_per_work_day=390)
+    initialize_compatibility_matricies(parsed_data)
+    schedule = generate_schedule(parsed_data)
+    schedule.initialize_appointment_chains()
+    schedule.move_all_dayboundary_violations()
+    schedule.initialize_appointment_chains()
+    schedule.trim_schedule_length_if_possible()
+
+    meetings = schedule.get_all_planned_meetings()
+    compatible_judges = calculate_compatible_judges(meetings, schedule.get_all_judges())
+    compatible_rooms = calculate_compatible_rooms(meetings, schedule.get_all_rooms())
+    context = build_scoring_context(schedule)
+    calculate_full_score(schedule, running_totals=True, context=context)
+
+    moves = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        move = generate_single_random_move(schedule, compatible_judges, compatible_rooms, context=context)
+        calculate_delta_score(schedule, move, context=context)
+        do_move(move, schedule)
+        if random.random() < 0.7:
+            undo_move(move, schedule)
+        moves += 1
+    return moves / (time.perf_counter() - start)
+
+
+def main():
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    work_days = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    print(f"{n_cases} cases, {work_days} days: {moves_per_second(n_cases, work_days, seconds):.0f} moves/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ from src.util.data_generator import generate_test_data_parsed
 from src.base_model.compatibility_checks import initialize_compatibility_matricies
 from src.construction.heuristic.linear_assignment import generate_schedule
 from src.local_search.simulated_annealing import simulated_annealing
-from src.local_search.rules_engine import calculate_full_score
+from src.local_search.vectorized_scoring import calculate_full_score_vectorized
 
 OUTPUT_CSV = "local_search_runtime_log.csv"
 
@@ -49,7 +49,7 @@ def benchmark_local_search():
                 initial_schedule.initialize_appointment_chains()
                 
                 # Calculate initial score
-                initial_result = calculate_full_score(initial_schedule)
+                initial_result = calculate_full_score_vectorized(initial_schedule)
                 initial_hard = initial_result[1]
                 
                 # Run local search with unlimited time
@@ -1,11 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from src.base_model.case import Case
 from src.base_model.judge import Judge
 from src.base_model.room import Room
 from src.base_model.meeting import Meeting
 
-@dataclass
+@dataclass(slots=True)
 class Appointment:
     """Class representing a scheduled appointment"""
     meeting: Meeting
@@ -13,6 +13,7 @@ class Appointment:
     room: Room
     day: int # 1-indexed
     timeslot_in_day: int # 1-indexed
+    slot_index: int = field(default=-1, init=False, repr=False) # position in its appointments_by_day_and_timeslot list, kept by Schedule.append_to_slot/remove_from_slot
         
     def __str__(self):
         return (f"Appointment({self.meeting}, "
@@ -21,6 +22,8 @@ class Appointment:
                 f"D{self.day})")
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Appointment):
             return False
         
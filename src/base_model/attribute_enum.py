@@ -45,6 +45,14 @@ class Attribute(Enum):
         except KeyError:
             raise ValueError(f"No attribute found for: {attribute_string}")
         
+    @classmethod
+    def to_mask(cls, attributes) -> int:
+        """An attribute set as an int with one bit per attribute, so requirements.issubset(characteristics) becomes requirements & ~characteristics == 0."""
+        mask = 0
+        for attribute in attributes:
+            mask |= 1 << attribute.value
+        return mask
+    
     @classmethod
     def to_string(cls, attribute) -> str:
         if not isinstance(attribute, cls):
@@ -15,10 +15,10 @@ def calculate_all_judge_capacities(meetings: list[Meeting], judges: List[Judge])
     Returns:
         Dict[int, int]: A dictionary mapping each judge's ID to their calculated capacity.
     """
-    # Group cases by their judge requirements
+    # Group cases by their judge requirements (as a bit mask, see Attribute.to_mask)
     requirement_groups = {}
     for meeting in meetings:
-        req_key = frozenset(meeting.case.judge_requirements)
+        req_key = meeting.case.judge_requirements_mask
         if req_key not in requirement_groups:
             requirement_groups[req_key] = []
         requirement_groups[req_key].append(meeting.case)
@@ -26,6 +26,14 @@ def calculate_all_judge_capacities(meetings: list[Meeting], judges: List[Judge])
     # Count cases per requirement group
     group_counts = {req: len(cases_list) for req, cases_list in requirement_groups.items()}
     
+    # Calculate how many judges can handle each group, checked against the first case in the group
+    competing_judges_by_group = {
+        req_group: sum(1 for j in judges if
+                       case_requires_from_judge(cases_in_group[0], j) and
+                       judge_requires_from_case(j, cases_in_group[0]))
+        for req_group, cases_in_group in requirement_groups.items()
+    }
+    
     # Calculate weights for each judge per requirement group
     judge_weights = {}
     for judge in judges:
@@ -40,10 +48,7 @@ def calculate_all_judge_capacities(meetings: list[Meeting], judges: List[Judge])
             else:
                 compatible = False
             
-            # Calculate how many judges can handle this group
-            competing_judges = sum(1 for j in judges if
-                                 case_requires_from_judge(sample_case, j) and
-                                 judge_requires_from_case(j, sample_case))
+            competing_judges = competing_judges_by_group[req_group]
             
             # Weight is inversely proportional to number of judges that can handle this group
             weight = 1.0 / max(1, competing_judges) if compatible else 0
@@ -123,14 +128,11 @@ def calculate_all_room_capacities(jm_pairs, rooms: list[Room]) -> dict[int, int]
     Returns:
         Dict[int, int]: A dictionary mapping each room's ID to their calculated capacity.
     """
-    # Group case_judge pairs by their room requirements
+    # Group case_judge pairs by their room requirements (as a bit mask, see Attribute.to_mask)
     requirement_groups = {}
     for jm_pair in jm_pairs:
         # Combine requirements from both case and judge
-        combined_req = frozenset(
-            list(jm_pair.meeting.case.room_requirements) + 
-            list(jm_pair.judge.room_requirements)
-        )
+        combined_req = jm_pair.meeting.case.room_requirements_mask | jm_pair.judge.room_requirements_mask
         if combined_req not in requirement_groups:
             requirement_groups[combined_req] = []
         requirement_groups[combined_req].append(jm_pair)
@@ -138,6 +140,14 @@ def calculate_all_room_capacities(jm_pairs, rooms: list[Room]) -> dict[int, int]
     # Count cases per requirement group
     group_counts = {req: len(pairs_list) for req, pairs_list in requirement_groups.items()}
     
+    # Calculate how many rooms can handle each group, checked against the first pair in the group
+    competing_rooms_by_group = {
+        req_group: sum(1 for r in rooms if
+                       case_room_compatible(pairs_in_group[0].get_meeting().case, r) and
+                       judge_room_compatible(pairs_in_group[0].get_judge(), r))
+        for req_group, pairs_in_group in requirement_groups.items()
+    }
+    
     # Calculate weights for each room per requirement group
     room_weights = {}
     for room in rooms:
@@ -152,9 +162,7 @@ def calculate_all_room_capacities(jm_pairs, rooms: list[Room]) -> dict[int, int]
             else:
                 compatible = False
 
-            competing_rooms = sum(1 for r in rooms if 
-                                case_room_compatible(sample_pair.get_meeting().case, r) and 
-                                judge_room_compatible(sample_pair.get_judge(), r))
+            competing_rooms = competing_rooms_by_group[req_group]
             
             # Weight is inversely proportional to number of rooms that can handle this group
             weight = 1.0 / max(1, competing_rooms) if compatible else 0
@@ -4,20 +4,46 @@ from typing import Set, List, Any
 from src.base_model.meeting import Meeting
 from src.base_model.attribute_enum import Attribute
 
-@dataclass
+_ATTRIBUTE_SET_FIELDS = ("characteristics", "judge_requirements", "room_requirements")
+
+@dataclass(slots=True)
 class Case:
     """Class representing a court case"""
     case_id: int
     characteristics: Set[Attribute] = field(default_factory=set)
     judge_requirements: Set[Attribute] = field(default_factory=set)
     room_requirements: Set[Attribute] = field(default_factory=set)
+    # Bit masks of the attribute sets (Attribute.to_mask), used by the compatibility checks. They follow reassignments
+    # of the sets automatically, call refresh_masks() after changing a set in place
+    characteristics_mask: int = field(init=False, repr=False, default=0)
+    judge_requirements_mask: int = field(init=False, repr=False, default=0)
+    room_requirements_mask: int = field(init=False, repr=False, default=0)
     meetings: list[Meeting] = field(default_factory=list)  # Use Any to avoid the import
+        
+    def __post_init__(self):
+        self.refresh_masks()
+    
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _ATTRIBUTE_SET_FIELDS:
+            object.__setattr__(self, name + "_mask", Attribute.to_mask(value))
+    
+    def refresh_masks(self) -> None:
+        for name in _ATTRIBUTE_SET_FIELDS:
+            object.__setattr__(self, name + "_mask", Attribute.to_mask(getattr(self, name)))
+    
+    @property
+    def requirement_signature(self) -> tuple[int, int, int]:
+        """The attribute masks that decide compatibility. Cases with the same signature are compatible with the same judges and rooms."""
+        return (self.characteristics_mask, self.judge_requirements_mask, self.room_requirements_mask)
     
     def __str__(self):
         return f"{self.case_id}"
     
     def __eq__(self, other):
-        if not isinstance(other, Case):
+        if self is other:
+            return True
+        if not isinstance(other, Case) or self.case_id != other.case_id: # before building the meeting id sets below
             return False
         
         self_meeting_ids = {m.meeting_id for m in self.meetings}
@@ -1,4 +1,6 @@
-from typing import Set
+from typing import Iterable, Set
+
+import numpy as np
 
 from src.base_model.attribute_enum import Attribute
 from src.base_model.case import Case
@@ -21,29 +23,30 @@ def has_required_characteristics(requirements: Set[Attribute],
     """
     return requirements.issubset(characteristics)
 
+# The entity checks below compare the precomputed attribute bit masks (Attribute.to_mask) instead of the sets
 def judge_requires_from_room(judge: Judge, room: Room) -> bool:
     """Check if room satisfies judge's requirements (one-way)."""
-    return has_required_characteristics(judge.room_requirements, room.characteristics)
+    return judge.room_requirements_mask & ~room.characteristics_mask == 0
 
 def room_requires_from_judge(room: Room, judge: Judge) -> bool:
     """Check if judge satisfies room's requirements (one-way)."""
-    return has_required_characteristics(room.judge_requirements, judge.characteristics)
+    return room.judge_requirements_mask & ~judge.characteristics_mask == 0
 
 def case_requires_from_judge(case: Case, judge: Judge) -> bool:
     """Check if judge satisfies case's requirements (one-way)."""
-    return has_required_characteristics(case.judge_requirements, judge.characteristics)
+    return case.judge_requirements_mask & ~judge.characteristics_mask == 0
 
 def judge_requires_from_case(judge: Judge, case: Case) -> bool:
     """Check if case satisfies judge's requirements (one-way)."""
-    return has_required_characteristics(judge.case_requirements, case.characteristics)
+    return judge.case_requirements_mask & ~case.characteristics_mask == 0
 
 def case_requires_from_room(case: Case, room: Room) -> bool:
     """Check if room satisfies case's requirements (one-way)."""
-    return has_required_characteristics(case.room_requirements, room.characteristics)
+    return case.room_requirements_mask & ~room.characteristics_mask == 0
 
 def room_requires_from_case(room: Room, case: Case) -> bool:
     """Check if case satisfies room's requirements (one-way)."""
-    return has_required_characteristics(room.case_requirements, case.characteristics)
+    return room.case_requirements_mask & ~case.characteristics_mask == 0
 
 
 # Bidirectional compatibility check
@@ -54,39 +57,82 @@ def is_compatible(entity1_requirements: Set[Attribute],
 
 def case_judge_compatible(case: Case, judge: Judge) -> bool:
     """Check if case and judge are compatible (bidirectional)."""
-    return (is_compatible(case.judge_requirements, judge.characteristics) and
-            is_compatible(judge.case_requirements, case.characteristics))
+    return (case.judge_requirements_mask & ~judge.characteristics_mask) | (judge.case_requirements_mask & ~case.characteristics_mask) == 0
 
 def case_room_compatible(case: Case, room: Room) -> bool:
     """Check if case and room are compatible (bidirectional)."""
-    return (is_compatible(case.room_requirements, room.characteristics) and
-            is_compatible(room.case_requirements, case.characteristics))
+    return (case.room_requirements_mask & ~room.characteristics_mask) | (room.case_requirements_mask & ~case.characteristics_mask) == 0
 
 def judge_room_compatible(judge: Judge, room: Room) -> bool:
     """Check if judge and room are compatible (bidirectional)."""
-    return (is_compatible(judge.room_requirements, room.characteristics) and
-            is_compatible(room.judge_requirements, judge.characteristics))
+    return (judge.room_requirements_mask & ~room.characteristics_mask) | (room.judge_requirements_mask & ~judge.characteristics_mask) == 0
+
+
+def _attribute_masks(masks: list[int]) -> np.ndarray:
+    return np.array(masks, dtype=np.int64)
+
+def _compatibility_mask(requirements_a: np.ndarray, characteristics_a: np.ndarray, requirements_b: np.ndarray, characteristics_b: np.ndarray) -> np.ndarray:
+    """[a, b] -> is_compatible in both directions, for every pair of entities at once."""
+    return (((requirements_a[:, None] & ~characteristics_b[None, :]) == 0) &
+            ((requirements_b[None, :] & ~characteristics_a[:, None]) == 0))
+
+def case_judge_compatibility_mask(cases: list[Case], judges: list[Judge]) -> np.ndarray:
+    """Boolean [case, judge] matrix of case_judge_compatible, rows and columns in the order of the lists."""
+    return _compatibility_mask(_attribute_masks([case.judge_requirements_mask for case in cases]), _attribute_masks([case.characteristics_mask for case in cases]),
+                               _attribute_masks([judge.case_requirements_mask for judge in judges]), _attribute_masks([judge.characteristics_mask for judge in judges]))
+
+def case_room_compatibility_mask(cases: list[Case], rooms: list[Room]) -> np.ndarray:
+    """Boolean [case, room] matrix of case_room_compatible."""
+    return _compatibility_mask(_attribute_masks([case.room_requirements_mask for case in cases]), _attribute_masks([case.characteristics_mask for case in cases]),
+                               _attribute_masks([room.case_requirements_mask for room in rooms]), _attribute_masks([room.characteristics_mask for room in rooms]))
+
+def judge_room_compatibility_mask(judges: list[Judge], rooms: list[Room]) -> np.ndarray:
+    """Boolean [judge, room] matrix of judge_room_compatible."""
+    return _compatibility_mask(_attribute_masks([judge.room_requirements_mask for judge in judges]), _attribute_masks([judge.characteristics_mask for judge in judges]),
+                               _attribute_masks([room.judge_requirements_mask for room in rooms]), _attribute_masks([room.characteristics_mask for room in rooms]))
 
+def group_cases_by_signature(cases: Iterable[Case]) -> dict[tuple[int, int, int], list[Case]]:
+    """
+    The cases grouped by Case.requirement_signature, in order of first appearance. All cases in a group are compatible with
+    the same judges and rooms, so compatibility only has to be computed for one case per group.
+    """
+    groups = {}
+    for case in cases:
+        groups.setdefault(case.requirement_signature, []).append(case)
+    return groups
+
+def _compatible_per_meeting(meetings: list[Meeting], entities: list, mask_function) -> dict[int, list]:
+    """
+    The compatible entities of every meeting. The mask is computed once per case signature, and all meetings
+    with the same signature share the same list object, so the lists must not be modified.
+    """
+    case_groups = group_cases_by_signature(meeting.case for meeting in meetings)
+    mask = mask_function([cases_in_group[0] for cases_in_group in case_groups.values()], entities)
+    compatible_by_signature = {signature: [entities[i] for i in np.flatnonzero(mask[row]).tolist()] for row, signature in enumerate(case_groups)}
+    return {meeting.meeting_id: compatible_by_signature[meeting.case.requirement_signature] for meeting in meetings}
 
 def calculate_compatible_judges(meetings: list[Meeting], judges: list[Judge]) -> dict[int, list[Judge]]:
-    compatible_judges = {}
-    for meeting in meetings:
-        compatible_judges[meeting.meeting_id] = [judge for judge in judges 
-                                          if case_judge_compatible(meeting.case, judge)]
-        
-    return compatible_judges
+    return _compatible_per_meeting(meetings, judges, case_judge_compatibility_mask)
 
 def calculate_compatible_rooms(meetings: list[Meeting], rooms: list[Room]) -> dict[int, list[Room]]:
-    compatible_rooms = {}
-    for meeting in meetings:
-        compatible_rooms[meeting.meeting_id] = [room for room in rooms 
-                                         if case_room_compatible(meeting.case, room)]
-        
-    return compatible_rooms
+    return _compatible_per_meeting(meetings, rooms, case_room_compatibility_mask)
+
+# Compact 0..n-1 indices of the judges and rooms, in the order they were parsed, and of the case signatures (see group_cases_by_signature).
+# The matrices below are indexed by them, so cases with the same signature share a row
+case_index: dict[int, int] = {} # case_id -> row of its signature
+judge_index: dict[int, int] = {} # judge_id -> row/column
+room_index: dict[int, int] = {} # room_id -> column
+judge_ids: np.ndarray = np.array([]) # judge index -> judge_id (ids are not always ints, so no fixed dtype)
+room_ids: np.ndarray = np.array([]) # room index -> room_id
 
-case_judge_matrix = {}
-case_room_matrix = {}
-judge_room_matrix = {}
+# Dense boolean compatibility matrices. They are replaced on initialization, so access them through the module, not with from-imports
+case_judge_matrix: np.ndarray = np.zeros((0, 0), dtype=bool)
+case_room_matrix: np.ndarray = np.zeros((0, 0), dtype=bool)
+judge_room_matrix: np.ndarray = np.zeros((0, 0), dtype=bool)
+
+def _assign_compact_indices(index: dict[int, int], ids: list[int]) -> None:
+    index.clear() # updated in place, so from-imports of the index dicts stay valid
+    index.update((entity_id, i) for i, entity_id in enumerate(ids))
 
 def initialize_compatibility_matricies(parsed_data = None, schedule = None):    
     """
@@ -95,43 +141,41 @@ def initialize_compatibility_matricies(parsed_data = None, schedule = None):
     Args:
         parsed_data: Input data json, with judges, rooms, cases and meetings
     """
-    global case_judge_matrix, case_room_matrix, judge_room_matrix
+    global case_judge_matrix, case_room_matrix, judge_room_matrix, judge_ids, room_ids
 
     if parsed_data is None and schedule is None:
         raise ValueError("Either parsed_data or schedule must be provided")
 
-    case_judge_matrix.clear()
-    case_room_matrix.clear()
-    judge_room_matrix.clear()
-
     cases = schedule.get_all_cases() if schedule is not None else parsed_data["cases"]
     judges = schedule.get_all_judges() if schedule is not None else parsed_data["judges"]
     rooms = schedule.get_all_rooms() if schedule is not None else parsed_data["rooms"]
     
-    for case in cases:
-        case_id = case.case_id
-        case_judge_matrix[case_id] = {}
-
-        for judge in judges:
-            judge_id = judge.judge_id
-            case_judge_matrix[case_id][judge_id] = case_judge_compatible(case, judge)
-
-    for case in cases:
-        case_id = case.case_id
-        case_room_matrix[case_id] = {}
+    case_groups = group_cases_by_signature(cases)
+    _assign_compact_indices(case_index, []) # case_id -> signature row
+    for row, cases_in_group in enumerate(case_groups.values()):
+        case_index.update((case.case_id, row) for case in cases_in_group)
+    _assign_compact_indices(judge_index, [judge.judge_id for judge in judges])
+    _assign_compact_indices(room_index, [room.room_id for room in rooms])
+    judge_ids = np.array([judge.judge_id for judge in judges])
+    room_ids = np.array([room.room_id for room in rooms])
+
+    signature_cases = [cases_in_group[0] for cases_in_group in case_groups.values()]
+    case_judge_matrix = case_judge_compatibility_mask(signature_cases, judges)
+    case_room_matrix = case_room_compatibility_mask(signature_cases, rooms)
+    judge_room_matrix = judge_room_compatibility_mask(judges, rooms)
+    
 
-        for room in rooms:
-            room_id = room.room_id
-            case_room_matrix[case_id][room_id] = case_room_compatible(case, room)
+def compatible_judge_indices(case_id: int) -> np.ndarray:
+    """Indices of the judges compatible with the case (map them to ids with judge_ids)."""
+    return np.flatnonzero(case_judge_matrix[case_index[case_id]])
 
-    for judge in judges:
-        judge_id = judge.judge_id
-        judge_room_matrix[judge_id] = {}
+def compatible_room_indices(case_id: int) -> np.ndarray:
+    """Indices of the rooms compatible with the case (map them to ids with room_ids)."""
+    return np.flatnonzero(case_room_matrix[case_index[case_id]])
 
-        for room in rooms:
-            room_id = room.room_id
-            judge_room_matrix[judge_id][room_id] = judge_room_compatible(judge, room)
-    
+def compatible_room_indices_for_judge(judge_id: int) -> np.ndarray:
+    """Indices of the rooms compatible with the judge."""
+    return np.flatnonzero(judge_room_matrix[judge_index[judge_id]])
     
 # Efficient compatibility checks
 def check_case_judge_compatibility(case_id: int, judge_id: int) -> bool:
@@ -140,7 +184,7 @@ def check_case_judge_compatibility(case_id: int, judge_id: int) -> bool:
     Return true if compatible, false otherwise.
     """
     try:
-        return case_judge_matrix[case_id][judge_id]
+        return bool(case_judge_matrix[case_index[case_id], judge_index[judge_id]])
     except KeyError:
         print(f"Warning: Missing compatibility data for case {case_id} and judge {judge_id}")
         return False  # Assume incompatible if data is missing
@@ -151,7 +195,7 @@ def check_case_room_compatibility(case_id: int, room_id: int) -> bool:
     Return true if compatible, false otherwise.
     """
     try:
-        return case_room_matrix[case_id][room_id]
+        return bool(case_room_matrix[case_index[case_id], room_index[room_id]])
     except KeyError:
         print(f"Warning: Missing compatibility data for case {case_id} and room {room_id}")
         # You can either assume incompatible:
@@ -163,10 +207,7 @@ def check_judge_room_compatibility(judge_id: int, room_id: int) -> bool:
     Return true if compatible, false otherwise.
     """
     try:
-        return judge_room_matrix[judge_id][room_id]
+        return bool(judge_room_matrix[judge_index[judge_id], room_index[room_id]])
     except KeyError:
         print(f"Warning: Missing compatibility data for judge {judge_id} and room {room_id}")
         return False
-
-
-
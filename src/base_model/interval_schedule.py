@@ -0,0 +1,237 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict
+
+from src.base_model.judge import Judge
+from src.base_model.room import Room
+from src.base_model.case import Case
+from src.base_model.meeting import Meeting
+from src.base_model.appointment import Appointment
+from src.base_model.schedule import Schedule
+
+
+@dataclass
+class PlannedMeeting:
+    """A meeting in an IntervalSchedule: one record for the whole meeting instead of one Appointment per timeslot."""
+    meeting: Meeting
+    judge: Judge
+    room: Room
+    day: int # 1-indexed
+    start_timeslot: int # 1-indexed, within the day
+    length: int # in timeslots
+
+    def __str__(self):
+        return (f"PlannedMeeting({self.meeting.meeting_id}, J{self.judge}, R{self.room}, "
+                f"D{self.day}, T{self.start_timeslot}, L{self.length})")
+
+
+class ResourceTimeline:
+    """
+    The meetings of one judge or room as half-open intervals [start, end) of global timeslots (0-indexed over all days),
+    sorted by start. Intervals may overlap, since overbookings are allowed (and scored) in the schedule.
+    """
+
+    def __init__(self):
+        self.intervals: list[tuple[int, int, int]] = [] # (start, end, meeting_id), sorted
+        self.max_length: int = 0 # the longest interval ever added, bounds how far back an overlapping interval can start
+
+    def add(self, start: int, end: int, meeting_id: int) -> None:
+        insort(self.intervals, (start, end, meeting_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start: int, end: int, meeting_id: int) -> None:
+        i = bisect_left(self.intervals, (start, end, meeting_id))
+        if i == len(self.intervals) or self.intervals[i] != (start, end, meeting_id):
+            raise ValueError(f"Interval [{start}, {end}) of meeting {meeting_id} not found in timeline")
+        del self.intervals[i]
+
+    def overlapping(self, start: int, end: int) -> list[int]:
+        """Ids of the meetings whose interval overlaps [start, end). Only the intervals starting in [start - max_length, end) are looked at."""
+        first = bisect_left(self.intervals, (start - self.max_length + 1,))
+        last = bisect_left(self.intervals, (end,))
+        return [meeting_id for interval_start, interval_end, meeting_id in self.intervals[first:last] if interval_end > start]
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+class IntervalSchedule:
+    """
+    Alternative to Schedule where a planned meeting is a single PlannedMeeting (meeting, judge, room, day, start, length)
+    instead of one Appointment per timeslot. Planning, unplanning and moving a meeting cost O(log n) in the number of
+    meetings of the judge and room involved, regardless of the meeting's duration and the granularity.
+
+    Per judge and per room a ResourceTimeline answers overlap queries. The per-timeslot view (appointments_by_day_and_timeslot)
+    is only materialized on demand, for to_json, to_schedule and visualize.
+
+    The Meeting objects are shared with the Schedule the interval schedule was made from, so the judge and room live on the
+    PlannedMeeting only. Meeting.judge and Meeting.room are left alone until to_schedule.
+    """
+
+    def __init__(self, work_days: int, minutes_in_a_work_day: int = 390, granularity: int = 5, judges: list[Judge] = None, rooms: list[Room] = None, meetings: list[Meeting] = None, cases: list[Case] = None):
+        self.work_days: int = work_days
+        self.minutes_in_a_work_day: int = minutes_in_a_work_day
+        self.granularity: int = granularity
+        self.timeslots_per_work_day: int = minutes_in_a_work_day // granularity
+        self.all_judges: list[Judge] = judges
+        self.all_rooms: list[Room] = rooms
+        self.all_meetings: list[Meeting] = meetings
+        self.all_cases: list[Case] = cases
+
+        self.planned_meetings: dict[int, PlannedMeeting] = {} # meeting_id -> planned meeting
+        self.unplanned_meetings: list[Meeting] = []
+        self.judge_timelines: dict[int, ResourceTimeline] = {} # judge_id -> timeline
+        self.room_timelines: dict[int, ResourceTimeline] = {} # room_id -> timeline
+        self._appointments_by_day_and_timeslot: dict[int, Dict[int, list[Appointment]]] = None # materialized per-timeslot view, None when stale
+
+    @classmethod
+    def from_schedule(cls, schedule: Schedule) -> "IntervalSchedule":
+        """Convert a timeslot based Schedule. Every appointment chain becomes one planned meeting, starting at its earliest appointment."""
+        interval_schedule = cls(schedule.work_days, schedule.minutes_in_a_work_day, schedule.granularity,
+                                schedule.all_judges, schedule.all_rooms, schedule.all_meetings, schedule.all_cases)
+        chains: dict[int, list[Appointment]] = {}
+        for app in schedule.iter_appointments():
+            chains.setdefault(app.meeting.meeting_id, []).append(app)
+        for appointments in chains.values():
+            first = min(appointments, key=lambda app: (app.day, app.timeslot_in_day))
+            interval_schedule.plan_meeting(first.meeting, first.judge, first.room, first.day, first.timeslot_in_day, len(appointments))
+        interval_schedule.unplanned_meetings = list(schedule.unplanned_meetings)
+        return interval_schedule
+
+    def global_timeslot(self, day: int, timeslot_in_day: int) -> int:
+        """0-indexed timeslot over all days."""
+        return (day - 1) * self.timeslots_per_work_day + timeslot_in_day - 1
+
+    def _interval(self, planned: PlannedMeeting) -> tuple[int, int]:
+        start = self.global_timeslot(planned.day, planned.start_timeslot)
+        return start, start + planned.length
+
+    def plan_meeting(self, meeting: Meeting, judge: Judge, room: Room, day: int, start_timeslot: int, length: int = None) -> PlannedMeeting:
+        """
+        Add a meeting to the schedule. The length defaults to the meeting's duration in timeslots.
+        A meeting that runs past the end of the day continues on the next day, like appointment chains in Schedule.
+        """
+        if meeting.meeting_id in self.planned_meetings:
+            raise ValueError(f"Meeting {meeting.meeting_id} is already planned")
+        if length is None:
+            length = meeting.meeting_duration // self.granularity
+        planned = PlannedMeeting(meeting, judge, room, day, start_timeslot, length)
+        self._add(planned)
+        return planned
+
+    def unplan_meeting(self, meeting_id: int) -> PlannedMeeting:
+        """Remove a meeting from the schedule and return its planned meeting record."""
+        planned = self.planned_meetings.get(meeting_id)
+        if planned is None:
+            raise ValueError(f"Meeting {meeting_id} is not planned")
+        self._remove(planned)
+        return planned
+
+    def move_meeting(self, meeting_id: int, judge: Judge = None, room: Room = None, day: int = None, start_timeslot: int = None) -> PlannedMeeting:
+        """
+        Change the judge, room, day and/or start of a planned meeting (None keeps the current value).
+        Returns the previous record, so the move is undone with restore_meeting(previous).
+        """
+        previous = self.unplan_meeting(meeting_id)
+        self._add(PlannedMeeting(previous.meeting,
+                                 judge if judge is not None else previous.judge,
+                                 room if room is not None else previous.room,
+                                 day if day is not None else previous.day,
+                                 start_timeslot if start_timeslot is not None else previous.start_timeslot,
+                                 previous.length))
+        return previous
+
+    def restore_meeting(self, previous: PlannedMeeting) -> None:
+        """Put a meeting back where previous says, undoing move_meeting (or unplan_meeting)."""
+        if previous.meeting.meeting_id in self.planned_meetings:
+            self._remove(self.planned_meetings[previous.meeting.meeting_id])
+        self._add(previous)
+
+    def _add(self, planned: PlannedMeeting) -> None:
+        start, end = self._interval(planned)
+        meeting_id = planned.meeting.meeting_id
+        self.judge_timelines.setdefault(planned.judge.judge_id, ResourceTimeline()).add(start, end, meeting_id)
+        self.room_timelines.setdefault(planned.room.room_id, ResourceTimeline()).add(start, end, meeting_id)
+        self.planned_meetings[meeting_id] = planned
+        self._appointments_by_day_and_timeslot = None
+
+    def _remove(self, planned: PlannedMeeting) -> None:
+        start, end = self._interval(planned)
+        meeting_id = planned.meeting.meeting_id
+        self.judge_timelines[planned.judge.judge_id].remove(start, end, meeting_id)
+        self.room_timelines[planned.room.room_id].remove(start, end, meeting_id)
+        del self.planned_meetings[meeting_id]
+        self._appointments_by_day_and_timeslot = None
+
+    def overlapping_meetings(self, timelines: dict[int, ResourceTimeline], resource_id: int, day: int, start_timeslot: int, length: int) -> list[int]:
+        """Ids of the meetings of the judge or room (pass judge_timelines or room_timelines) that overlap the given slots."""
+        timeline = timelines.get(resource_id)
+        if timeline is None:
+            return []
+        start = self.global_timeslot(day, start_timeslot)
+        return timeline.overlapping(start, start + length)
+
+    def is_judge_available(self, judge_id: int, day: int, start_timeslot: int, length: int, ignore_meeting_id: int = None) -> bool:
+        return all(meeting_id == ignore_meeting_id for meeting_id in self.overlapping_meetings(self.judge_timelines, judge_id, day, start_timeslot, length))
+
+    def is_room_available(self, room_id: int, day: int, start_timeslot: int, length: int, ignore_meeting_id: int = None) -> bool:
+        return all(meeting_id == ignore_meeting_id for meeting_id in self.overlapping_meetings(self.room_timelines, room_id, day, start_timeslot, length))
+
+    def get_all_planned_meetings(self) -> list[Meeting]:
+        return [planned.meeting for planned in self.planned_meetings.values()]
+
+    def get_all_judges(self) -> list:
+        return self.all_judges
+
+    def get_all_rooms(self) -> list:
+        return self.all_rooms
+
+    def get_all_meetings(self) -> list:
+        return self.all_meetings
+
+    def get_all_cases(self) -> list:
+        return self.all_cases
+
+    @property
+    def appointments_by_day_and_timeslot(self) -> dict[int, Dict[int, list[Appointment]]]:
+        """The per-timeslot view of Schedule, materialized on first access and cached until the schedule changes."""
+        if self._appointments_by_day_and_timeslot is None:
+            view = {day: {timeslot: [] for timeslot in range(1, self.timeslots_per_work_day + 1)} for day in range(1, self.work_days + 1)}
+            for app in self.iter_appointments():
+                view.setdefault(app.day, {}).setdefault(app.timeslot_in_day, []).append(app)
+            self._appointments_by_day_and_timeslot = view
+        return self._appointments_by_day_and_timeslot
+
+    def iter_appointments(self):
+        """The Appointment for every timeslot of every planned meeting, created on the fly."""
+        for planned in self.planned_meetings.values():
+            start, end = self._interval(planned)
+            for timeslot in range(start, end):
+                day, timeslot_in_day = divmod(timeslot, self.timeslots_per_work_day)
+                yield Appointment(planned.meeting, planned.judge, planned.room, day + 1, timeslot_in_day + 1)
+
+    def get_all_appointments(self) -> list[Appointment]:
+        """Flat list of all appointments, in day and timeslot order like Schedule.get_all_appointments. Enough for visualize."""
+        return [app for timeslots in self.appointments_by_day_and_timeslot.values() for appointments in timeslots.values() for app in appointments]
+
+    def to_schedule(self) -> Schedule:
+        """
+        Materialize a timeslot based Schedule with the same appointments, eg. for visualize or the local search.
+        Sets the judge and room of the (shared) meetings to their planned ones, and to None for the unplanned meetings.
+        """
+        for planned in self.planned_meetings.values():
+            planned.meeting.judge = planned.judge
+            planned.meeting.room = planned.room
+        for meeting in self.unplanned_meetings:
+            meeting.judge = None
+            meeting.room = None
+        schedule = Schedule(self.work_days, self.minutes_in_a_work_day, self.granularity, self.all_judges, self.all_rooms, self.all_meetings, self.all_cases)
+        for app in self.iter_appointments():
+            schedule.add_meeting_to_schedule(app)
+        schedule.unplanned_meetings = list(self.unplanned_meetings)
+        schedule.initialize_appointment_chains()
+        return schedule
+
+    def to_json(self) -> Dict:
+        """Same format as Schedule.to_json."""
+        return self.to_schedule().to_json()
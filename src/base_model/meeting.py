@@ -4,7 +4,7 @@ from typing import Any
 from src.base_model.judge import Judge
 from src.base_model.room import Room
 
-@dataclass
+@dataclass(slots=True)
 class Meeting:
     """Class representing a meeting for a court case"""
     meeting_id: int
@@ -18,7 +18,9 @@ class Meeting:
         return f"Meeting id={self.meeting_id}, duration={self.meeting_duration}, parent_case_id={self.case}, judge={self.judge}, room={self.room}"
     
     def __eq__(self, other):
-        if not isinstance(other, Meeting):
+        if self is other:
+            return True
+        if not isinstance(other, Meeting) or self.meeting_id != other.meeting_id: # cheap checks first, this is called for every meeting in list searches
             return False
         
         # we compare case by like this only to avoid circular dependency
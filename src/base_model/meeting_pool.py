@@ -0,0 +1,60 @@
+from typing import Iterable, Iterator
+
+from src.base_model.meeting import Meeting
+
+
+class MeetingPool:
+    """
+    Set of meetings keyed by meeting_id, with O(1) add, pop by id, membership and random choice.
+
+    The meetings are kept in a list plus a meeting_id -> position map. Removing a meeting moves the last meeting into
+    its position (swap-remove), so the order is the insertion order only until the first removal.
+    Reads like a list of meetings: iteration, len, truthiness, indexing and random.choice work as before.
+    """
+
+    def __init__(self, meetings: Iterable[Meeting] = ()):
+        self._meetings: list[Meeting] = []
+        self._positions: dict[int, int] = {} # meeting_id -> index in _meetings
+        for meeting in meetings:
+            self.add(meeting)
+
+    def add(self, meeting: Meeting) -> None:
+        if meeting.meeting_id in self._positions:
+            raise ValueError(f"Meeting {meeting} already exists in the pool")
+        self._positions[meeting.meeting_id] = len(self._meetings)
+        self._meetings.append(meeting)
+
+    def pop(self, meeting_id: int) -> Meeting:
+        """Remove and return the meeting with the given id. Raises KeyError if it is not in the pool."""
+        position = self._positions.pop(meeting_id)
+        meeting = self._meetings[position]
+        last = self._meetings.pop()
+        if last is not meeting:
+            self._meetings[position] = last
+            self._positions[last.meeting_id] = position
+        return meeting
+
+    def get(self, meeting_id: int, default: Meeting = None) -> Meeting:
+        position = self._positions.get(meeting_id)
+        return self._meetings[position] if position is not None else default
+
+    def clear(self) -> None:
+        self._meetings.clear()
+        self._positions.clear()
+
+    def __contains__(self, meeting) -> bool:
+        """Membership by id, for both meetings and meeting ids."""
+        meeting_id = meeting.meeting_id if isinstance(meeting, Meeting) else meeting
+        return meeting_id in self._positions
+
+    def __iter__(self) -> Iterator[Meeting]:
+        return iter(self._meetings)
+
+    def __len__(self) -> int:
+        return len(self._meetings)
+
+    def __getitem__(self, index: int) -> Meeting:
+        return self._meetings[index]
+
+    def __repr__(self):
+        return f"MeetingPool({self._meetings})"
@@ -3,13 +3,32 @@ from typing import Set
 
 from src.base_model.attribute_enum import Attribute
 
-@dataclass
+_ATTRIBUTE_SET_FIELDS = ("characteristics", "case_requirements", "judge_requirements")
+
+@dataclass(slots=True)
 class Room:
     """Class representing a court room"""
     room_id: int
     characteristics: Set[Attribute] = field(default_factory=set)
     case_requirements: Set[Attribute] = field(default_factory=set)
     judge_requirements: Set[Attribute] = field(default_factory=set)
+    # Bit masks of the attribute sets (Attribute.to_mask), used by the compatibility checks. They follow reassignments
+    # of the sets automatically, call refresh_masks() after changing a set in place
+    characteristics_mask: int = field(init=False, repr=False, default=0)
+    case_requirements_mask: int = field(init=False, repr=False, default=0)
+    judge_requirements_mask: int = field(init=False, repr=False, default=0)
+        
+    def __post_init__(self):
+        self.refresh_masks()
+    
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _ATTRIBUTE_SET_FIELDS:
+            object.__setattr__(self, name + "_mask", Attribute.to_mask(value))
+    
+    def refresh_masks(self) -> None:
+        for name in _ATTRIBUTE_SET_FIELDS:
+            object.__setattr__(self, name + "_mask", Attribute.to_mask(getattr(self, name)))
     
     def __str__(self):
         #char_str = ", ".join(str(char) for char in self.characteristics)
@@ -17,6 +36,8 @@ class Room:
         return f"{self.room_id}"
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Room):
             return False
         
@@ -1,11 +1,13 @@
 from typing import Dict
 from copy import deepcopy
+from bisect import bisect_right, bisect_left, insort
 
 from src.base_model.judge import Judge
 from src.base_model.room import Room
 from src.base_model.case import Case
 from src.base_model.meeting import Meeting
 from src.base_model.appointment import Appointment
+from src.base_model.meeting_pool import MeetingPool
 from src.construction.graph.graph import UndirectedGraph, DirectedGraph, MeetingJudgeRoomNode, construct_conflict_graph
 
 from src.construction.graph.matching import (
@@ -20,7 +22,7 @@ class Schedule:
     def __init__(self, work_days: int, minutes_in_a_work_day: int = 390, granularity: int = 5, judges: list[Judge] = None, rooms: list[Room] = None, meetings: list[Meeting] = None, cases: list[Case] = None):
         self.appointments_by_day_and_timeslot: dict[int, Dict[int, list[Appointment]]] = {} # the main schedule dictionary. Stores appointments by day and timeslot
         self.appointment_chains: dict[int, list[Appointment]] = {} # dictionary of appointment chains. Key is the meeting ID, value is a list of appointments
-        self.unplanned_meetings: list[Meeting] = [] # list of unplanned meetings. Ie meetings that are supposed to be scheduled, but are not yet in the schedule
+        self._unplanned_meetings: MeetingPool = MeetingPool() # unplanned meetings by id. Ie meetings that are supposed to be scheduled, but are not yet in the schedule
         self.work_days: int = work_days # Amount of workdays in the schedule / the total length of the schedule. (1-indexed)
         self.minutes_in_a_work_day: int = minutes_in_a_work_day # minutes in a work day (default: 390 min = 6.5 hours)
         self.granularity: int = granularity # how many minutes in a timeslot (default: 5)
@@ -29,6 +31,37 @@ class Schedule:
         self.all_rooms: list[Room] = rooms
         self.all_meetings: list[Meeting] = meetings
         self.all_cases: list[Case] = cases
+        
+        # Occupancy counters. Kept up to date by add_appointments_to_indexes/remove_appointments_from_indexes (and their single-appointment
+        # versions add_to_indexes/remove_from_indexes), which do_move and undo_move call
+        self.room_occupancy: dict[tuple[int, int, int], int] = {} # (day, timeslot, room_id) -> number of appointments using the room
+        self.judge_occupancy: dict[tuple[int, int, int], int] = {} # (day, timeslot, judge_id) -> number of appointments using the judge
+        self.overbooked_rooms_by_slot: dict[tuple[int, int], int] = {} # (day, timeslot) -> number of rooms used more than once
+        self.overbooked_judges_by_slot: dict[tuple[int, int], int] = {} # (day, timeslot) -> number of judges used more than once
+        self.room_overbookings: int = 0 # total over all timeslots
+        self.judge_overbookings: int = 0 # total over all timeslots
+        # (day, judge_id) -> (starts, ends): the judge's occupied timeslots within the work day as sorted, non-adjacent intervals [start, end]
+        self.judge_day_intervals: dict[tuple[int, int], tuple[list[int], list[int]]] = {}
+        # (day, timeslot, judge_id) -> {room_id: number of appointments}: the rooms a judge sits in, within the work day
+        self.judge_slot_rooms: dict[tuple[int, int, int], dict[int, int]] = {}
+        # (day, judge_id) -> number of times the judge's set of rooms changes between consecutive occupied timeslots (nr29)
+        self.room_changes_by_judge_day: dict[tuple[int, int], int] = {}
+        # (day, judge_id) -> number of timeslots within the work day where the judge has an appointment (nr18)
+        self.used_slots_by_judge_day: dict[tuple[int, int], int] = {}
+        self.used_slots_by_day: dict[int, int] = {} # day -> used_slots_by_judge_day summed over all judges
+        # day -> {judge_id: number of appointments}, in any timeslot of the day. Used for the judges on the last day (nr18)
+        self.judge_appointments_by_day: dict[int, dict[int, int]] = {}
+        self.appointments_per_day: dict[int, int] = {} # day -> number of appointments, only days with appointments
+        self.nonempty_days: list[int] = [] # sorted keys of appointments_per_day, so the last non-empty day is nonempty_days[-1]
+        self.appointments_per_meeting: dict[int, int] = {} # meeting_id -> number of appointments in the schedule
+        # (day, judge_id) -> {meeting_id: number of appointments}: the meetings a judge has on a day, in any timeslot
+        self.meetings_by_judge_day: dict[tuple[int, int], dict[int, int]] = {}
+        # (day, room_id) -> {meeting_id: number of appointments}: the meetings held in a room on a day, in any timeslot
+        self.meetings_by_room_day: dict[tuple[int, int], dict[int, int]] = {}
+        self.planned_meetings: MeetingPool = MeetingPool() # the meetings with at least one appointment, ie. the keys of appointments_per_meeting
+        
+        # Running violation count per rule ("nr1", "nr2", ...), see calculate_full_score(running_totals=True). None when not tracked
+        self.rule_violations: dict[str, int] = None
 
         # initializing the appointments_by_day_and_timeslot dictionary
         for day in range(1, self.work_days + 1):
@@ -154,11 +187,40 @@ class Schedule:
         return True
     
     def add_meeting_to_schedule(self, appointment: Appointment):
-        if appointment.day not in self.appointments_by_day_and_timeslot:
-            self.appointments_by_day_and_timeslot[appointment.day] = {}
-        if appointment.timeslot_in_day not in self.appointments_by_day_and_timeslot[appointment.day]:
-            self.appointments_by_day_and_timeslot[appointment.day][appointment.timeslot_in_day] = []
-        self.appointments_by_day_and_timeslot[appointment.day][appointment.timeslot_in_day].append(appointment)
+        self.append_to_slot(appointment)
+        self.add_to_indexes(appointment)
+        self.rule_violations = None
+
+    def append_to_slot(self, appointment: Appointment) -> None:
+        """Put an appointment in the list of its day and timeslot, remembering its position there for remove_from_slot."""
+        day_slots = self.appointments_by_day_and_timeslot.get(appointment.day)
+        if day_slots is None:
+            day_slots = self.appointments_by_day_and_timeslot[appointment.day] = {}
+        slot = day_slots.get(appointment.timeslot_in_day)
+        if slot is None:
+            slot = day_slots[appointment.timeslot_in_day] = []
+        appointment.slot_index = len(slot)
+        slot.append(appointment)
+
+    def remove_from_slot(self, appointment: Appointment) -> bool:
+        """
+        Take an appointment (this exact object) out of the list of its day and timeslot, in O(1): the last appointment
+        of the list takes its place. Returns False if it is not there.
+        """
+        slot = self.appointments_by_day_and_timeslot.get(appointment.day, {}).get(appointment.timeslot_in_day)
+        if slot is None:
+            return False
+        index = appointment.slot_index
+        if not (0 <= index < len(slot) and slot[index] is appointment):
+            # Appended to the list directly instead of through append_to_slot, so its position is unknown
+            index = next((i for i, app in enumerate(slot) if app is appointment), None)
+            if index is None:
+                return False
+        last = slot.pop()
+        if last is not appointment:
+            slot[index] = last
+            last.slot_index = index
+        return True
 
 
     def initialize_appointment_chains(self) -> None:
@@ -168,16 +230,317 @@ class Schedule:
             if app.meeting.meeting_id not in self.appointment_chains:
                 self.appointment_chains[app.meeting.meeting_id] = []
             self.appointment_chains[app.meeting.meeting_id].append(app)
-            
         
+        # The schedule dict may have been edited directly, so rebuild everything derived from it
+        self.initialize_indexes()
+        self.rule_violations = None
+    
+    def initialize_indexes(self) -> None:
+        """Rebuild the occupancy counters from appointments_by_day_and_timeslot."""
+        self.room_occupancy = {}
+        self.judge_occupancy = {}
+        self.overbooked_rooms_by_slot = {}
+        self.overbooked_judges_by_slot = {}
+        self.room_overbookings = 0
+        self.judge_overbookings = 0
+        self.judge_day_intervals = {}
+        self.judge_slot_rooms = {}
+        self.room_changes_by_judge_day = {}
+        self.used_slots_by_judge_day = {}
+        self.used_slots_by_day = {}
+        self.judge_appointments_by_day = {}
+        self.appointments_per_day = {}
+        self.nonempty_days = []
+        self.appointments_per_meeting = {}
+        self.planned_meetings = MeetingPool()
+        self.meetings_by_judge_day = {}
+        self.meetings_by_room_day = {}
+        
+        appointments = list(self.iter_appointments())
+        self._add_used_slots(appointments, [self._add_slot_to_indexes(app) for app in appointments])
+        for meeting, day, judge_id, room_id, count in _meeting_runs(appointments):
+            self._add_run_to_indexes(meeting, day, judge_id, room_id, count)
+        # room changes are counted per judge-day at the end, instead of being updated appointment by appointment
+        for day, judge_id in self.judge_day_intervals:
+            self._add_room_changes(day, judge_id, self._count_room_changes_in_window(day, judge_id, 1, self.timeslots_per_work_day))
     
+    def add_to_indexes(self, appointment: Appointment) -> None:
+        """
+        Count an appointment in the occupancy counters, using its current judge, room, day and timeslot.
+        Must be called whenever an appointment is placed in appointments_by_day_and_timeslot, or after its judge/room changed.
+        """
+        self.add_appointments_to_indexes((appointment,))
+    
+    def remove_from_indexes(self, appointment: Appointment) -> None:
+        """
+        Inverse of add_to_indexes. Must be called with the judge, room, day and timeslot the appointment had when it was added.
+        """
+        self.remove_appointments_from_indexes((appointment,))
+    
+    def add_appointments_to_indexes(self, appointments) -> None:
+        """
+        add_to_indexes for several appointments at once, typically the chain of a moved meeting. The room changes (nr29) are
+        recounted once per (day, judge) the appointments touch, over the interval they cover, instead of once per appointment.
+        """
+        windows = self._room_change_windows(appointments)
+        changes_before = [self._count_room_changes_in_window(day, judge_id, first, last) for (day, judge_id), (first, last) in windows.items()]
+        self._add_used_slots(appointments, [self._add_slot_to_indexes(app) for app in appointments])
+        for meeting, day, judge_id, room_id, count in _meeting_runs(appointments):
+            self._add_run_to_indexes(meeting, day, judge_id, room_id, count)
+        for ((day, judge_id), (first, last)), before in zip(windows.items(), changes_before):
+            self._add_room_changes(day, judge_id, self._count_room_changes_in_window(day, judge_id, first, last) - before)
+    
+    def remove_appointments_from_indexes(self, appointments) -> None:
+        """Inverse of add_appointments_to_indexes, with the judge, room, day and timeslot the appointments had when they were added."""
+        windows = self._room_change_windows(appointments)
+        changes_before = [self._count_room_changes_in_window(day, judge_id, first, last) for (day, judge_id), (first, last) in windows.items()]
+        self._add_used_slots(appointments, [-self._remove_slot_from_indexes(app) for app in appointments])
+        for meeting, day, judge_id, room_id, count in _meeting_runs(appointments):
+            self._remove_run_from_indexes(meeting, day, judge_id, room_id, count)
+        for ((day, judge_id), (first, last)), before in zip(windows.items(), changes_before):
+            self._add_room_changes(day, judge_id, self._count_room_changes_in_window(day, judge_id, first, last) - before)
+    
+    def _room_change_windows(self, appointments) -> dict[tuple[int, int], list[int]]:
+        """(day, judge_id) -> [first, last] timeslot within the work day covered by the appointments."""
+        windows = {}
+        for app in appointments:
+            timeslot = app.timeslot_in_day
+            if not 1 <= timeslot <= self.timeslots_per_work_day:
+                continue
+            key = (app.day, app.judge.judge_id)
+            window = windows.get(key)
+            if window is None:
+                windows[key] = [timeslot, timeslot]
+            elif timeslot < window[0]:
+                window[0] = timeslot
+            elif timeslot > window[1]:
+                window[1] = timeslot
+        return windows
+    
+    def _add_used_slots(self, appointments, changes: list[int]) -> None:
+        """
+        Apply the changes of the judges' used work day timeslots, one per appointment (+1 newly occupied, -1 freed, 0 neither),
+        to used_slots_by_judge_day and used_slots_by_day, once per (day, judge).
+        """
+        used_slots = {}
+        for app, change in zip(appointments, changes):
+            if change:
+                key = (app.day, app.judge.judge_id)
+                used_slots[key] = used_slots.get(key, 0) + change
+        for key, change in used_slots.items():
+            if change:
+                count = self.used_slots_by_judge_day.get(key, 0) + change
+                if count:
+                    self.used_slots_by_judge_day[key] = count
+                else:
+                    del self.used_slots_by_judge_day[key]
+                count = self.used_slots_by_day.get(key[0], 0) + change
+                if count:
+                    self.used_slots_by_day[key[0]] = count
+                else:
+                    del self.used_slots_by_day[key[0]]
+    
+    def _add_run_to_indexes(self, meeting: Meeting, day: int, judge_id: int, room_id: int, count: int) -> None:
+        """Count count appointments of meeting with the same day, judge and room in the per-meeting and per-day indexes."""
+        day_judges = self.judge_appointments_by_day.setdefault(day, {})
+        day_judges[judge_id] = day_judges.get(judge_id, 0) + count
+        day_count = self.appointments_per_day.get(day, 0)
+        self.appointments_per_day[day] = day_count + count
+        if day_count == 0:
+            insort(self.nonempty_days, day)
+        
+        meeting_id = meeting.meeting_id
+        meeting_count = self.appointments_per_meeting.get(meeting_id, 0)
+        self.appointments_per_meeting[meeting_id] = meeting_count + count
+        if meeting_count == 0:
+            self.planned_meetings.add(meeting)
+        judge_meetings = self.meetings_by_judge_day.setdefault((day, judge_id), {})
+        judge_meetings[meeting_id] = judge_meetings.get(meeting_id, 0) + count
+        room_meetings = self.meetings_by_room_day.setdefault((day, room_id), {})
+        room_meetings[meeting_id] = room_meetings.get(meeting_id, 0) + count
+    
+    def _remove_run_from_indexes(self, meeting: Meeting, day: int, judge_id: int, room_id: int, count: int) -> None:
+        """Inverse of _add_run_to_indexes."""
+        day_judges = self.judge_appointments_by_day[day]
+        _decrement_count(day_judges, judge_id, count)
+        if not day_judges:
+            del self.judge_appointments_by_day[day]
+        if _decrement_count(self.appointments_per_day, day, count) == 0:
+            del self.nonempty_days[bisect_left(self.nonempty_days, day)]
+        
+        meeting_id = meeting.meeting_id
+        if _decrement_count(self.appointments_per_meeting, meeting_id, count) == 0:
+            self.planned_meetings.pop(meeting_id)
+        judge_meetings = self.meetings_by_judge_day[(day, judge_id)]
+        _decrement_count(judge_meetings, meeting_id, count)
+        if not judge_meetings:
+            del self.meetings_by_judge_day[(day, judge_id)]
+        room_meetings = self.meetings_by_room_day[(day, room_id)]
+        _decrement_count(room_meetings, meeting_id, count)
+        if not room_meetings:
+            del self.meetings_by_room_day[(day, room_id)]
+    
+    def _add_slot_to_indexes(self, appointment: Appointment) -> int:
+        """
+        add_to_indexes for the timeslot-level indexes only. The callers count the room changes and used timeslots per
+        (day, judge) and the per-meeting and per-day indexes per run of the meeting.
+        Returns 1 if the judge's work day timeslot was free before, else 0.
+        """
+        day, timeslot, judge_id, room_id = appointment.day, appointment.timeslot_in_day, appointment.judge.judge_id, appointment.room.room_id
+        in_work_day = 1 <= timeslot <= self.timeslots_per_work_day
+        
+        if _increment_occupancy(self.room_occupancy, self.overbooked_rooms_by_slot, day, timeslot, room_id) == 2:
+            self.room_overbookings += 1
+        
+        judge_count = _increment_occupancy(self.judge_occupancy, self.overbooked_judges_by_slot, day, timeslot, judge_id)
+        newly_used = 0
+        if judge_count == 2:
+            self.judge_overbookings += 1
+        elif judge_count == 1 and in_work_day:
+            _occupy_interval_slot(self.judge_day_intervals.setdefault((day, judge_id), ([], [])), timeslot)
+            newly_used = 1
+        
+        if in_work_day:
+            slot_rooms = self.judge_slot_rooms.get((day, timeslot, judge_id))
+            if slot_rooms is None:
+                slot_rooms = self.judge_slot_rooms[(day, timeslot, judge_id)] = {}
+            slot_rooms[room_id] = slot_rooms.get(room_id, 0) + 1
+        return newly_used
+    
+    def _remove_slot_from_indexes(self, appointment: Appointment) -> int:
+        """Inverse of _add_slot_to_indexes. Returns 1 if the judge's work day timeslot is free afterwards, else 0."""
+        day, timeslot, judge_id, room_id = appointment.day, appointment.timeslot_in_day, appointment.judge.judge_id, appointment.room.room_id
+        in_work_day = 1 <= timeslot <= self.timeslots_per_work_day
+        
+        if _decrement_occupancy(self.room_occupancy, self.overbooked_rooms_by_slot, day, timeslot, room_id) == 1:
+            self.room_overbookings -= 1
+        
+        judge_count = _decrement_occupancy(self.judge_occupancy, self.overbooked_judges_by_slot, day, timeslot, judge_id)
+        freed = 0
+        if judge_count == 1:
+            self.judge_overbookings -= 1
+        elif judge_count == 0 and in_work_day:
+            intervals = self.judge_day_intervals[(day, judge_id)]
+            _free_interval_slot(intervals, timeslot)
+            if not intervals[0]:
+                del self.judge_day_intervals[(day, judge_id)]
+            freed = 1
+        
+        if in_work_day:
+            slot_rooms = self.judge_slot_rooms[(day, timeslot, judge_id)]
+            if slot_rooms[room_id] == 1:
+                del slot_rooms[room_id]
+                if not slot_rooms:
+                    del self.judge_slot_rooms[(day, timeslot, judge_id)]
+            else:
+                slot_rooms[room_id] -= 1
+        return freed
+    
+    def _count_room_changes_in_window(self, day: int, judge_id: int, first: int, last: int) -> int:
+        """
+        The changes of the judge's set of rooms between consecutive occupied timeslots, from the last occupied timeslot before
+        first up to the first occupied timeslot after last. These are all the room changes that changing timeslots first..last can affect.
+        """
+        intervals = self.judge_day_intervals.get((day, judge_id))
+        if intervals is None:
+            return 0
+        starts, ends = intervals
+        first = self._neighbour_occupied_timeslot(day, judge_id, first, -1) or first
+        last = self._neighbour_occupied_timeslot(day, judge_id, last, 1) or last
+        
+        judge_slot_rooms = self.judge_slot_rooms
+        changes = 0
+        previous_rooms = None
+        i = max(bisect_right(starts, first) - 1, 0)
+        while i < len(starts) and starts[i] <= last:
+            for timeslot in range(max(starts[i], first), min(ends[i], last) + 1):
+                rooms = judge_slot_rooms[(day, timeslot, judge_id)].keys()
+                if previous_rooms is not None and rooms != previous_rooms:
+                    changes += 1
+                previous_rooms = rooms
+            i += 1
+        return changes
+    
+    def _neighbour_occupied_timeslot(self, day: int, judge_id: int, timeslot: int, direction: int) -> int:
+        """Closest timeslot before (direction=-1) or after (direction=1) the given one where the judge has an appointment, or None."""
+        intervals = self.judge_day_intervals.get((day, judge_id))
+        if intervals is None:
+            return None
+        starts, ends = intervals
+        
+        if direction < 0:
+            i = bisect_right(starts, timeslot - 1) - 1 # last interval starting before the timeslot
+            return min(ends[i], timeslot - 1) if i >= 0 else None
+        
+        i = bisect_left(starts, timeslot + 1) # first interval starting after the timeslot
+        if i > 0 and ends[i - 1] >= timeslot + 1: # the next timeslot is in the same interval
+            return timeslot + 1
+        return starts[i] if i < len(starts) else None
+    
+    def _add_room_changes(self, day: int, judge_id: int, change: int) -> None:
+        if change == 0:
+            return
+        count = self.room_changes_by_judge_day.get((day, judge_id), 0) + change
+        if count:
+            self.room_changes_by_judge_day[(day, judge_id)] = count
+        else:
+            del self.room_changes_by_judge_day[(day, judge_id)]
+    
+    def count_gaps_for_judge_day(self, day: int, judge_id: int) -> int:
+        """
+        Gaps in a judge's day: one before the first appointment if it doesn't start in timeslot 1, plus one between every 
+        two consecutive intervals. O(1), read from judge_day_intervals.
+        """
+        intervals = self.judge_day_intervals.get((day, judge_id))
+        if intervals is None:
+            return 0
+        starts = intervals[0]
+        return len(starts) - (1 if starts[0] == 1 else 0)
+    
+    def count_used_timeslots_for_judge_day(self, day: int, judge_id: int) -> int:
+        """Timeslots within the work day where the judge has an appointment. O(1), read from used_slots_by_judge_day."""
+        return self.used_slots_by_judge_day.get((day, judge_id), 0)
+    
+    def is_judge_available(self, judge_id: int, day: int, start_timeslot: int, n_timeslots: int) -> bool:
+        """Whether the judge has no appointment in the n timeslots from start_timeslot on the day. Read from the judge indexes."""
+        if (day, judge_id) not in self.meetings_by_judge_day:
+            return True
+        occupancy = self.judge_occupancy
+        return not any((day, timeslot, judge_id) in occupancy for timeslot in range(start_timeslot, start_timeslot + n_timeslots))
+    
+    def is_room_available(self, room_id: int, day: int, start_timeslot: int, n_timeslots: int) -> bool:
+        """Whether the room has no appointment in the n timeslots from start_timeslot on the day. Read from the room indexes."""
+        if (day, room_id) not in self.meetings_by_room_day:
+            return True
+        occupancy = self.room_occupancy
+        return not any((day, timeslot, room_id) in occupancy for timeslot in range(start_timeslot, start_timeslot + n_timeslots))
+    
+    def get_last_nonempty_day(self, up_to_day: int = None) -> int:
+        """
+        The last day with any appointment, optionally only looking at days up to and including up_to_day. 0 if there is none.
+        O(1) without up_to_day, O(log days) with it.
+        """
+        if up_to_day is None:
+            return self.nonempty_days[-1] if self.nonempty_days else 0
+        i = bisect_right(self.nonempty_days, up_to_day)
+        return self.nonempty_days[i - 1] if i > 0 else 0
+        
+    
+    @property
+    def unplanned_meetings(self) -> MeetingPool:
+        return self._unplanned_meetings
+
+    @unplanned_meetings.setter
+    def unplanned_meetings(self, meetings) -> None:
+        self._unplanned_meetings = MeetingPool(meetings)
+
     def add_to_unplanned_meetings(self, meeting: Meeting) -> None:
         if meeting is None:
             raise ValueError("Meeting cannot be None")
-        if meeting in self.unplanned_meetings:
+        if meeting in self._unplanned_meetings:
             raise ValueError(f"Meeting {meeting} already exists in unplanned meetings")
         else:
-            self.unplanned_meetings.append(meeting)
+            self._unplanned_meetings.add(meeting)
 
     def pop_meeting_from_unplanned_meetings(self, meeting_id: int) -> Meeting:
         """
@@ -186,33 +549,24 @@ class Schedule:
         Returns:
             The meeting object if found in unplanned meetings
         """
-        for i, meeting in enumerate(self.unplanned_meetings):
-            if meeting.meeting_id == meeting_id:
-                return self.unplanned_meetings.pop(i)
-
-        raise ValueError(f"Meeting with ID {meeting_id} not found in unplanned meetings")
+        try:
+            return self._unplanned_meetings.pop(meeting_id)
+        except KeyError:
+            raise ValueError(f"Meeting with ID {meeting_id} not found in unplanned meetings")
     
-    def get_all_unplanned_meetings(self) -> list[Meeting]:
-        return self.unplanned_meetings    
+    def get_unplanned_meeting(self, meeting_id: int) -> Meeting:
+        """The unplanned meeting with the given id, or None if it is planned (or unknown)."""
+        return self._unplanned_meetings.get(meeting_id)
     
-    def get_all_planned_meetings(self) -> list[Meeting]:
-        meetings = []
-        meeting_ids = set()
-        
-        for app in self.iter_appointments():
-            if app.meeting.meeting_id not in meeting_ids:
-                meeting_ids.add(app.meeting.meeting_id)
-                meetings.append(app.meeting)
-        return meetings
+    def get_all_unplanned_meetings(self) -> MeetingPool:
+        return self._unplanned_meetings    
     
-    def get_all_meetings(self) -> list[Meeting]:
+    def get_all_planned_meetings(self) -> list[Meeting]:
         """
-        Returns:
-            A list of all meetings in the schedule, planned and unplanned
+        A copy of the meetings that have appointments in the schedule, so the schedule can be changed while iterating it.
+        Use planned_meetings directly for the count or a random meeting.
         """
-        meetings = self.get_all_planned_meetings()
-        meetings.extend(self.unplanned_meetings)
-        return meetings
+        return list(self.planned_meetings)
     
     def print_unplanned_meetings(self) -> None:
         if not self.unplanned_meetings:
@@ -253,6 +607,7 @@ class Schedule:
         return self.all_rooms
 
     def get_all_meetings(self) -> list:
+        """All meetings of the problem instance, planned and unplanned"""
         return self.all_meetings
 
     def get_all_cases(self) -> list:
@@ -283,6 +638,7 @@ class Schedule:
         """
         
         chain_dict = self.appointment_chains
+        self.rule_violations = None
         
         for meeting_id, appointments in chain_dict.items():
             if len(appointments) > 1:
@@ -297,43 +653,23 @@ class Schedule:
                         print(f"  Warning: Meeting {meeting_id} is too long ({meeting_timeslots} timeslots) to fit in a single day ({self.timeslots_per_work_day} timeslots). Starting at timeslot 1.")
                         last_valid_slot = 1
                     
-                    for app in appointments:
-                        if app.day in self.appointments_by_day_and_timeslot and app.timeslot_in_day in self.appointments_by_day_and_timeslot[app.day]:
-                            if app in self.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day]:
-                                self.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day].remove(app)
+                    self.remove_appointments_from_indexes([app for app in appointments if self.remove_from_slot(app)])
                     
                     for i, app in enumerate(appointments):
                         new_timeslot = last_valid_slot + i
                         app.day = first_day
                         app.timeslot_in_day = new_timeslot
                         
-                        if app.day not in self.appointments_by_day_and_timeslot:
-                            self.appointments_by_day_and_timeslot[app.day] = {}
-                        if app.timeslot_in_day not in self.appointments_by_day_and_timeslot[app.day]:
-                            self.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day] = []
-                        
-                        self.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day].append(app)
+                        self.append_to_slot(app)
+                    self.add_appointments_to_indexes(appointments)
     
     def trim_schedule_length_if_possible(self) -> None:
         """
         Checks if the last day of the schedule is empty and removes it if so.
         Continues until a non-empty day is found or only one day remains.
         """
-        while self.work_days > 1:
-            last_day = self.work_days
-            is_empty = True
-
-            if last_day in self.appointments_by_day_and_timeslot:
-                for _timeslot, appointments in self.appointments_by_day_and_timeslot[last_day].items():
-                    if appointments:
-                        is_empty = False
-                        break 
-
-            if is_empty:
-                #print(f"Trimming empty day {last_day} from schedule.")
-                self.work_days -= 1
-            else:
-                break
+        if self.work_days > 1:
+            self.work_days = max(self.get_last_nonempty_day(self.work_days), 1)
         
     
     def to_json(self) -> Dict:
@@ -432,7 +768,7 @@ class Schedule:
                 appointment.meeting.judge = appointment.judge
                 appointment.meeting.room = appointment.room
                 
-                self.appointments_by_day_and_timeslot[day][timeslot_in_day].append(appointment)
+                self.append_to_slot(appointment)
         
         # Adjust the length of the schedule based on amount of days used
         max_day_used = max_color // self.timeslots_per_work_day + 1
@@ -447,6 +783,100 @@ class Schedule:
                 for timeslot in range(1, self.timeslots_per_work_day + 1):
                     if timeslot not in self.appointments_by_day_and_timeslot[day]:
                         self.appointments_by_day_and_timeslot[day][timeslot] = []
+        
+        self.initialize_indexes()
+
+def _increment_occupancy(occupancy: dict, overbooked_by_slot: dict, day: int, timeslot: int, resource_id: int) -> int:
+    """
+    Add one use of a resource in a timeslot. 
+    Returns the new number of uses (2 means the resource just became overbooked).
+    """
+    key = (day, timeslot, resource_id)
+    count = occupancy.get(key, 0) + 1
+    occupancy[key] = count
+    
+    if count == 2:
+        overbooked_by_slot[(day, timeslot)] = overbooked_by_slot.get((day, timeslot), 0) + 1
+    return count
+
+def _decrement_occupancy(occupancy: dict, overbooked_by_slot: dict, day: int, timeslot: int, resource_id: int) -> int:
+    """
+    Remove one use of a resource in a timeslot. 
+    Returns the new number of uses (1 means the resource stopped being overbooked, 0 that it is free).
+    """
+    key = (day, timeslot, resource_id)
+    count = occupancy[key] - 1
+    if count:
+        occupancy[key] = count
+    else:
+        del occupancy[key]
+    
+    if count == 1:
+        slot = (day, timeslot)
+        if overbooked_by_slot[slot] == 1:
+            del overbooked_by_slot[slot]
+        else:
+            overbooked_by_slot[slot] -= 1
+    return count
+
+def _decrement_count(counts: dict, key, amount: int = 1) -> int:
+    """Subtract amount (default one) from a count, dropping the key when it reaches 0. Returns the new count."""
+    count = counts[key] - amount
+    if count:
+        counts[key] = count
+    else:
+        del counts[key]
+    return count
+
+def _meeting_runs(appointments) -> list[list]:
+    """[meeting, day, judge_id, room_id, count] per run of consecutive appointments with the same meeting, day, judge and room."""
+    runs = []
+    run = None
+    for app in appointments:
+        meeting, day, judge_id, room_id = app.meeting, app.day, app.judge.judge_id, app.room.room_id
+        if run is not None and run[0] is meeting and run[1] == day and run[2] == judge_id and run[3] == room_id:
+            run[4] += 1
+        else:
+            run = [meeting, day, judge_id, room_id, 1]
+            runs.append(run)
+    return runs
+
+def _occupy_interval_slot(intervals: tuple[list[int], list[int]], timeslot: int) -> None:
+    """Add a free timeslot to sorted (starts, ends) intervals, merging with the neighbouring intervals."""
+    starts, ends = intervals
+    i = bisect_right(starts, timeslot) # intervals[i - 1] is the last one starting before the timeslot
+    joins_left = i > 0 and ends[i - 1] == timeslot - 1
+    joins_right = i < len(starts) and starts[i] == timeslot + 1
+    
+    if joins_left and joins_right:
+        ends[i - 1] = ends[i]
+        del starts[i]
+        del ends[i]
+    elif joins_left:
+        ends[i - 1] = timeslot
+    elif joins_right:
+        starts[i] = timeslot
+    else:
+        starts.insert(i, timeslot)
+        ends.insert(i, timeslot)
+
+def _free_interval_slot(intervals: tuple[list[int], list[int]], timeslot: int) -> None:
+    """Remove an occupied timeslot from sorted (starts, ends) intervals, splitting the interval it is in if needed."""
+    starts, ends = intervals
+    i = bisect_right(starts, timeslot) - 1 # the interval containing the timeslot
+    start, end = starts[i], ends[i]
+    
+    if start == end:
+        del starts[i]
+        del ends[i]
+    elif timeslot == start:
+        starts[i] = timeslot + 1
+    elif timeslot == end:
+        ends[i] = timeslot - 1
+    else:
+        ends[i] = timeslot - 1
+        starts.insert(i + 1, timeslot + 1)
+        ends.insert(i + 1, end)
 
 def generate_schedule_using_double_flow(parsed_data: Dict) -> Schedule:
     """
@@ -46,13 +46,16 @@ def generate_schedule_using_ilp(parsed_data: Dict, time_limit: int = 60, gap_rel
     print("Creating decision variables...")
     
     # Pre-filter compatible combinations to reduce variable count
+    # The (judge, room) pairs only depend on the case's requirement signature, so they are computed once per signature
     compatible_assignments = []
+    compatible_rooms_by_judge = {j.judge_id: [r for r in rooms if judge_room_compatible(j, r)] for j in judges}
+    compatible_pairs_by_signature = {}
     for m in meetings:
-        for j in judges:
-            if case_judge_compatible(m.case, j):
-                for r in rooms:
-                    if case_room_compatible(m.case, r) and judge_room_compatible(j, r):
-                        compatible_assignments.append((m, j, r))
+        signature = m.case.requirement_signature
+        if signature not in compatible_pairs_by_signature:
+            compatible_pairs_by_signature[signature] = [(j, r) for j in judges if case_judge_compatible(m.case, j)
+                                                        for r in compatible_rooms_by_judge[j.judge_id] if case_room_compatible(m.case, r)]
+        compatible_assignments.extend((m, j, r) for j, r in compatible_pairs_by_signature[signature])
     
     print(f"Found {len(compatible_assignments)} compatible (meeting, judge, room) combinations")
     
@@ -20,6 +20,9 @@ class ScheduleSnapshot:
         # Store unplanned meetings
         self.unplanned_meeting_ids = [m.meeting_id for m in schedule.unplanned_meetings]
         
+        # Running rule totals (if tracked) belong to exactly this state
+        self.rule_violations = dict(schedule.rule_violations) if schedule.rule_violations is not None else None
+        
         # Store case-meeting-judge relationships
         self.case_meeting_details = {}
         for case in schedule.all_cases:
@@ -61,16 +64,19 @@ class ScheduleSnapshot:
             judge = judges_map[judge_id]
             room = rooms_map[room_id]
             
-            # Create and add appointment
+            # Only put the appointment in its slot, initialize_appointment_chains below builds all the indexes in one go
             app = Appointment(meeting, judge, room, day, timeslot)
-            new_schedule.add_meeting_to_schedule(app)
+            new_schedule.append_to_slot(app)
         
         # Restore unplanned meetings
         for meeting_id in self.unplanned_meeting_ids:
             meeting = meetings_map[meeting_id]
             new_schedule.add_to_unplanned_meetings(meeting)
         
-        # Initialize chains
+        # Initialize chains and indexes
         new_schedule.initialize_appointment_chains()
         
+        if self.rule_violations is not None:
+            new_schedule.rule_violations = dict(self.rule_violations)
+        
         return new_schedule
\ No newline at end of file
@@ -0,0 +1,137 @@
+import random
+
+from src.base_model.schedule import Schedule
+from src.base_model import compatibility_checks
+from src.local_search.move import Move
+from src.local_search.scoring_context import ScoringContext
+
+
+class FenwickTree:
+    """Binary indexed tree over non-negative integer weights: O(log n) point updates, prefix sums and weighted sampling."""
+
+    def __init__(self, size: int):
+        self.size: int = size
+        self.tree: list[int] = [0] * (size + 1) # 1-indexed
+        self.weights: list[int] = [0] * size
+        self.total: int = 0
+        self._top_bit: int = 1 << (size.bit_length() - 1) if size else 0
+
+    def set(self, index: int, weight: int) -> None:
+        change = weight - self.weights[index]
+        if not change:
+            return
+        self.weights[index] = weight
+        self.total += change
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += change
+            i += i & -i
+
+    def find(self, value: int) -> int:
+        """The index whose cumulative weight range contains value, for 0 <= value < total."""
+        position = 0
+        bit = self._top_bit
+        while bit:
+            next_position = position + bit
+            if next_position <= self.size and self.tree[next_position] <= value:
+                position = next_position
+                value -= self.tree[next_position]
+            bit >>= 1
+        return position
+
+    def sample(self) -> int:
+        """An index drawn with probability proportional to its weight. The total must be positive."""
+        return self.find(random.randrange(self.total))
+
+
+class MeetingSampler:
+    """
+    Picks the meeting for a move, mixing violation-guided and uniform sampling. With probability guided_fraction
+    the meeting is drawn proportionally to its violation weight (see meeting_violation_weight), otherwise uniformly from
+    the planned meetings, so meetings without violations keep being moved too.
+
+    The weights are kept in a Fenwick tree. After an accepted move call update_after_move, which recomputes the weights of
+    the meetings the move can have affected: the moved meeting and the meetings sharing a (day, judge) or (day, room) with it,
+    before or after the move. After changes that are not tracked move by move (contracting, restoring a snapshot) call rebuild.
+    """
+
+    def __init__(self, schedule: Schedule, guided_fraction: float = 0.5, context: ScoringContext = None):
+        self.guided_fraction: float = guided_fraction
+        self.context: ScoringContext = context
+        meetings = schedule.get_all_meetings() or list(schedule.planned_meetings) + list(schedule.unplanned_meetings)
+        self.meeting_ids: list[int] = [meeting.meeting_id for meeting in meetings]
+        self.positions: dict[int, int] = {meeting_id: i for i, meeting_id in enumerate(self.meeting_ids)}
+        self.tree: FenwickTree = FenwickTree(len(self.meeting_ids))
+        self.rebuild(schedule)
+
+    def rebuild(self, schedule: Schedule) -> None:
+        """Recompute the weights of all meetings."""
+        for meeting_id in self.meeting_ids:
+            self.tree.set(self.positions[meeting_id], meeting_violation_weight(schedule, meeting_id, self.context))
+
+    def sample_meeting_id(self, schedule: Schedule) -> int:
+        """A planned meeting to move."""
+        if self.tree.total and random.random() < self.guided_fraction:
+            return self.meeting_ids[self.tree.sample()]
+        return random.choice(schedule.planned_meetings).meeting_id
+
+    def update_after_move(self, schedule: Schedule, move: Move) -> None:
+        """Update the weights after move was applied to schedule (and kept)."""
+        T = schedule.timeslots_per_work_day
+        judge_days, room_days = set(), set()
+        if not move.is_insert_move: # where the meeting was
+            length = len(move.appointments)
+            first = (move.old_day - 1) * T + move.old_start_timeslot - 1
+            for day in range(first // T + 1, (first + length - 1) // T + 2):
+                judge_days.add((day, move.old_judge.judge_id))
+                room_days.add((day, move.old_room.room_id))
+        if not move.is_delete_move: # where it is now
+            for app in move.appointments:
+                judge_days.add((app.day, app.judge.judge_id))
+                room_days.add((app.day, app.room.room_id))
+
+        affected = {move.meeting_id}
+        for key in judge_days:
+            affected.update(schedule.meetings_by_judge_day.get(key, ()))
+        for key in room_days:
+            affected.update(schedule.meetings_by_room_day.get(key, ()))
+        for meeting_id in affected:
+            position = self.positions.get(meeting_id)
+            if position is not None:
+                self.tree.set(position, meeting_violation_weight(schedule, meeting_id, self.context))
+
+
+def meeting_violation_weight(schedule: Schedule, meeting_id: int, context: ScoringContext = None) -> int:
+    """
+    The number of violations a planned meeting is involved in, from the schedule indexes: overbooked judge and room timeslots,
+    incompatible case/judge/room assignments, and on the first timeslot a gap before it (nr31) or a room change (nr29) for its judge.
+    0 for unplanned meetings. Only depends on the meeting's own assignment and its (day, judge) and (day, room) neighbours.
+    """
+    appointments = schedule.appointment_chains.get(meeting_id) if meeting_id in schedule.appointments_per_meeting else None
+    if not appointments:
+        return 0
+    first = min(appointments, key=lambda app: (app.day, app.timeslot_in_day))
+    judge_id, room_id, case_id = first.judge.judge_id, first.room.room_id, first.meeting.case.case_id
+    checks = context if context is not None else compatibility_checks
+
+    violations = 0
+    for app in appointments:
+        if schedule.room_occupancy.get((app.day, app.timeslot_in_day, app.room.room_id), 0) > 1:
+            violations += 1
+        if schedule.judge_occupancy.get((app.day, app.timeslot_in_day, app.judge.judge_id), 0) > 1:
+            violations += 1
+    if not checks.check_case_judge_compatibility(case_id, judge_id):
+        violations += 1
+    if not checks.check_case_room_compatibility(case_id, room_id):
+        violations += 1
+    if not checks.check_judge_room_compatibility(judge_id, room_id):
+        violations += 1
+
+    day, timeslot = first.day, first.timeslot_in_day
+    if timeslot > 1:
+        previous_rooms = schedule.judge_slot_rooms.get((day, timeslot - 1, judge_id))
+        if previous_rooms is None:
+            violations += 1 # gap before the meeting
+        elif room_id not in previous_rooms:
+            violations += 1 # the judge changes room
+    return violations
@@ -2,8 +2,13 @@ from src.base_model.schedule import Schedule
 from src.base_model.meeting import Meeting
 from src.base_model.appointment import Appointment
 from typing import List, Tuple
+from src.local_search.profiling import profiler
 
 class Move:
+    # Moves are allocated for every candidate in the SA inner loop (also for the tabu aspiration checks), so no per-instance __dict__
+    __slots__ = ("meeting_id", "appointments", "old_judge", "new_judge", "old_room", "new_room", "old_day", "new_day",
+                 "old_start_timeslot", "new_start_timeslot", "is_delete_move", "is_insert_move", "is_applied", "rule_deltas")
+
     def __init__(self, meeting_id, appointments: list[Appointment],
                  old_judge=None, new_judge=None,
                  old_room=None, new_room=None,
@@ -23,6 +28,7 @@ class Move:
         self.is_delete_move = is_delete_move
         self.is_insert_move = is_insert_move
         self.is_applied = False
+        self.rule_deltas: dict[str, int] = None # per-rule change in violations, set by calculate_delta_score
 
     def __str__(self):
         move_type = []
@@ -44,13 +50,30 @@ class Move:
         return f"Move(meeting {self.meeting_id}: {', '.join(move_type)})"
 
 
+def _update_rule_violations(move: Move, schedule: Schedule, sign: int) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) the rule deltas of a move to the running totals of the schedule.
+    A move that was never scored has unknown deltas, so the running totals are dropped and recomputed on the next full score.
+    """
+    if schedule is None or schedule.rule_violations is None:
+        return
+    if move.rule_deltas is None:
+        schedule.rule_violations = None
+        return
+    for rule, delta in move.rule_deltas.items():
+        schedule.rule_violations[rule] += sign * delta
+
 def do_move(move: Move, schedule: Schedule = None) -> None:
     """Update appointments and the schedule dictionary if provided"""
     if move.is_applied:
         return
     
+    if profiler.enabled:
+        profiler.record_call("do_move")
+    _update_rule_violations(move, schedule, 1)
+    
     # Handle insertion move
-    elif move.is_insert_move:
+    if move.is_insert_move:
         if schedule is None:
             raise ValueError("Schedule must be provided to do insertion move.")
         
@@ -69,6 +92,10 @@ def do_move(move: Move, schedule: Schedule = None) -> None:
             raise ValueError("Granularity must be greater than 0 and meeting duration must be positive.")
         timeslots_needed = (meeting.meeting_duration // schedule.granularity) 
         
+        # Start from a fresh list. Delta evaluation leaves temporary appointments in move.appointments,
+        # and those must never end up in the appointment chain.
+        move.appointments = []
+        
         # Create appointment objects for each timeslot
         for i in range(timeslots_needed):
             global_timeslot = ((move.new_day - 1) * schedule.timeslots_per_work_day) + move.new_start_timeslot + i
@@ -88,12 +115,8 @@ def do_move(move: Move, schedule: Schedule = None) -> None:
             
             move.appointments.append(appointment)
             
-            if day not in schedule.appointments_by_day_and_timeslot:
-                schedule.appointments_by_day_and_timeslot[day] = {}
-            if timeslot_in_day not in schedule.appointments_by_day_and_timeslot[day]:
-                schedule.appointments_by_day_and_timeslot[day][timeslot_in_day] = []
-            
-            schedule.appointments_by_day_and_timeslot[day][timeslot_in_day].append(appointment)
+            schedule.append_to_slot(appointment)
+        schedule.add_appointments_to_indexes(move.appointments)
         
         max_day = max(app.day for app in move.appointments)
         if max_day > schedule.work_days:
@@ -111,12 +134,9 @@ def do_move(move: Move, schedule: Schedule = None) -> None:
         if schedule is None:
             raise ValueError("Schedule must be provided for delete move.")
         for app in move.appointments:
-            appointments = schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day]
-            index = next((i for i, appointment in enumerate(appointments) if appointment is app), None)
-            if index is not None:
-                appointments.pop(index)
-            else:
+            if not schedule.remove_from_slot(app):
                 raise ValueError(f"Appointment {app} not found in schedule.")
+        schedule.remove_appointments_from_indexes(move.appointments)
             
         # adding it to the unplanned meetings
         if schedule is not None and move.appointments:
@@ -138,17 +158,14 @@ def do_move(move: Move, schedule: Schedule = None) -> None:
     else:
         changing_position = (move.new_day is not None or move.new_start_timeslot is not None)
 
+        # the occupancy counters are keyed on judge, room and position, so take the appointments out before changing any of them
+        if schedule is not None:
+            schedule.remove_appointments_from_indexes(move.appointments)
+
         for i, app in enumerate(move.appointments):
             # update the dict - remove the appointments from the old position
             if schedule is not None and changing_position:
-                old_day = app.day
-                old_timeslot = app.timeslot_in_day
-
-                appointments = schedule.appointments_by_day_and_timeslot[old_day][old_timeslot]
-                index = next((i for i, appointment in enumerate(appointments) if appointment is app), None)
-                if index is not None:
-                    appointments.pop(index)
-                else:
+                if not schedule.remove_from_slot(app):
                     print(f"Appointment {app} not found in schedule.") 
                     raise ValueError(f"Appointment {app} not found in schedule.")
                         
@@ -178,18 +195,10 @@ def do_move(move: Move, schedule: Schedule = None) -> None:
 
             # update the dict - add the appointments to the new position
             if schedule is not None and changing_position:
-                new_day = app.day
-                new_timeslot = app.timeslot_in_day
-
-                if new_day not in schedule.appointments_by_day_and_timeslot:
-                    schedule.appointments_by_day_and_timeslot[new_day] = {}
-                if new_timeslot not in schedule.appointments_by_day_and_timeslot[new_day]:
-                    schedule.appointments_by_day_and_timeslot[new_day][new_timeslot] = []
-                    
-                # if app in schedule.appointments_by_day_and_timeslot[new_day][new_timeslot]:
-                #     raise ValueError(f"Appointment {app} already exists in the new position.") # shouldnt happen but good for safety
+                schedule.append_to_slot(app)
 
-                schedule.appointments_by_day_and_timeslot[new_day][new_timeslot].append(app)
+        if schedule is not None:
+            schedule.add_appointments_to_indexes(move.appointments)
 
         move.is_applied = True        
         
@@ -201,18 +210,17 @@ def undo_move(move: Move, schedule: Schedule = None) -> None:
     if not move.is_applied:
         return
     
+    if profiler.enabled:
+        profiler.record_call("undo_move")
+    _update_rule_violations(move, schedule, -1)
+    
     # Handle insertion moves
-    elif move.is_insert_move:
+    if move.is_insert_move:
         if schedule is None:
             raise ValueError("Schedule must be provided for undo insertion move.")
         
         # Remove all appointments from the schedule
-        for app in move.appointments:
-            if (app.day in schedule.appointments_by_day_and_timeslot and
-                app.timeslot_in_day in schedule.appointments_by_day_and_timeslot[app.day] and
-                app in schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day]):
-                
-                schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day].remove(app)
+        schedule.remove_appointments_from_indexes([app for app in move.appointments if schedule.remove_from_slot(app)])
         
         # Get the meeting from the first appointment
         if move.appointments:
@@ -248,7 +256,7 @@ def undo_move(move: Move, schedule: Schedule = None) -> None:
                 raise ValueError(f"Meeting with id {meeting_id} not found in unplanned meetings.")
         
         # adding the appointments back to the schedule
-        for app in move.appointments:
+        for i, app in enumerate(move.appointments):
             if schedule is None:
                 raise ValueError("Schedule must be provided for undo delete move.")
             
@@ -256,20 +264,14 @@ def undo_move(move: Move, schedule: Schedule = None) -> None:
             app.judge = move.old_judge
             app.room = move.old_room
             app.day = move.old_day
-            app.timeslot_in_day = move.old_start_timeslot + move.appointments.index(app)
+            app.timeslot_in_day = move.old_start_timeslot + i
             
-            day_to_add = app.day
-            timeslot_to_add = app.timeslot_in_day
+            schedule.append_to_slot(app)
             
-            if day_to_add not in schedule.appointments_by_day_and_timeslot:
-                schedule.appointments_by_day_and_timeslot[app.day] = {}
-            if timeslot_to_add not in schedule.appointments_by_day_and_timeslot[app.day]:
-                schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day] = []
-            
-            # if app in schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day]:
-            #     raise ValueError(f"Appointment {app} already exists in the new position.") # shouldnt happen but good for safety
-            
-            schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day].append(app)
+            # the delete may have trimmed this day away
+            if app.day > schedule.work_days:
+                schedule.work_days = app.day
+        schedule.add_appointments_to_indexes(move.appointments)
         
         # Restore the appointment chain
         if schedule is not None and move.appointments:
@@ -282,17 +284,13 @@ def undo_move(move: Move, schedule: Schedule = None) -> None:
     else:
         changing_position = (move.new_day is not None or move.new_start_timeslot is not None)
         
+        if schedule is not None:
+            schedule.remove_appointments_from_indexes(move.appointments)
+        
         for i, app in enumerate(move.appointments):
             # update the dict - remove the appointments from the new position
             if schedule is not None and changing_position:
-                current_day = app.day
-                current_timeslot = app.timeslot_in_day
-
-                appointments = schedule.appointments_by_day_and_timeslot[current_day][current_timeslot]
-                index = next((i for i, appointment in enumerate(appointments) if appointment is app), None)
-                if index is not None:
-                    appointments.pop(index)
-                else:
+                if not schedule.remove_from_slot(app):
                     raise ValueError(f"Appointment {app} not found in schedule.")
 
             if move.old_judge is not None:
@@ -320,15 +318,10 @@ def undo_move(move: Move, schedule: Schedule = None) -> None:
 
             # update the dict - add the appointments to the old position
             if schedule is not None and changing_position:
-                original_day = app.day
-                original_timeslot = app.timeslot_in_day
-
-                if original_day not in schedule.appointments_by_day_and_timeslot:
-                    schedule.appointments_by_day_and_timeslot[original_day] = {}
-                if original_timeslot not in schedule.appointments_by_day_and_timeslot[original_day]:
-                    schedule.appointments_by_day_and_timeslot[original_day][original_timeslot] = []
+                schedule.append_to_slot(app)
 
-                schedule.appointments_by_day_and_timeslot[original_day][original_timeslot].append(app)
+        if schedule is not None:
+            schedule.add_appointments_to_indexes(move.appointments)
 
         move.is_applied = False
             
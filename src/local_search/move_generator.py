@@ -6,29 +6,39 @@ from src.base_model.judge import Judge
 from src.base_model.room import Room
 from src.base_model.schedule import Schedule
 from src.local_search.move import Move, ContractingMove, do_move
-from collections import deque
-from src.local_search.rules_engine import calculate_delta_score
+from src.local_search.tabu_list import TabuList
+from src.local_search.meeting_sampler import MeetingSampler
+from src.local_search.rules_engine import calculate_delta_scores, prepare_move_for_running_totals
+from src.local_search.scoring_context import ScoringContext
 from src.base_model.compatibility_checks import calculate_compatible_judges, calculate_compatible_rooms
 from src.local_search.rules_engine_helpers import populate_insert_move_appointments
 
 random.seed(13062025)
 
+# Random draws per move type in generate_single_random_move before it falls back to listing the valid alternatives
+_MAX_SAMPLING_ATTEMPTS = 8
+
 def generate_single_random_move(
     schedule: Schedule,
     compatible_judges_dict: Dict[int, List[Judge]],
     compatible_rooms_dict: Dict[int, List[Room]],
-    tabu_list: deque = None,
+    tabu_list: TabuList = None,
     current_score: int = None,
-    best_score: int = None
+    best_score: int = None,
+    context: ScoringContext = None,
+    meeting_sampler: MeetingSampler = None
 ) -> Move:
-    """Generate a random valid move with inline tabu checking."""
-    meetings: list[Meeting] = schedule.get_all_meetings()
-
-
+    """
+    Generate a random valid move with inline tabu checking. The meeting is picked by meeting_sampler if given, otherwise uniformly.
+    Picks a move type, then samples alternatives for it (a judge, room, day or start timeslot) until one is valid, ie. not tabu
+    or meeting the aspiration criterion. Only the sampled alternatives are checked, so a move costs O(1) expected instead of
+    building every candidate list. The result is uniform over the move types with a valid alternative and over their valid alternatives.
+    """
+    meetings = schedule.planned_meetings # only planned meetings have appointments to move
     if not meetings:
         raise ValueError("No meetings found in the schedule.")
     
-    chosen_meeting_id = random.choice(meetings).meeting_id
+    chosen_meeting_id = meeting_sampler.sample_meeting_id(schedule) if meeting_sampler is not None else random.choice(meetings).meeting_id
     chosen_appointments = sorted(
         schedule.get_appointment_chain(chosen_meeting_id),
         key=lambda app: (app.day, app.timeslot_in_day)
@@ -43,105 +53,65 @@ def generate_single_random_move(
     move.old_day = current_day
     move.old_start_timeslot = current_start
     
-    def meets_aspiration(temp_move: Move) -> bool:
-        if current_score is None or best_score is None:
-            return False
-        delta = calculate_delta_score(schedule, temp_move)
-        return current_score + delta < best_score
-    
     # Precompute some values
     meeting_length = len(chosen_appointments)
     max_start = schedule.timeslots_per_work_day - meeting_length + 1
     
-    compatible_judges = compatible_judges_dict.get(chosen_meeting_id, [])
-    compatible_rooms  = compatible_rooms_dict.get(chosen_meeting_id, [])
+    # Per move type: the alternatives (sequences, so sampling is O(1)), whether an alternative is the current value, 
+    # its tabu key and the Move attribute it sets
+    alternatives_by_type = {
+        "judge": (compatible_judges_dict.get(chosen_meeting_id, []), lambda j: j.judge_id == first_app.judge.judge_id,
+                  lambda j: (chosen_meeting_id, 'judge', j.judge_id), "new_judge"),
+        "room": (compatible_rooms_dict.get(chosen_meeting_id, []), lambda r: r.room_id == first_app.room.room_id,
+                 lambda r: (chosen_meeting_id, 'room', r.room_id), "new_room"),
+        "day": (range(1, schedule.work_days + 1), lambda d: d == current_day,
+                lambda d: (chosen_meeting_id, 'position', d, current_start), "new_day"),
+        "timeslot": (range(1, max_start + 1) if meeting_length != 78 else range(0), lambda t: t == current_start,
+                     lambda t: (chosen_meeting_id, 'position', current_day, t), "new_start_timeslot"),
+    }
+    move_types = [move_type for move_type, (values, is_current, _, _) in alternatives_by_type.items()
+                  if len(values) > 1 or (len(values) == 1 and not is_current(values[0]))]
     
-    # Build lists of valid alternatives
-    valid_judges = []
-    for j in compatible_judges:
-        if j.judge_id == first_app.judge.judge_id:
-            continue
-        key = (chosen_meeting_id, 'judge', j.judge_id)
-        if tabu_list is None or key not in tabu_list:
-            valid_judges.append(j)
-        else:
-            temp = Move(chosen_meeting_id, chosen_appointments,
-                        old_judge=first_app.judge, new_judge=j,
-                        old_room=first_app.room,
+    while move_types:
+        move_type = random.choice(move_types)
+        values, is_current, tabu_key, attribute = alternatives_by_type[move_type]
+        
+        def temporary_move(value) -> Move:
+            """The move to the alternative, for the aspiration check of tabu alternatives."""
+            temp = Move(chosen_meeting_id, chosen_appointments, old_judge=first_app.judge, old_room=first_app.room,
                         old_day=current_day, old_start_timeslot=current_start)
-            if meets_aspiration(temp):
-                valid_judges.append(j)
+            setattr(temp, attribute, value)
+            return temp
+        
+        value = _sample_valid_alternative(schedule, values, is_current, tabu_key, temporary_move, tabu_list, current_score, best_score, context)
+        if value is not None:
+            setattr(move, attribute, value)
+            return move
+        move_types.remove(move_type) # every alternative is tabu, try the other types
     
-    valid_rooms = []
-    for r in compatible_rooms:
-        if r.room_id == first_app.room.room_id:
+    raise ValueError(f"No valid moves for meeting_length={meeting_length}")
+
+def _sample_valid_alternative(schedule: Schedule, values, is_current, tabu_key, temporary_move, tabu_list: TabuList,
+                              current_score: int, best_score: int, context: ScoringContext = None):
+    """
+    A uniformly random valid alternative from values, or None if there is none. Rejection-samples first, and only lists
+    all alternatives if that fails _MAX_SAMPLING_ATTEMPTS times (when most of them are tabu).
+    """
+    for _ in range(_MAX_SAMPLING_ATTEMPTS):
+        value = random.choice(values)
+        if is_current(value):
             continue
-        key = (chosen_meeting_id, 'room', r.room_id)
-        if tabu_list is None or key not in tabu_list:
-            valid_rooms.append(r)
-        else:
-            temp = Move(chosen_meeting_id, chosen_appointments,
-                        old_judge=first_app.judge,
-                        old_room=first_app.room, new_room=r,
-                        old_day=current_day, old_start_timeslot=current_start)
-            if meets_aspiration(temp):
-                valid_rooms.append(r)
+        if tabu_list is None or tabu_key(value) not in tabu_list:
+            return value
+        if _get_aspirating_moves(schedule, [temporary_move(value)], current_score, best_score, context):
+            return value
     
-    valid_days = []
-    for d in range(1, schedule.work_days + 1):
-        if d == current_day:
-            continue
-        key = (chosen_meeting_id, 'position', d, current_start)
-        if tabu_list is None or key not in tabu_list:
-            valid_days.append(d)
-        else:
-            temp = Move(chosen_meeting_id, chosen_appointments,
-                        old_judge=first_app.judge, old_room=first_app.room,
-                        old_day=current_day, new_day=d,
-                        old_start_timeslot=current_start)
-            if meets_aspiration(temp):
-                valid_days.append(d)
-    
-    valid_timeslots = []
-    if meeting_length != 78:
-        for t in range(1, max_start + 1):
-            if t == current_start:
-                continue
-            key = (chosen_meeting_id, 'position', current_day, t)
-            if tabu_list is None or key not in tabu_list:
-                valid_timeslots.append(t)
-            else:
-                temp = Move(chosen_meeting_id, chosen_appointments,
-                            old_judge=first_app.judge, old_room=first_app.room,
-                            old_day=current_day, old_start_timeslot=current_start,
-                            new_start_timeslot=t)
-                if meets_aspiration(temp):
-                    valid_timeslots.append(t)
-    
-    # Map move‐types to their valid options
-    move_buckets = {
-        "judge":   valid_judges,
-        "room":    valid_rooms,
-        "day":     valid_days,
-        "timeslot": valid_timeslots
-    }
-    possible_moves = [m for m, opts in move_buckets.items() if opts]
-    if not possible_moves:
-        raise ValueError(f"No valid moves for meeting_length={meeting_length}")
-    
-    move_type = random.choice(possible_moves)
-    
-    # Assign the chosen alternative
-    if move_type == "judge":
-        move.new_judge = random.choice(valid_judges)
-    elif move_type == "room":
-        move.new_room = random.choice(valid_rooms)
-    elif move_type == "day":
-        move.new_day = random.choice(valid_days)
-    elif move_type == "timeslot":
-        move.new_start_timeslot = random.choice(valid_timeslots)
-    
-    return move
+    candidates = [value for value in values if not is_current(value)]
+    valid = [value for value in candidates if tabu_list is None or tabu_key(value) not in tabu_list]
+    tabu_moves = [(value, temporary_move(value)) for value in candidates if tabu_list is not None and tabu_key(value) in tabu_list]
+    aspirating = _get_aspirating_moves(schedule, [temp for _, temp in tabu_moves], current_score, best_score, context)
+    valid += [value for value, temp in tabu_moves if id(temp) in aspirating]
+    return random.choice(valid) if valid else None
 
 
 
@@ -181,7 +151,7 @@ def generate_random_delete_move(schedule: Schedule) -> Move:
     """
     Generate a delete move for a random meeting.
     """
-    meetings = schedule.get_all_planned_meetings()
+    meetings = schedule.planned_meetings
     
     if not meetings:
         raise ValueError("No meetings found in schedule.")
@@ -236,9 +206,13 @@ def generate_specific_insert_move(schedule: Schedule, meeting: Meeting, judge: J
     
     return move
 
-def generate_random_insert_move(schedule: Schedule) -> Move:
+def generate_random_insert_move(schedule: Schedule,
+                                compatible_judges_dict: Dict[int, List[Judge]] = None,
+                                compatible_rooms_dict: Dict[int, List[Room]] = None) -> Move:
     """ 
     Generate an insert move for a random unplanned meeting.
+    Pass the compatible judges/rooms per meeting the caller already has (like simulated_annealing does). 
+    Meetings missing from them get their lists computed on the spot, for that meeting only.
     """
     
     unplanned_meetings = schedule.get_all_unplanned_meetings()
@@ -249,16 +223,20 @@ def generate_random_insert_move(schedule: Schedule) -> Move:
     meeting = random.choice(unplanned_meetings)
     meeting_id = meeting.meeting_id
     
-    compatible_judges_dict = calculate_compatible_judges(schedule.get_all_meetings(), schedule.get_all_judges())
-    compatible_rooms_dict = calculate_compatible_rooms(schedule.get_all_meetings(), schedule.get_all_rooms())
+    compatible_judges = compatible_judges_dict.get(meeting_id) if compatible_judges_dict is not None else None
+    if compatible_judges is None:
+        compatible_judges = calculate_compatible_judges([meeting], schedule.get_all_judges())[meeting_id]
+    compatible_rooms = compatible_rooms_dict.get(meeting_id) if compatible_rooms_dict is not None else None
+    if compatible_rooms is None:
+        compatible_rooms = calculate_compatible_rooms([meeting], schedule.get_all_rooms())[meeting_id]
     
-    if meeting_id not in compatible_judges_dict or not compatible_judges_dict[meeting_id]:
+    if not compatible_judges:
         raise ValueError(f"No compatible judges found for meeting ID {meeting_id}.")
-    if meeting_id not in compatible_rooms_dict or not compatible_rooms_dict[meeting_id]:
+    if not compatible_rooms:
         raise ValueError(f"No compatible rooms found for meeting ID {meeting_id}.")
     
-    judge = random.choice(compatible_judges_dict[meeting_id])
-    room = random.choice(compatible_rooms_dict[meeting_id])
+    judge = random.choice(compatible_judges)
+    room = random.choice(compatible_rooms)
     
     # Randomly select a day and timeslot
     day = random.randint(1, schedule.work_days)
@@ -296,19 +274,20 @@ def generate_compound_move(
     compatible_rooms_dict: Dict[int, List[Room]],
     p_j: float = 0.5, p_r: float = 0.5, 
     p_t: float = 0.5, p_d: float = 0.5,
-    tabu_list: deque = None, current_score: int = None, 
-    best_score: int = None
+    tabu_list: TabuList = None, current_score: int = None, 
+    best_score: int = None, context: ScoringContext = None,
+    meeting_sampler: MeetingSampler = None
 ) -> Move:
     
     """Generate a compound move with inline tabu checking; fallback to single if <2 aspects."""
     if not schedule:
         raise ValueError("No schedule provided")
     chain_dict = schedule.appointment_chains
-    if not chain_dict:
+    if not chain_dict or not schedule.planned_meetings:
         raise ValueError("No appointments found in schedule")
     
-    # Pick a random meeting
-    chosen_meeting_id = random.choice(list(chain_dict.keys()))
+    # Pick a meeting, guided by the sampler if given
+    chosen_meeting_id = meeting_sampler.sample_meeting_id(schedule) if meeting_sampler is not None else random.choice(schedule.planned_meetings).meeting_id
     chosen_appointments = chain_dict[chosen_meeting_id]
     if not chosen_appointments:
         raise ValueError(f"No appointments for meeting {chosen_meeting_id}")
@@ -319,45 +298,34 @@ def generate_compound_move(
     old_day   = first_app.day
     old_slot  = first_app.timeslot_in_day
     
-    # Helper for aspiration
-    def meets_aspiration(m: Move) -> bool:
-        if current_score is None or best_score is None or tabu_list is None:
-            return False
-        if not check_if_move_is_tabu(m, tabu_list):
-            return True
-        return current_score + calculate_delta_score(schedule, m) < best_score
-    
-    # Build valid lists
-    valid_judges = []
+    # Build candidate lists. Tabu alternatives keep their move, which is only allowed if it meets the aspiration criterion
+    judge_candidates = []
     for j in compatible_judges_dict.get(chosen_meeting_id, []):
         if j.judge_id == old_judge.judge_id: continue
         key = (chosen_meeting_id, 'judge', j.judge_id)
         m = Move(chosen_meeting_id, chosen_appointments,
                  old_judge=old_judge, new_judge=j,
                  old_room=old_room, old_day=old_day, old_start_timeslot=old_slot)
-        if tabu_list is None or key not in tabu_list or meets_aspiration(m):
-            valid_judges.append(j)
-    valid_rooms = []
+        judge_candidates.append((j, None if tabu_list is None or key not in tabu_list else m))
+    room_candidates = []
     for r in compatible_rooms_dict.get(chosen_meeting_id, []):
         if r.room_id == old_room.room_id: continue
         key = (chosen_meeting_id, 'room', r.room_id)
         m = Move(chosen_meeting_id, chosen_appointments,
                  old_judge=old_judge, old_room=old_room, new_room=r,
                  old_day=old_day, old_start_timeslot=old_slot)
-        if tabu_list is None or key not in tabu_list or meets_aspiration(m):
-            valid_rooms.append(r)
-    valid_days = []
+        room_candidates.append((r, None if tabu_list is None or key not in tabu_list else m))
+    day_candidates = []
     for d in range(1, schedule.work_days + 1):
         if d == old_day: continue
         key = (chosen_meeting_id, 'position', d, old_slot)
         m = Move(chosen_meeting_id, chosen_appointments,
                  old_judge=old_judge, old_room=old_room,
                  old_day=old_day, new_day=d, old_start_timeslot=old_slot)
-        if tabu_list is None or key not in tabu_list or meets_aspiration(m):
-            valid_days.append(d)
+        day_candidates.append((d, None if tabu_list is None or key not in tabu_list else m))
     # timeslot aspect (skip 78‐slot meetings)
     meeting_length = len(chosen_appointments)
-    valid_timeslots = []
+    timeslot_candidates = []
     if meeting_length != 78:
         max_start = schedule.timeslots_per_work_day - meeting_length + 1
         for t in range(1, max_start + 1):
@@ -367,8 +335,26 @@ def generate_compound_move(
                      old_judge=old_judge, old_room=old_room,
                      old_day=old_day, old_start_timeslot=old_slot,
                      new_start_timeslot=t)
-            if tabu_list is None or key not in tabu_list or meets_aspiration(m):
-                valid_timeslots.append(t)
+            timeslot_candidates.append((t, None if tabu_list is None or key not in tabu_list else m))
+    
+    # Aspiration: a tabu alternative is allowed if check_if_move_is_tabu disagrees, or if it gives a new best score
+    aspirating = set()
+    tabu_moves = []
+    if current_score is not None and best_score is not None:
+        for candidates in (judge_candidates, room_candidates, day_candidates, timeslot_candidates):
+            for _, m in candidates:
+                if m is None:
+                    continue
+                if not check_if_move_is_tabu(m, tabu_list):
+                    aspirating.add(id(m))
+                else:
+                    tabu_moves.append(m)
+    aspirating |= _get_aspirating_moves(schedule, tabu_moves, current_score, best_score, context)
+    
+    valid_judges = [j for j, m in judge_candidates if m is None or id(m) in aspirating]
+    valid_rooms = [r for r, m in room_candidates if m is None or id(m) in aspirating]
+    valid_days = [d for d, m in day_candidates if m is None or id(m) in aspirating]
+    valid_timeslots = [t for t, m in timeslot_candidates if m is None or id(m) in aspirating]
     
     # Collect aspects
     changeable_aspects = []
@@ -381,7 +367,7 @@ def generate_compound_move(
     if len(changeable_aspects) < 2:
         return generate_single_random_move(
             schedule, compatible_judges_dict, compatible_rooms_dict,
-            tabu_list, current_score, best_score
+            tabu_list, current_score, best_score, context, meeting_sampler
         )
     
     # Now pick at least 2 aspects (by p_*, then fill to 2)
@@ -416,7 +402,17 @@ def generate_compound_move(
     
     return move
 
-def check_if_move_is_tabu(move: Move, tabu_list: deque) -> bool:
+def _get_aspirating_moves(schedule: Schedule, tabu_moves: list[Move], current_score: int, best_score: int, context: ScoringContext = None) -> set[int]:
+    """
+    The ids of the tabu moves that meet the aspiration criterion, ie. would give a new best score.
+    The moves are all alternatives on the same schedule, so they are scored in one calculate_delta_scores batch.
+    """
+    if not tabu_moves or current_score is None or best_score is None:
+        return set()
+    deltas = calculate_delta_scores(schedule, tabu_moves, context)
+    return {id(m) for m, delta in zip(tabu_moves, deltas) if current_score + delta < best_score}
+
+def check_if_move_is_tabu(move: Move, tabu_list: TabuList) -> bool:
     meeting_id = move.meeting_id
     if move.new_judge:
         if (meeting_id, 'judge', move.new_judge.judge_id) in tabu_list: return True
@@ -432,7 +428,7 @@ def check_if_move_is_tabu(move: Move, tabu_list: deque) -> bool:
 
 def pick_meeting_for_move(schedule: Schedule):
     chain_dict = schedule.appointment_chains
-    chosen_meeting_id = random.choice(list(chain_dict.keys()))
+    chosen_meeting_id = random.choice(schedule.planned_meetings).meeting_id
     
     chosen_appointments = sorted(chain_dict[chosen_meeting_id], key=lambda app: (app.day, app.timeslot_in_day))
     
@@ -441,7 +437,7 @@ def pick_meeting_for_move(schedule: Schedule):
 def generate_list_of_random_moves(schedule: Schedule,
                               compatible_judges_dict: Dict[int, List[Judge]],
                               compatible_rooms_dict: Dict[int, List[Room]],
-                              tabu_list: deque, current_score: int, best_score: int):
+                              tabu_list: TabuList, current_score: int, best_score: int, context: ScoringContext = None):
     """
     Generates a list of valid, non-Tabu moves of a randomly selected type
     for a randomly selected meeting. Includes validity checks.
@@ -500,10 +496,8 @@ def generate_list_of_random_moves(schedule: Schedule,
                 is_tabu = check_if_move_is_tabu(potential_move, tabu_list)
                 if not is_tabu:
                     valid_moves.append((potential_move, 0))
-                else:
-                    delta = calculate_delta_score(schedule, potential_move)
-                    if current_score + delta < best_score:
-                        valid_moves.append((potential_move, delta))
+                else: # scored below, together with the other tabu moves
+                    valid_moves.append((potential_move, None))
 
     # --- Room Moves ---
     elif move_type == "room":
@@ -518,10 +512,8 @@ def generate_list_of_random_moves(schedule: Schedule,
                 is_tabu = check_if_move_is_tabu(potential_move, tabu_list)
                 if not is_tabu:
                     valid_moves.append((potential_move, 0))
-                else:
-                    delta = calculate_delta_score(schedule, potential_move)
-                    if current_score + delta < best_score:
-                        valid_moves.append((potential_move, delta))
+                else: # scored below, together with the other tabu moves
+                    valid_moves.append((potential_move, None))
 
     # --- Day Moves ---
     elif move_type == "day":
@@ -537,10 +529,8 @@ def generate_list_of_random_moves(schedule: Schedule,
             is_tabu = check_if_move_is_tabu(potential_move, tabu_list)
             if not is_tabu:
                 valid_moves.append((potential_move, 0))
-            else:
-                delta = calculate_delta_score(schedule, potential_move)
-                if current_score + delta < best_score:
-                    valid_moves.append((potential_move, delta))
+            else: # scored below, together with the other tabu moves
+                valid_moves.append((potential_move, None))
 
     # --- Timeslot Moves ---
     elif move_type == "timeslot":
@@ -555,13 +545,19 @@ def generate_list_of_random_moves(schedule: Schedule,
             is_tabu = check_if_move_is_tabu(potential_move, tabu_list)
             if not is_tabu:
                 valid_moves.append((potential_move, 0))
-            else:
-                delta = calculate_delta_score(schedule, potential_move)
-                if current_score + delta < best_score:
-                    valid_moves.append((potential_move, delta))
+            else: # scored below, together with the other tabu moves
+                valid_moves.append((potential_move, None))
                 
-    # 4. Return the list
-    return valid_moves
+    # 4. Keep the tabu moves that meet the aspiration criterion. They are all scored against the same schedule, so in one batch
+    tabu_moves = [potential_move for potential_move, delta in valid_moves if delta is None]
+    if not tabu_moves:
+        return valid_moves
+    tabu_deltas = dict(zip(map(id, tabu_moves), calculate_delta_scores(schedule, tabu_moves, context)))
+    
+    # 5. Return the list
+    return [(potential_move, delta if delta is not None else tabu_deltas[id(potential_move)])
+            for potential_move, delta in valid_moves
+            if delta is not None or current_score + tabu_deltas[id(potential_move)] < best_score]
 
 def generate_random_move_of_random_type(
     schedule: Schedule, 
@@ -580,7 +576,7 @@ def generate_random_move_of_random_type(
             return generate_single_random_move(schedule, compatible_judges_dict, compatible_rooms_dict)
     elif move_type == "insert":
         try:
-            return generate_random_insert_move(schedule)
+            return generate_random_insert_move(schedule, compatible_judges_dict, compatible_rooms_dict)
         except ValueError:
             # Fallback to single move if no unplanned meetings
             return generate_single_random_move(schedule, compatible_judges_dict, compatible_rooms_dict)
@@ -606,21 +602,10 @@ def check_room_availability(schedule: Schedule, room_id: int, day: int, start_sl
     Returns:
         True if room is available for all required timeslots, False otherwise
     """
-    for slot_offset in range(duration_slots):
-        current_slot = start_slot + slot_offset
-        
-        # Check if this day/timeslot exists in schedule
-        if day in schedule.appointments_by_day_and_timeslot:
-            if current_slot in schedule.appointments_by_day_and_timeslot[day]:
-                # Check all appointments in this slot
-                for appointment in schedule.appointments_by_day_and_timeslot[day][current_slot]:
-                    if appointment.room.room_id == room_id:
-                        return False  # Room is occupied
-    
-    return True  # Room is available for all required slots
+    return schedule.is_room_available(room_id, day, start_slot, duration_slots)
 
 
-def generate_contracting_move(schedule: Schedule, debug=False) -> ContractingMove:
+def generate_contracting_move(schedule: Schedule, debug=False, context: ScoringContext = None) -> ContractingMove:
     """
     Generate a contracting move that compacts the schedule by moving meetings
     earlier in the day when possible, respecting room availability.
@@ -639,17 +624,20 @@ def generate_contracting_move(schedule: Schedule, debug=False) -> ContractingMov
         # Get all meetings for this judge, sorted by day and timeslot
         judge_meetings = []
         
-        # Collect all meetings for this judge
-        for meeting_id, appointments in schedule.appointment_chains.items():
-            if appointments and appointments[0].judge.judge_id == judge.judge_id:
-                first_app = appointments[0]
-                judge_meetings.append({
-                    'meeting_id': meeting_id,
-                    'appointments': appointments,
-                    'day': first_app.day,
-                    'start_slot': first_app.timeslot_in_day,
-                    'duration': len(appointments)
-                })
+        # Collect all meetings for this judge from the (day, judge) index. A meeting running into the next day
+        # is listed on both days, but belongs to the day (and judge) of its first appointment
+        for day in schedule.nonempty_days:
+            for meeting_id in schedule.meetings_by_judge_day.get((day, judge.judge_id), ()):
+                appointments = schedule.appointment_chains.get(meeting_id)
+                if appointments and appointments[0].judge.judge_id == judge.judge_id and appointments[0].day == day:
+                    first_app = appointments[0]
+                    judge_meetings.append({
+                        'meeting_id': meeting_id,
+                        'appointments': appointments,
+                        'day': first_app.day,
+                        'start_slot': first_app.timeslot_in_day,
+                        'duration': len(appointments)
+                    })
         
         # Sort meetings by day and start timeslot
         judge_meetings.sort(key=lambda m: (m['day'], m['start_slot']))
@@ -694,6 +682,7 @@ def generate_contracting_move(schedule: Schedule, debug=False) -> ContractingMov
                     )
                     
                     # Apply the move immediately to update schedule state
+                    prepare_move_for_running_totals(schedule, move, context)
                     do_move(move, schedule)
                     contracting_move.add_move(move)
                     
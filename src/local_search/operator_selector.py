@@ -0,0 +1,104 @@
+import random
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class OperatorStats:
+    """What an operator cost and gained. improvement is the summed score decrease of its accepted improving moves."""
+    uses: int = 0
+    evaluations: int = 0
+    accepted: int = 0
+    improving: int = 0
+    improvement: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds: float, evaluations: int, accepted: bool, improvement: int) -> None:
+        self.uses += 1
+        self.evaluations += evaluations
+        self.seconds += seconds
+        if accepted:
+            self.accepted += 1
+            if improvement > 0:
+                self.improving += 1
+                self.improvement += improvement
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.uses if self.uses else 0.0
+
+    @property
+    def improvement_per_second(self) -> float:
+        return self.improvement / self.seconds if self.seconds else 0.0
+
+    @property
+    def seconds_per_use(self) -> float:
+        return self.seconds / self.uses if self.uses else 0.0
+
+    @property
+    def seconds_per_evaluation(self) -> float:
+        return self.seconds / self.evaluations if self.evaluations else 0.0
+
+
+class AdaptiveOperatorSelector:
+    """
+    Roulette-wheel operator selection with adaptive weights, as in adaptive large neighbourhood search (ALNS).
+
+    Every use of an operator is recorded with its CPU time, number of delta evaluations, whether the result was accepted
+    and the score improvement. At the end of a segment (update_weights, e.g. once per temperature) each selectable
+    operator used in the segment moves towards its share of the segment's improvement per second:
+        weight = (1 - reaction_factor) * weight + reaction_factor * share * (summed weight of the used operators)
+    floored at min_weight, so no operator is starved for good. Operators not used in the segment keep their weight.
+    Operators that are recorded but never selected through select (e.g. contracting and R&R, which run on a schedule
+    of their own) only appear in the stats.
+    """
+
+    def __init__(self, initial_weights: dict[str, float], reaction_factor: float = 0.2, min_weight: float = 0.05):
+        total = sum(initial_weights.values())
+        self.weights: dict[str, float] = {operator: weight / total for operator, weight in initial_weights.items()}
+        self.reaction_factor: float = reaction_factor
+        self.min_weight: float = min_weight
+        self.stats: dict[str, OperatorStats] = {operator: OperatorStats() for operator in initial_weights}
+        self._segment: dict[str, OperatorStats] = {operator: OperatorStats() for operator in initial_weights}
+
+    def select(self, operators: list[str] = None) -> str:
+        """A random operator, proportional to the weights. operators limits the choice, e.g. when insert is not possible."""
+        operators = operators if operators is not None else list(self.weights)
+        return random.choices(operators, weights=[self.weights[operator] for operator in operators])[0]
+
+    def record(self, operator: str, seconds: float, evaluations: int, accepted: bool = False, improvement: int = 0) -> None:
+        """
+        Record one use of operator. evaluations is the number of delta evaluations it took (including e.g. aspiration checks),
+        improvement the decrease of the score (positive is better).
+        """
+        if operator not in self.stats:
+            self.stats[operator] = OperatorStats()
+            self._segment[operator] = OperatorStats()
+        self.stats[operator].add(seconds, evaluations, accepted, improvement)
+        self._segment[operator].add(seconds, evaluations, accepted, improvement)
+
+    def update_weights(self) -> None:
+        """Reweight the selectable operators by the improvement per second of the segment, and start a new segment."""
+        # operators not used in the segment (e.g. insert while every meeting is planned) keep their weight
+        rates = {operator: self._segment[operator].improvement_per_second for operator in self.weights if self._segment[operator].uses}
+        total_rate = sum(rates.values())
+        if total_rate > 0: # a segment without any improvement says nothing about the operators
+            used_weight = sum(self.weights[operator] for operator in rates) # redistributed among the used operators
+            for operator, rate in rates.items():
+                weight = (1 - self.reaction_factor) * self.weights[operator] + self.reaction_factor * used_weight * rate / total_rate
+                self.weights[operator] = max(weight, self.min_weight)
+            total = sum(self.weights.values())
+            self.weights = {operator: weight / total for operator, weight in self.weights.items()}
+        self._segment = {operator: OperatorStats() for operator in self.stats}
+
+    def format_stats(self) -> str:
+        """A table of the cumulative stats and current weight per operator, for the log."""
+        lines = [f"{'Operator':<20}{'Uses':>9}{'Accepted':>10}{'Improving':>11}{'Improvement':>13}{'Impr/s':>11}"
+                 f"{'Evals/use':>11}{'µs/use':>11}{'µs/eval':>11}{'Time (s)':>10}{'Weight':>8}"]
+        for operator, stats in self.stats.items():
+            weight = f"{self.weights[operator]:.2f}" if operator in self.weights else "-"
+            evaluations_per_use = stats.evaluations / stats.uses if stats.uses else 0.0
+            per_evaluation = f"{stats.seconds_per_evaluation * 1e6:.1f}" if stats.evaluations else "-"
+            lines.append(f"{operator:<20}{stats.uses:>9}{stats.acceptance_rate:>10.1%}{stats.improving:>11}{stats.improvement:>13.4g}"
+                         f"{stats.improvement_per_second:>11.4g}{evaluations_per_use:>11.2f}{stats.seconds_per_use * 1e6:>11.1f}"
+                         f"{per_evaluation:>11}{stats.seconds:>10.2f}{weight:>8}")
+        return "\n".join(lines)
@@ -0,0 +1,83 @@
+import json
+import time
+from functools import wraps
+
+
+class RuleProfiler:
+    """
+    Call counts, cumulative wall time and delta magnitudes for the scoring functions, plus do_move/undo_move counts.
+    Off by default. Every instrumented call site checks `enabled` first, so a disabled profiler costs one attribute lookup.
+    """
+
+    def __init__(self):
+        self.enabled: bool = False
+        self.stats: dict[str, dict[str, float]] = {} # function name -> {"calls", "seconds", "abs_delta"}
+
+    def reset(self) -> None:
+        self.stats = {}
+
+    def _entry(self, name: str) -> dict[str, float]:
+        entry = self.stats.get(name)
+        if entry is None:
+            entry = self.stats[name] = {"calls": 0, "seconds": 0.0, "abs_delta": 0}
+        return entry
+
+    def record_call(self, name: str, seconds: float = 0.0, delta: int = None) -> None:
+        """Count one call of a function, with the time it took and, for delta functions, the delta it returned."""
+        entry = self._entry(name)
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        if delta is not None:
+            entry["abs_delta"] += abs(delta)
+
+    def record_time(self, name: str, seconds: float) -> None:
+        """Add time to a function without counting a call, for work done on its behalf (the staged delta counts)."""
+        self._entry(name)["seconds"] += seconds
+
+    def timed(self, name: str, func, count_calls: bool = True):
+        """
+        Wrap func so the time of every call is recorded under name. With count_calls=False only the time is added, 
+        for functions whose calls are counted elsewhere (the rule delta functions, see rules_engine.calculate_delta_score).
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            if count_calls:
+                self.record_call(name, time.perf_counter() - start)
+            else:
+                self.record_time(name, time.perf_counter() - start)
+            return result
+        wrapper.profiled_function = func
+        return wrapper
+
+    def to_dict(self) -> dict[str, dict[str, float]]:
+        """Per function: calls, total seconds, average microseconds per call and average absolute delta (delta functions only)."""
+        result = {}
+        for name, entry in sorted(self.stats.items()):
+            calls = entry["calls"]
+            result[name] = {
+                "calls": calls,
+                "total_seconds": entry["seconds"],
+                "avg_microseconds": entry["seconds"] / calls * 1e6 if calls else 0.0,
+            }
+            if name.endswith("_delta"):
+                result[name]["avg_abs_delta"] = entry["abs_delta"] / calls if calls else 0.0
+        return result
+
+    def dump_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def format_table(self) -> str:
+        """The profile as a text table, slowest functions first."""
+        rows = sorted(self.to_dict().items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        lines = [f"{'function':<50} {'calls':>10} {'total s':>10} {'avg us':>10} {'avg |delta|':>12}"]
+        for name, entry in rows:
+            avg_delta = f"{entry['avg_abs_delta']:.2f}" if "avg_abs_delta" in entry else "-"
+            lines.append(f"{name:<50} {entry['calls']:>10} {entry['total_seconds']:>10.3f} {entry['avg_microseconds']:>10.1f} {avg_delta:>12}")
+        return "\n".join(lines)
+
+
+# The profiler used by rules_engine and move. Turn it on with rules_engine.enable_profiling()
+profiler = RuleProfiler()
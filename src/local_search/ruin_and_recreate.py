@@ -2,10 +2,10 @@ from src.base_model.schedule import Schedule
 from src.base_model.judge import Judge
 from src.base_model.room import Room
 from src.base_model.meeting import Meeting
-from src.base_model.compatibility_checks import initialize_compatibility_matricies
 from src.local_search.move import Move, do_move, undo_move
 from src.local_search.move_generator import generate_specific_delete_move, generate_specific_insert_move
-from src.local_search.rules_engine import calculate_delta_score, calculate_full_score, _initialize_constraint_weights
+from src.local_search.rules_engine import calculate_delta_score, calculate_delta_scores, calculate_full_score, prepare_move_for_running_totals, build_scoring_context, count_delta_evaluations
+from src.local_search.scoring_context import ScoringContext
 import random
 import multiprocessing
 from typing import List, Dict, Tuple
@@ -17,7 +17,8 @@ def apply_ruin_and_recreate(schedule: Schedule,
                             compatible_rooms_dict: dict[int, list[Room]],
                             percentage: float = 0.1, #% of all meetings
                             in_parallel: bool = True,
-                            log_file=None) -> Tuple[bool, int]:  # Changed to accept file object
+                            log_file=None,
+                            context: ScoringContext = None) -> Tuple[bool, int]:  # Changed to accept file object
     """Apply violation-based ruin and regret-based recreate.
     
     Args:
@@ -27,6 +28,7 @@ def apply_ruin_and_recreate(schedule: Schedule,
         percentage: Percentage of meetings to remove based on violations
         parallel: Whether to use parallel processing
         log_file: Open file object for logging (not a string path)
+        context: Weights and compatibility to score with. Built from the schedule if not given
 
     Returns:
         Tuple containing a boolean indicating success and the number of meetings inserted
@@ -39,10 +41,12 @@ def apply_ruin_and_recreate(schedule: Schedule,
             log_file.flush()  # Ensure data is written immediately
     
     start_time = time.time()
+    if context is None:
+        context = build_scoring_context(schedule)
 
     # Ruin phase - remove meetings with highest violations
 
-    removed_meetings = _violation_based_ruin(schedule, compatible_judges_dict, compatible_rooms_dict, percentage, in_parallel, log_output)
+    removed_meetings = _violation_based_ruin(schedule, compatible_judges_dict, compatible_rooms_dict, percentage, in_parallel, log_output, context)
     
     # Stop if no meetings were removed
     if not removed_meetings:
@@ -53,7 +57,7 @@ def apply_ruin_and_recreate(schedule: Schedule,
     
     # Recreate phase - use regret-based insertion
     recreate_start = time.time()
-    num_inserted = _regret_based_insert(schedule, compatible_judges_dict, compatible_rooms_dict, removed_meetings, in_parallel, log_output)
+    num_inserted = _regret_based_insert(schedule, compatible_judges_dict, compatible_rooms_dict, removed_meetings, in_parallel, log_output, context)
     recreate_time = time.time() - recreate_start
     
     log_output(f"Recreated {num_inserted} meetings in {recreate_time:.2f} seconds")
@@ -62,7 +66,7 @@ def apply_ruin_and_recreate(schedule: Schedule,
     # Return success status and metrics
     return (num_inserted > 0), num_inserted
 
-def _calculate_meeting_violations_parallel(args) -> Tuple[Meeting, float]:
+def _calculate_meeting_violations_parallel(args, context: ScoringContext = None) -> Tuple[Meeting, float]:
     """Helper function for parallel violation calculation.
     
     Returns:
@@ -74,18 +78,19 @@ def _calculate_meeting_violations_parallel(args) -> Tuple[Meeting, float]:
     delete_move = generate_specific_delete_move(schedule, meeting.meeting_id)
     
     # Calculate the delta score (negative delta means removing improves score)
-    delta = calculate_delta_score(schedule, delete_move)
+    delta = calculate_delta_score(schedule, delete_move, context=context if context is not None else _worker_context)
     
     # Return the meeting and improvement (negative value = higher violations)
     return meeting, delta
 
 
-def _worker_initializer(init_schedule): #NOTE We do this because spawning a subprocess with concurrent.futures.ProcessPoolExecutor initializes a new process with its own Python interpreter and global variables, which are not initialized
-    initialize_compatibility_matricies(schedule=init_schedule) 
-    _initialize_constraint_weights(schedule=init_schedule) 
-    #TODO this could be done better, using shared_memory from multiprocessing and pickle. But we do this because it works and time is money $$$
+_worker_context: ScoringContext = None # the scoring context of a process pool worker, set by _worker_initializer
 
-def _violation_based_ruin(schedule: Schedule, compatible_judges_dict: dict[int, list[Judge]], compatible_rooms_dict: dict[int, list[Room]], percentage: float, in_parallel: bool, log_output) -> List[Dict]:
+def _worker_initializer(context: ScoringContext): #NOTE a process spawned by ProcessPoolExecutor starts with its own interpreter and uninitialized globals
+    global _worker_context
+    _worker_context = context # unpickling the context is all the setup a worker needs, no matrices or weights are rebuilt
+
+def _violation_based_ruin(schedule: Schedule, compatible_judges_dict: dict[int, list[Judge]], compatible_rooms_dict: dict[int, list[Room]], percentage: float, in_parallel: bool, log_output, context: ScoringContext = None) -> List[Dict]:
     # convert percentage to int
     percentage = int(percentage * 100)
     """
@@ -115,9 +120,10 @@ def _violation_based_ruin(schedule: Schedule, compatible_judges_dict: dict[int,
         args_list = [(schedule, meeting) for meeting in planned_meetings]
         
         # Use ProcessPoolExecutor for parallel execution
-        with ProcessPoolExecutor(initializer=_worker_initializer, initargs=(schedule,)) as executor:
+        with ProcessPoolExecutor(initializer=_worker_initializer, initargs=(context,)) as executor:
             try:
                 results = list(executor.map(_calculate_meeting_violations_parallel, args_list, timeout=120))
+                count_delta_evaluations(len(args_list))
                 meeting_violations: List[Tuple[Meeting, int]] = results # List of tuples (meeting, delta)
             except TimeoutError:
                 log_output("Error: Violation calculation timed out. Proceeding with available results.")
@@ -126,7 +132,7 @@ def _violation_based_ruin(schedule: Schedule, compatible_judges_dict: dict[int,
     else:
         # Sequential calculation
         for meeting in planned_meetings:
-            violation_score = _calculate_meeting_violations_parallel((schedule, meeting))
+            violation_score = _calculate_meeting_violations_parallel((schedule, meeting), context)
             meeting_violations.append(violation_score)
     
     log_output(f"Violation calculation took {time.time() - start_time:.2f} seconds")
@@ -154,6 +160,7 @@ def _violation_based_ruin(schedule: Schedule, compatible_judges_dict: dict[int,
         
         # Create and apply delete move
         move = generate_specific_delete_move(schedule, meeting.meeting_id)
+        prepare_move_for_running_totals(schedule, move, context)
         do_move(move, schedule)
     
     return removed_meetings
@@ -191,12 +198,10 @@ def _is_position_available(schedule: Schedule, meeting, judge, room, day, start_
             return False
         
         # Check if the judge or room is already booked
-        if current_day in schedule.appointments_by_day_and_timeslot and current_timeslot in schedule.appointments_by_day_and_timeslot[current_day]:
-            for appointment in schedule.appointments_by_day_and_timeslot[current_day][current_timeslot]:
-                if appointment.judge.judge_id == judge.judge_id:
-                    return False
-                if appointment.room.room_id == room.room_id:
-                    return False
+        if not schedule.is_judge_available(judge.judge_id, current_day, current_timeslot, 1):
+            return False
+        if not schedule.is_room_available(room.room_id, current_day, current_timeslot, 1):
+            return False
     
     return True
 
@@ -214,24 +219,26 @@ def _calculate_insertion_score_parallel(args):
         start_timeslot=start_timeslot
     )
     
-    # Temporarily assign judge and room for scoring
-    original_judge = meeting.judge
-    original_room = meeting.room
-    meeting.judge = judge
-    meeting.room = room
-    
-    # Calculate score
-    delta = calculate_delta_score(schedule, temp_move)
-    
-    # Reset judge and room
-    meeting.judge = original_judge
-    meeting.room = original_room
+    # Calculate score. The meeting is still unplanned (no judge), like when the move is actually inserted
+    delta = calculate_delta_score(schedule, temp_move, context=_worker_context)
     
     return (delta, day, start_timeslot, judge, room)
 
+def _calculate_insertion_scores(schedule: Schedule, meeting, available_positions_args, context: ScoringContext = None) -> list[tuple]:
+    """
+    Serial version of _calculate_insertion_score_parallel for all candidate positions of a meeting.
+    The positions are all evaluated against the same schedule, so they are scored in one calculate_delta_scores batch.
+    """
+    temp_moves = [
+        generate_specific_insert_move(schedule=schedule, meeting=meeting, judge=judge, room=room, day=day, start_timeslot=start_timeslot)
+        for _, _, judge, room, day, start_timeslot in available_positions_args
+    ]
+    deltas = calculate_delta_scores(schedule, temp_moves, context)
+    return [(delta, day, start_timeslot, judge, room) for delta, (_, _, judge, room, day, start_timeslot) in zip(deltas, available_positions_args)]
+
 
 def _regret_based_insert(schedule: Schedule, compatible_judges_dict, compatible_rooms_dict,
-                         removed_meetings, parallel: bool, log_output) -> int:
+                         removed_meetings, parallel: bool, log_output, context: ScoringContext = None) -> int:
     """
     Insert meetings using regret-based insertion, checking availability dynamically.
     Specifically, 2-regret insert with a maintained list of best positions dynamic availability check. 
@@ -291,13 +298,12 @@ def _regret_based_insert(schedule: Schedule, compatible_judges_dict, compatible_
 
         position_scores = [] # List of tuples: (delta, day, start_timeslot, judge, room)
         if parallel and len(available_positions_args) > 10:
-            with ProcessPoolExecutor(initializer=_worker_initializer, initargs=(schedule,)) as executor:
+            with ProcessPoolExecutor(initializer=_worker_initializer, initargs=(context,)) as executor:
                 results = list(executor.map(_calculate_insertion_score_parallel, available_positions_args))
+                count_delta_evaluations(len(available_positions_args))
                 position_scores.extend(results) # results are already (delta, day, start_timeslot, judge, room)
         else:
-            for args in available_positions_args:
-                 score_result = _calculate_insertion_score_parallel(args)
-                 position_scores.append(score_result)
+            position_scores.extend(_calculate_insertion_scores(schedule, meeting, available_positions_args, context))
 
         position_scores.sort(key=lambda x: x[0]) # Sort by delta score #NOTE we dont use reverse=True, because we want the lowest delta first (negative delta = better score)
 
@@ -340,6 +346,7 @@ def _regret_based_insert(schedule: Schedule, compatible_judges_dict, compatible_
                 )
 
                 # Execute the move, modifying the schedule
+                prepare_move_for_running_totals(schedule, insertion_move, context)
                 do_move(insertion_move, schedule)
                 num_inserted += 1
                 inserted_this_meeting = True
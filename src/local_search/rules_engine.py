@@ -1,18 +1,34 @@
 import math
+import json
+import time
 from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable
 
 from src.base_model.case import Case
 from src.base_model.meeting import Meeting
 from src.base_model.schedule import Schedule
 from src.base_model.appointment import Appointment, print_appointments
-from src.base_model.compatibility_checks import check_case_judge_compatibility, check_case_room_compatibility, check_judge_room_compatibility, case_room_matrix
+from src.base_model.compatibility_checks import check_case_judge_compatibility, check_case_room_compatibility, check_judge_room_compatibility
 from src.local_search.rules_engine_helpers import *
 from src.local_search.move import Move, do_move, undo_move
+from src.local_search.profiling import profiler
+from src.local_search.scoring_context import ScoringContext
 
 hard_constraint_weight = None
 medium_constraint_weight = None 
 soft_constraint_weight = None
 
+delta_evaluation_count = 0 # moves scored by calculate_delta_score(s) in this process, see count_delta_evaluations
+
+def get_delta_evaluation_count() -> int:
+    return delta_evaluation_count
+
+def count_delta_evaluations(n: int) -> None:
+    """Add n delta evaluations to the count, for moves scored in process pool workers (which count in their own process)."""
+    global delta_evaluation_count
+    delta_evaluation_count += n
+
 def _initialize_constraint_weights(schedule: Schedule) -> None:
     """Initialize constraint weights based on schedule dimensions"""
     global hard_constraint_weight, medium_constraint_weight, soft_constraint_weight
@@ -53,40 +69,122 @@ def _calculate_constraint_weights(schedule: Schedule) -> tuple[int, int, int]:
     return hard_weight, medium_weight, soft_weight
 
 
-def calculate_full_score(schedule: Schedule) -> list[int]:
-    if hard_constraint_weight is None:
+def calculate_full_score(schedule: Schedule, running_totals: bool = False, verify: bool = False, context: ScoringContext = None) -> list[int]:
+    """
+    Args:
+        running_totals: Read the score from schedule.rule_violations, the per-rule violation counts that do_move/undo_move keep up to date
+                        from the rule deltas of calculate_delta_score. They are computed from scratch the first time (or after they were invalidated),
+                        after that the call is O(1).
+        verify: Only used with running_totals. Recompute every rule from scratch and raise an AssertionError if the running totals disagree.
+        context: Weights and compatibility to score with (see build_scoring_context). Without it the module globals are used,
+                 and the weights are initialized from this schedule the first time.
+    
+    Returns:
+        [full_score, hard_violations, medium_violations, soft_violations]
+    """
+    if context is None and hard_constraint_weight is None:
         _initialize_constraint_weights(schedule)
-    # Hard
-    hard_violations = 0
-    hard_violations += nr1_overbooked_room_in_timeslot_full(schedule)
-    hard_violations += nr2_overbooked_judge_in_timeslot_full(schedule)
-    hard_violations += nr6_virtual_room_must_have_virtual_meeting_full(schedule)
-    hard_violations += nr8_judge_skillmatch_full(schedule)
-    hard_violations += nr14_virtual_case_has_virtual_judge_full(schedule)
+    
+    if not running_totals:
+        return _score_from_rule_violations(calculate_rule_violations_full(schedule, context), context)
+    
+    if schedule.rule_violations is None:
+        schedule.rule_violations = calculate_rule_violations_full(schedule, context)
+    elif verify:
+        recomputed = calculate_rule_violations_full(schedule, context)
+        if recomputed != schedule.rule_violations:
+            raise AssertionError(f"Running rule totals {schedule.rule_violations} differ from full recomputation {recomputed}")
+    
+    return _score_from_rule_violations(schedule.rule_violations, context)
 
-    # Medium
-    medm_violations = 0
-    medm_violations += nr18_unused_timegrain_full(schedule)
+def calculate_rule_violations_full(schedule: Schedule, context: ScoringContext = None) -> dict[str, int]:
+    """Violations per enabled rule, computed from scratch."""
+    return {rule.name: rule.score_full(schedule, context) for rule in get_enabled_rules()}
 
-    # Soft
-    soft_violations = 0
-    soft_violations += nr19_case_has_specific_judge_full(schedule)
-    #soft_violations += nr20_max_weekly_coverage_full(schedule)
-    soft_violations += nr21_all_meetings_planned_for_case_full(schedule)
-    soft_violations += nr29_room_stability_per_day_full(schedule)
-    soft_violations += nr31_distance_between_meetings_full(schedule)
+def build_scoring_context(schedule: Schedule) -> ScoringContext:
+    """The weights and compatibility pairs for the schedule's problem instance. Build it once and pass it to the scoring functions."""
+    return ScoringContext.from_entities(_calculate_constraint_weights(schedule), schedule.get_all_cases(), schedule.get_all_judges(), schedule.get_all_rooms())
 
-    full_score = hard_violations * hard_constraint_weight + medm_violations * medium_constraint_weight + soft_violations * soft_constraint_weight
+def _score_from_rule_violations(rule_violations: dict[str, int], context: ScoringContext = None) -> list[int]:
+    """Weigh per-rule violations (or deltas) into [score, hard, medium, soft]."""
+    hard_violations = sum(rule_violations[rule.name] for rule in get_enabled_rules("hard"))
+    medm_violations = sum(rule_violations[rule.name] for rule in get_enabled_rules("medium"))
+    soft_violations = sum(rule_violations[rule.name] for rule in get_enabled_rules("soft"))
+    
+    if context is not None:
+        score = hard_violations * context.hard_weight + medm_violations * context.medium_weight + soft_violations * context.soft_weight
+    else:
+        score = hard_violations * hard_constraint_weight + medm_violations * medium_constraint_weight + soft_violations * soft_constraint_weight
     
-    # print(f"FULL: Hard Violations: {hard_violations}, Medium Violations: {medm_violations}, Soft Violations: {soft_violations} (including {unplanned_meetings} unplanned meetings)")  
+    # print(f"FULL: Hard Violations: {hard_violations}, Medium Violations: {medm_violations}, Soft Violations: {soft_violations}")  
     
-    return [full_score, hard_violations, medm_violations, soft_violations]
+    return [score, hard_violations, medm_violations, soft_violations]
 
-def calculate_delta_score(schedule: Schedule, move: Move) -> int:
+def calculate_delta_score(schedule: Schedule, move: Move, staged: bool = True, context: ScoringContext = None) -> int:
     """
     do the move AFTER calling this function.
     NOT BEFORE!!!
+    
+    The per-rule deltas are stored on move.rule_deltas, so do_move/undo_move can keep the running totals of the schedule up to date.
+    
+    Args:
+        staged: Evaluate all rules with a single do_move/undo_move pair (see _calculate_staged_rule_deltas).
+                If False, every nrX_*_delta function is called on its own, each doing its own do/undo.
+        context: Weights and compatibility to score with, see calculate_full_score.
+    """
+    _check_move_can_be_scored(schedule, move)
+    start = time.perf_counter() if profiler.enabled else None
+    count_delta_evaluations(1)
+    
+    # The evaluation applies and reverts the move, which must not touch the running totals
+    running_totals, schedule.rule_violations = schedule.rule_violations, None
+    try:
+        if staged:
+            rule_deltas = _calculate_staged_rule_deltas(schedule, move, context=context)
+        else:
+            rule_deltas = _calculate_per_rule_deltas(schedule, move, context)
+    finally:
+        schedule.rule_violations = running_totals
+    
+    move.rule_deltas = rule_deltas
+    if start is not None:
+        _record_delta_profile(move, rule_deltas, time.perf_counter() - start)
+    return _score_from_rule_violations(rule_deltas, context)[0]
+
+def calculate_delta_scores(schedule: Schedule, moves: list[Move], context: ScoringContext = None) -> list[int]:
+    """
+    calculate_delta_score for a list of candidate moves, all evaluated against the same schedule. None of the moves may be applied
+    in between, and at most one of them should be applied afterwards.
+    The staged "before" counts are shared: a (day, timeslot), (day, judge) or case touched by several moves is only counted once.
+    
+    Returns:
+        The delta of every move, in the same order as moves
     """
+    before_counts = {}
+    deltas = []
+    count_delta_evaluations(len(moves))
+    
+    running_totals, schedule.rule_violations = schedule.rule_violations, None
+    try:
+        for move in moves:
+            _check_move_can_be_scored(schedule, move)
+            start = time.perf_counter() if profiler.enabled else None
+            move.rule_deltas = _calculate_staged_rule_deltas(schedule, move, before_counts, context)
+            if start is not None:
+                _record_delta_profile(move, move.rule_deltas, time.perf_counter() - start)
+            deltas.append(_score_from_rule_violations(move.rule_deltas, context)[0])
+    finally:
+        schedule.rule_violations = running_totals
+    
+    return deltas
+
+def _record_delta_profile(move: Move, rule_deltas: dict[str, int], seconds: float) -> None:
+    """Count one evaluation of every rule the move affects under its delta function, with the delta it got."""
+    profiler.record_call("calculate_delta_score", seconds)
+    for rule in get_rules_affected_by_move(move):
+        profiler.record_call(rule.delta.__name__, delta=rule_deltas[rule.name])
+
+def _check_move_can_be_scored(schedule: Schedule, move: Move) -> None:
     if move is None or move.is_applied:
         raise ValueError("Move is None or already applied.")
     
@@ -95,30 +193,156 @@ def calculate_delta_score(schedule: Schedule, move: Move) -> int:
         populate_insert_move_appointments(schedule, move)
         if move.appointments is None or len(move.appointments) == 0:
             raise ValueError("Move has no appointments.")
+
+def _calculate_per_rule_deltas(schedule: Schedule, move: Move, context: ScoringContext = None) -> dict[str, int]:
+    rule_deltas = {rule.name: 0 for rule in get_enabled_rules()}
+    for rule in get_rules_affected_by_move(move):
+        rule_deltas[rule.name] = rule.score_delta(schedule, move, context)
+    return rule_deltas
+
+def prepare_move_for_running_totals(schedule: Schedule, move: Move, context: ScoringContext = None) -> None:
+    """
+    Running totals can only follow moves with known rule deltas. Call this right before do_move for moves 
+    that were not scored with calculate_delta_score (contracting, ruin and recreate).
+    Does nothing if the schedule does not keep running totals.
+    """
+    if schedule.rule_violations is not None:
+        calculate_delta_score(schedule, move, context=context)
+
+def _calculate_staged_rule_deltas(schedule: Schedule, move: Move, before_counts: dict = None, context: ScoringContext = None) -> dict[str, int]:
+    """
+    Staged delta evaluation: count the "before" contribution of every affected rule, apply the move once,
+    count the "after" contributions and revert once. Gives the same deltas as the nrX_*_delta functions,
+    which each do their own do_move/undo_move.
+    
+    Args:
+        before_counts: Optional cache of "before" counts, shared between moves evaluated against the same schedule (see calculate_delta_scores)
+        context: Weights and compatibility to score with, see calculate_full_score
+    
+    Returns:
+        Dict from rule ("nr1", "nr2", ...) to the change in violations for that rule
+    """
+    case_id = move.appointments[0].meeting.case.case_id
+    
+    old_judge_id = move.old_judge.judge_id if move.old_judge is not None else None
+    new_judge_id = move.new_judge.judge_id if move.new_judge is not None else None
+    old_room_id = move.old_room.room_id if move.old_room is not None else None
+    new_room_id = move.new_room.room_id if move.new_room is not None else None
+    
+    check_room = context.check_case_room_compatibility if context is not None else check_case_room_compatibility
+    check_judge = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
+    
+    rule_deltas = {rule.name: 0 for rule in get_enabled_rules()}
+    
+    # Only the rules that depend on what this move changes are evaluated
+    rules_to_count = set()
+    for rule in get_rules_affected_by_move(move):
+        if rule.name == "nr6": # compatibility rules only look at the move itself, no need to touch the schedule
+            rule_deltas[rule.name] = _compatibility_delta(move, check_room, case_id, old_room_id, new_room_id)
+        elif rule.name in ("nr8", "nr14"):
+            rule_deltas[rule.name] = _compatibility_delta(move, check_judge, case_id, old_judge_id, new_judge_id)
+        elif rule.name in _STAGED_COUNTED_RULES:
+            rules_to_count.add(rule.name)
+        else: # nr21 only looks at the move, rules without a staged count do their own do/undo
+            rule_deltas[rule.name] = rule.score_delta(schedule, move, context)
+    
+    if not rules_to_count:
+        return rule_deltas
+    
+    overbooking_pairs = get_affected_day_timeslot_pairs_for_overbookings(schedule, move) if rules_to_count & {"nr1", "nr2"} else set()
+    judge_day_pairs = get_affected_judge_day_pairs(schedule, move) if rules_to_count & {"nr18", "nr29", "nr31"} else set()
+    case = move.appointments[0].meeting.case
+    
+    original_work_days = schedule.work_days
+    violations_before = _count_staged_violations(schedule, rules_to_count, overbooking_pairs, judge_day_pairs, case, original_work_days, before_counts)
+    
+    do_move(move, schedule)
+    violations_after = _count_staged_violations(schedule, rules_to_count, overbooking_pairs, judge_day_pairs, case, schedule.work_days)
+    undo_move(move, schedule)
+    
+    # undoing a delete move does not extend a trimmed schedule again
+    schedule.work_days = original_work_days
+    
+    for rule in rules_to_count:
+        rule_deltas[rule] = violations_after[rule] - violations_before[rule]
+    
+    return rule_deltas
+
+# Rules that _count_staged_violations can count on the part of the schedule touched by a move
+_STAGED_COUNTED_RULES = {"nr1", "nr2", "nr18", "nr19", "nr29", "nr31"}
+
+def _count_staged_violations(schedule: Schedule, rules: set[str], overbooking_pairs: set, judge_day_pairs: set, case: Case, last_day: int, cache: dict = None) -> dict[str, int]:
+    """
+    Count the violations of the given rules, restricted to the parts of the schedule touched by a move.
+    
+    Args:
+        cache: Optional dict from (rule, key) to the count for that key. Counts found in it are reused and new counts are added,
+               so it must only be shared between calls on the same, unchanged schedule.
+    """
+    violations = {}
+    for rule in rules:
+        if rule in ("nr1", "nr2"):
+            keys = overbooking_pairs
+        elif rule == "nr19":
+            keys = (case,)
+        else:
+            keys = judge_day_pairs
         
-    # Hard rules
-    hard_violations = 0
-    hard_violations += nr1_overbooked_room_in_timeslot_delta(schedule, move)
-    hard_violations += nr2_overbooked_judge_in_timeslot_delta(schedule, move)
-    hard_violations += nr6_virtual_room_must_have_virtual_meeting_delta(schedule, move)
-    hard_violations += nr8_judge_skillmatch_delta(schedule, move)
-    hard_violations += nr14_virtual_case_has_virtual_judge_delta(schedule, move)
-
-    # Medium rules
-    medm_violations = 0
-    medm_violations += nr18_unused_timegrain_delta(schedule, move)
-
-    # Soft rules
-    soft_violations = 0  
-    soft_violations += nr19_case_has_specific_judge_delta(schedule, move)
-    #soft_violations += nr20_max_weekly_coverage_delta(schedule, move)
-    soft_violations += nr21_all_meetings_planned_for_case_delta(schedule, move)
-    soft_violations += nr29_room_stability_per_day_delta(schedule, move)
-    soft_violations += nr31_distance_between_meetings_delta(schedule, move)
-
-    delta_score = hard_constraint_weight * hard_violations + medium_constraint_weight * medm_violations + soft_constraint_weight * soft_violations
-
-    return delta_score
+        start = time.perf_counter() if profiler.enabled else None
+        total = 0
+        for key in keys:
+            if cache is None:
+                total += _count_staged_violations_for_key(schedule, rule, key, last_day)
+                continue
+            cache_key = (rule, key.case_id if rule == "nr19" else key)
+            count = cache.get(cache_key)
+            if count is None:
+                count = cache[cache_key] = _count_staged_violations_for_key(schedule, rule, key, last_day)
+            total += count
+        violations[rule] = total
+        if start is not None:
+            profiler.record_time(RULES[rule].delta.__name__, time.perf_counter() - start)
+    return violations
+
+def _count_staged_violations_for_key(schedule: Schedule, rule: str, key, last_day: int) -> int:
+    """Violations of a rule on one key: a (day, timeslot) for nr1/nr2, a case for nr19 and a (day, judge_id) for the other rules."""
+    if rule == "nr1":
+        return count_room_overbooking_for_day_timeslot(schedule, *key)
+    if rule == "nr2":
+        return count_judge_overbooking_for_day_timeslot(schedule, *key)
+    if rule == "nr19":
+        return count_judge_violations_for_case(key)
+    
+    day, judge_id = key
+    if rule == "nr18":
+        return calculate_unused_timeslots_for_all_judge_day_pairs(schedule, (key,), last_day)
+    if rule == "nr29":
+        return count_room_changes_for_day_judge_pair(schedule, day, judge_id)
+    if rule == "nr31":
+        return calculate_gaps_between_appointments(schedule, judge_id, day)
+    raise ValueError(f"Rule {rule} has no staged count")
+
+def _compatibility_delta(move: Move, check_compatibility, case_id: int, old_resource_id: int, new_resource_id: int) -> int:
+    """
+    Change in incompatible appointments when the move swaps the judge or room of a meeting.
+    check_compatibility is one of the matrix lookups from compatibility_checks.
+    """
+    n_appointments = len(move.appointments)
+    
+    if move.is_delete_move:
+        return 0 if check_compatibility(case_id, old_resource_id) else -n_appointments
+    if move.is_insert_move:
+        return 0 if check_compatibility(case_id, new_resource_id) else n_appointments
+    if new_resource_id is None:
+        return 0
+    
+    was_compatible = check_compatibility(case_id, old_resource_id)
+    is_compatible = check_compatibility(case_id, new_resource_id)
+    if was_compatible and not is_compatible: # was compatible, now incompatible => Adding violations
+        return n_appointments
+    if not was_compatible and is_compatible: # was incompatible, now compatible => Removing violations
+        return -n_appointments
+    return 0
 
  
         
@@ -128,13 +352,7 @@ def nr1_overbooked_room_in_timeslot_full(schedule: Schedule):
     """
     offset = 0
     step = 1
-    violations = 0
-    
-    for day in range(1, schedule.work_days + 1):
-        if day in schedule.appointments_by_day_and_timeslot:
-            for timeslot in range(1, schedule.timeslots_per_work_day + 1):
-                if timeslot in schedule.appointments_by_day_and_timeslot[day]:
-                    violations += count_room_overbooking_for_day_timeslot(schedule, day, timeslot)
+    violations = count_overbookings_within_schedule(schedule, schedule.overbooked_rooms_by_slot)
     
     return (offset + step * violations)
         
@@ -169,13 +387,7 @@ def nr1_overbooked_room_in_timeslot_delta(schedule: Schedule, move: Move):
 def nr2_overbooked_judge_in_timeslot_full(schedule: Schedule):
     offset = 0
     step = 1
-    violations = 0
-    
-    for day in range(1, schedule.work_days + 1):
-        if day in schedule.appointments_by_day_and_timeslot:
-            for timeslot in range(1, schedule.timeslots_per_work_day + 1):
-                if timeslot in schedule.appointments_by_day_and_timeslot[day]:
-                    violations += count_judge_overbooking_for_day_timeslot(schedule, day, timeslot)
+    violations = count_overbookings_within_schedule(schedule, schedule.overbooked_judges_by_slot)
     
     return (offset + step * violations)
 
@@ -203,42 +415,44 @@ def nr2_overbooked_judge_in_timeslot_delta(schedule: Schedule, move: Move):
     return (offset + step * (violations_after - violations_before))
     
 
-def nr6_virtual_room_must_have_virtual_meeting_full(schedule: Schedule):
+def nr6_virtual_room_must_have_virtual_meeting_full(schedule: Schedule, context: ScoringContext = None):
     offset = 0
     step = 1
+    check_compatibility = context.check_case_room_compatibility if context is not None else check_case_room_compatibility
     violations = 0
     
     for app in schedule.iter_appointments():
         meeting = app.meeting
         room = app.room
-        if not check_case_room_compatibility(meeting.case.case_id, room.room_id):
+        if not check_compatibility(meeting.case.case_id, room.room_id):
             violations += 1
 
     return (offset + step*violations)        
 
-def nr6_virtual_room_must_have_virtual_meeting_delta(schedule: Schedule, move: Move):
+def nr6_virtual_room_must_have_virtual_meeting_delta(schedule: Schedule, move: Move, context: ScoringContext = None):
     offset = 0
     step = 1
+    check_compatibility = context.check_case_room_compatibility if context is not None else check_case_room_compatibility
     
     case_id: int = move.appointments[0].meeting.case.case_id
     
     if move.is_delete_move:
         # only possible violation is if the room and meeting where previously incompatible
         # delete moves will always give no violations
-        return 0 if check_case_room_compatibility(case_id, move.old_room.room_id) else -len(move.appointments)
+        return 0 if check_compatibility(case_id, move.old_room.room_id) else -len(move.appointments)
     
     if move.is_insert_move:
         # only possible violation is if the room and meeting are incompatible after inserting
         # the meeting was unplanned before, so we don't care about the old room
-        return 0 if check_case_room_compatibility(case_id, move.new_room.room_id) else len(move.appointments)
+        return 0 if check_compatibility(case_id, move.new_room.room_id) else len(move.appointments)
     
     if not move.is_delete_move and not move.is_insert_move and move.new_room is None:
         return 0
     
     do_move(move, schedule) 
     
-    old_room_has_compatibility = check_case_room_compatibility(case_id, move.old_room.room_id)
-    new_room_has_compatibility = check_case_room_compatibility(case_id, move.new_room.room_id)
+    old_room_has_compatibility = check_compatibility(case_id, move.old_room.room_id)
+    new_room_has_compatibility = check_compatibility(case_id, move.new_room.room_id)
     
     if old_room_has_compatibility and not new_room_has_compatibility: # was compatible, now incompatible => Adding violations
         violations = len(move.appointments)
@@ -250,45 +464,47 @@ def nr6_virtual_room_must_have_virtual_meeting_delta(schedule: Schedule, move: M
     undo_move(move, schedule)
     return (offset + step*violations)
 
-def nr8_judge_skillmatch_full(schedule: Schedule):
+def nr8_judge_skillmatch_full(schedule: Schedule, context: ScoringContext = None):
     """
     Tjekker om dommeren har de nødvendige skills til at dømme en sag.
     En violation bliver tilføjet for hver appointmnent, hvor dommeren ikke har de nødvendige skills.
     """
     offset = 0
     step = 1
+    check_compatibility = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
     violations = 0
 
     for appointment in schedule.iter_appointments():
         meeting = appointment.meeting
         judge = appointment.judge
-        if not check_case_judge_compatibility(meeting.case.case_id, judge.judge_id):
+        if not check_compatibility(meeting.case.case_id, judge.judge_id):
             violations += 1
     
     return (offset + step*violations)
 
-def nr8_judge_skillmatch_delta(schedule: Schedule, move: Move):
+def nr8_judge_skillmatch_delta(schedule: Schedule, move: Move, context: ScoringContext = None):
     offset = 0
     step = 1
+    check_compatibility = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
     case_id: int = move.appointments[0].meeting.case.case_id
     
     if move.is_delete_move:
         # only possible violation is if the judge and meeting where previously incompatible
         # delete moves will always give no violations
-        return 0 if check_case_judge_compatibility(case_id, move.old_judge.judge_id) else -len(move.appointments)
+        return 0 if check_compatibility(case_id, move.old_judge.judge_id) else -len(move.appointments)
     
     if move.is_insert_move:
         # only possible violation is if the judge and meeting are incompatible after inserting
         # the meeting was unplanned before, so we don't care about the old judge
-        return 0 if check_case_judge_compatibility(case_id, move.new_judge.judge_id) else len(move.appointments)
+        return 0 if check_compatibility(case_id, move.new_judge.judge_id) else len(move.appointments)
     
     if not move.is_delete_move and not move.is_insert_move and move.new_judge is None:
         return 0
     
     do_move(move, schedule)
     
-    old_judge_has_skills = check_case_judge_compatibility(case_id, move.old_judge.judge_id)
-    new_judge_has_skills = check_case_judge_compatibility(case_id, move.new_judge.judge_id)
+    old_judge_has_skills = check_compatibility(case_id, move.old_judge.judge_id)
+    new_judge_has_skills = check_compatibility(case_id, move.new_judge.judge_id)
     
     if old_judge_has_skills and not new_judge_has_skills: # was compatible, now incompatible => Adding violations
         violations = len(move.appointments)
@@ -302,33 +518,35 @@ def nr8_judge_skillmatch_delta(schedule: Schedule, move: Move):
 
 # ...
 
-def nr14_virtual_case_has_virtual_judge_full(schedule: Schedule):
+def nr14_virtual_case_has_virtual_judge_full(schedule: Schedule, context: ScoringContext = None):
     offset = 0
     step = 1
+    check_compatibility = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
     violations = 0
     
     for app in schedule.iter_appointments():
         meeting = app.meeting
         judge = app.judge
-        if not check_case_judge_compatibility(meeting.case.case_id, judge.judge_id):
+        if not check_compatibility(meeting.case.case_id, judge.judge_id):
             violations += 1
     
     return (offset + step*violations)
 
-def nr14_virtual_case_has_virtual_judge_delta(schedule: Schedule, move: Move):
+def nr14_virtual_case_has_virtual_judge_delta(schedule: Schedule, move: Move, context: ScoringContext = None):
     offset = 0
     step = 1
+    check_compatibility = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
     case_id = move.appointments[0].meeting.case.case_id
     
     if move.is_delete_move:
         # only possible violation is if the judge and meeting where previously incompatible
         # delete moves will always give no violations
-        return 0 if check_case_judge_compatibility(case_id, move.old_judge.judge_id) else -len(move.appointments)
+        return 0 if check_compatibility(case_id, move.old_judge.judge_id) else -len(move.appointments)
     
     if move.is_insert_move:
         # only possible violation is if the judge and meeting are incompatible after inserting
         # the meeting was unplanned before, so we don't care about the old judge
-        return 0 if check_case_judge_compatibility(case_id, move.new_judge.judge_id) else len(move.appointments)
+        return 0 if check_compatibility(case_id, move.new_judge.judge_id) else len(move.appointments)
     
     if not move.is_delete_move and not move.is_insert_move and move.new_judge is None:
         return 0
@@ -338,8 +556,8 @@ def nr14_virtual_case_has_virtual_judge_delta(schedule: Schedule, move: Move):
     
     do_move(move, schedule) 
     
-    old_judge_is_virtual = check_case_judge_compatibility(case_id, move.old_judge.judge_id)
-    new_room_case_compatible = check_case_judge_compatibility(case_id, move.new_judge.judge_id)
+    old_judge_is_virtual = check_compatibility(case_id, move.old_judge.judge_id)
+    new_room_case_compatible = check_compatibility(case_id, move.new_judge.judge_id)
 
     if old_judge_is_virtual and not new_room_case_compatible: # was compatible, now incompatible => Adding violations
         violations = len(move.appointments)
@@ -367,31 +585,18 @@ def nr18_unused_timegrain_full(schedule: Schedule):
     
     judges = schedule.get_all_judges()
     last_day = schedule.work_days
+    timeslots = schedule.timeslots_per_work_day
     total_violations = 0
     
-    judges_with_appointments_on_last_day = set()
-    if last_day in schedule.appointments_by_day_and_timeslot:
-        for timeslot in schedule.appointments_by_day_and_timeslot[last_day]:
-            for app in schedule.appointments_by_day_and_timeslot[last_day][timeslot]:
-                judges_with_appointments_on_last_day.add(app.judge.judge_id)
-    
-    for day in range(1, last_day + 1):
-        for judge in judges:
-            judge_id = judge.judge_id
-            
-            if day == last_day and judge_id not in judges_with_appointments_on_last_day:
-                continue
-            
-            used_timeslots = set()
-            if day in schedule.appointments_by_day_and_timeslot:
-                for timeslot in range(1, schedule.timeslots_per_work_day + 1):
-                    if timeslot in schedule.appointments_by_day_and_timeslot[day]:
-                        for app in schedule.appointments_by_day_and_timeslot[day][timeslot]:
-                            if app.judge.judge_id == judge_id:
-                                used_timeslots.add(timeslot)
-                                break  # fandt et appointment i det her timeslot, ingen grund til at lede videre
-            
-            total_violations += schedule.timeslots_per_work_day - len(used_timeslots)
+    # every judge on every day before the last: all timeslots minus the used ones, read from the schedule's counters
+    for day in range(1, last_day):
+        total_violations += len(judges) * timeslots - schedule.used_slots_by_day.get(day, 0)
+    
+    # on the last day only judges with appointments count
+    judges_with_appointments_on_last_day = schedule.judge_appointments_by_day.get(last_day, {})
+    for judge in judges:
+        if judge.judge_id in judges_with_appointments_on_last_day:
+            total_violations += timeslots - schedule.count_used_timeslots_for_judge_day(last_day, judge.judge_id)
     
     return (offset + step * total_violations)
 
@@ -649,13 +854,9 @@ def nr29_room_stability_per_day_full(schedule: Schedule):
     step = 1
     violations = 0
     
-    day_judge_pairs = set()
-    for appointment in schedule.iter_appointments():
-        #check_app_and_meeting_same_judge_and_room(schedule, appointment.meeting)
-        day_judge_pairs.add((appointment.day, appointment.judge.judge_id))
-    
-    for day, judge_id in day_judge_pairs:
-        violations += count_room_changes_for_day_judge_pair(schedule, day, judge_id)
+    for (day, _judge_id), room_changes in schedule.room_changes_by_judge_day.items():
+        if day <= schedule.work_days:
+            violations += room_changes
     
     return (offset + step * violations)
                 
@@ -701,11 +902,10 @@ def nr31_distance_between_meetings_full(schedule: Schedule):
     step = 1
     violations = 0
     
-    violations = 0
-    
-    judges = schedule.get_all_judges()
-    for judge in judges:
-        violations += calculate_gaps_between_appointments(schedule, judge.judge_id)
+    # every judge-day with appointments has an entry in judge_day_intervals, so only those need to be visited
+    for day, judge_id in schedule.judge_day_intervals:
+        if day <= schedule.work_days:
+            violations += schedule.count_gaps_for_judge_day(day, judge_id)
     
     return (offset + step * violations)
 
@@ -737,4 +937,136 @@ def nr31_distance_between_meetings_delta(schedule: Schedule, move: Move):
     
     undo_move(move, schedule)
     
-    return (offset + step * (after_violations - before_violations))
\ No newline at end of file
+    return (offset + step * (after_violations - before_violations))
+
+
+MOVE_ASPECTS = frozenset({"judge", "room", "position", "insert", "delete"})
+RULE_CATEGORIES = ("hard", "medium", "soft")
+
+@dataclass
+class Rule:
+    """
+    A scoring rule. depends_on lists the parts of a move that can change the violations of the rule:
+    "judge", "room", "position", "insert" and "delete". Moves that change none of them skip the rule entirely.
+    """
+    name: str
+    category: str # "hard", "medium" or "soft"
+    full: Callable[[Schedule], int]
+    delta: Callable[[Schedule, Move], int]
+    depends_on: frozenset[str]
+    enabled: bool = True
+    uses_context: bool = False # full and delta take a ScoringContext as last argument (the compatibility rules)
+    
+    def __post_init__(self):
+        if self.category not in RULE_CATEGORIES:
+            raise ValueError(f"Rule {self.name} has unknown category {self.category}")
+        if not self.depends_on <= MOVE_ASPECTS:
+            raise ValueError(f"Rule {self.name} depends on unknown move aspects {set(self.depends_on - MOVE_ASPECTS)}")
+    
+    def score_full(self, schedule: Schedule, context: ScoringContext = None) -> int:
+        return self.full(schedule, context) if self.uses_context else self.full(schedule)
+    
+    def score_delta(self, schedule: Schedule, move: Move, context: ScoringContext = None) -> int:
+        return self.delta(schedule, move, context) if self.uses_context else self.delta(schedule, move)
+
+RULES: dict[str, Rule] = {rule.name: rule for rule in [
+    # Hard
+    Rule("nr1", "hard", nr1_overbooked_room_in_timeslot_full, nr1_overbooked_room_in_timeslot_delta, frozenset({"room", "position", "insert", "delete"})),
+    Rule("nr2", "hard", nr2_overbooked_judge_in_timeslot_full, nr2_overbooked_judge_in_timeslot_delta, frozenset({"judge", "position", "insert", "delete"})),
+    Rule("nr6", "hard", nr6_virtual_room_must_have_virtual_meeting_full, nr6_virtual_room_must_have_virtual_meeting_delta, frozenset({"room", "insert", "delete"}), uses_context=True),
+    Rule("nr8", "hard", nr8_judge_skillmatch_full, nr8_judge_skillmatch_delta, frozenset({"judge", "insert", "delete"}), uses_context=True),
+    Rule("nr14", "hard", nr14_virtual_case_has_virtual_judge_full, nr14_virtual_case_has_virtual_judge_delta, frozenset({"judge", "insert", "delete"}), uses_context=True),
+    # Medium
+    Rule("nr18", "medium", nr18_unused_timegrain_full, nr18_unused_timegrain_delta, frozenset({"judge", "position", "insert", "delete"})),
+    # Soft
+    Rule("nr19", "soft", nr19_case_has_specific_judge_full, nr19_case_has_specific_judge_delta, frozenset({"judge", "insert", "delete"})),
+    Rule("nr20", "soft", nr20_max_weekly_coverage_full, nr20_max_weekly_coverage_delta, frozenset({"judge", "position", "insert", "delete"}), enabled=False),
+    Rule("nr21", "soft", nr21_all_meetings_planned_for_case_full, nr21_all_meetings_planned_for_case_delta, frozenset({"insert", "delete"})),
+    Rule("nr29", "soft", nr29_room_stability_per_day_full, nr29_room_stability_per_day_delta, frozenset({"judge", "room", "position", "insert", "delete"})),
+    Rule("nr31", "soft", nr31_distance_between_meetings_full, nr31_distance_between_meetings_delta, frozenset({"judge", "position", "insert", "delete"})),
+]}
+
+_enabled_rules_cache: dict[str, list[Rule]] = {} # category (None for all) -> enabled rules
+_affected_rules_cache: dict[frozenset[str], list[Rule]] = {} # move aspects -> enabled rules depending on any of them
+
+def _clear_rule_caches() -> None:
+    """Call whenever a rule is turned on or off."""
+    _enabled_rules_cache.clear()
+    _affected_rules_cache.clear()
+
+def get_enabled_rules(category: str = None) -> list[Rule]:
+    """The enabled rules, optionally of one category. The list is cached and shared, do not modify it."""
+    rules = _enabled_rules_cache.get(category)
+    if rules is None:
+        rules = _enabled_rules_cache[category] = [rule for rule in RULES.values() if rule.enabled and (category is None or rule.category == category)]
+    return rules
+
+def get_move_aspects(move: Move) -> set[str]:
+    """The parts of the schedule a move changes, in terms of Rule.depends_on."""
+    if move.is_insert_move:
+        return {"insert"}
+    if move.is_delete_move:
+        return {"delete"}
+    
+    aspects = set()
+    if move.new_judge is not None:
+        aspects.add("judge")
+    if move.new_room is not None:
+        aspects.add("room")
+    if move.new_day is not None or move.new_start_timeslot is not None:
+        aspects.add("position")
+    return aspects
+
+def get_rules_affected_by_move(move: Move) -> list[Rule]:
+    """The enabled rules the move can change. The list is cached per set of move aspects and shared, do not modify it."""
+    aspects = frozenset(get_move_aspects(move))
+    rules = _affected_rules_cache.get(aspects)
+    if rules is None:
+        rules = _affected_rules_cache[aspects] = [rule for rule in get_enabled_rules() if rule.depends_on & aspects]
+    return rules
+
+def set_rule_enabled(name: str, enabled: bool) -> None:
+    """
+    Turn a rule on or off. Do this before scoring starts: running totals built with a different set of rules are not valid anymore.
+    """
+    if name not in RULES:
+        raise ValueError(f"Unknown rule {name}. Known rules: {', '.join(RULES)}")
+    RULES[name].enabled = enabled
+    _clear_rule_caches()
+
+def load_rule_config(path: str) -> None:
+    """
+    Enable/disable rules from a JSON file mapping rule names to booleans, e.g. {"nr20": true, "nr29": false}.
+    Rules not mentioned keep their current setting.
+    """
+    with open(path, 'r') as f:
+        config = json.load(f)
+    
+    for name, enabled in config.items():
+        if not isinstance(enabled, bool):
+            raise ValueError(f"Rule {name} must be set to true or false, got {enabled!r}")
+        set_rule_enabled(name, enabled)
+
+def enable_profiling(reset: bool = True) -> None:
+    """
+    Start recording call counts, wall time and delta magnitudes of the rule functions (see profiling.RuleProfiler).
+    The full and delta functions of the registry are wrapped with timers, which disable_profiling removes again.
+    Moves scored by calculate_delta_score count as one call of the delta function of every rule they affect.
+    """
+    if reset:
+        profiler.reset()
+    if profiler.enabled:
+        return
+    profiler.enabled = True
+    for rule in RULES.values():
+        rule.full = profiler.timed(rule.full.__name__, rule.full)
+        rule.delta = profiler.timed(rule.delta.__name__, rule.delta, count_calls=False)
+
+def disable_profiling() -> None:
+    """Stop recording. The recorded profile stays available in profiler until the next enable_profiling."""
+    if not profiler.enabled:
+        return
+    profiler.enabled = False
+    for rule in RULES.values():
+        rule.full = rule.full.profiled_function
+        rule.delta = rule.delta.profiled_function
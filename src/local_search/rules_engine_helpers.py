@@ -6,37 +6,23 @@ from src.base_model.case import Case
 from collections import defaultdict
 
 def count_room_changes_for_day_judge_pair(schedule: Schedule, day: int, judge_id: int):
-    # Get all appointments for this judge on this day
-    appointments_in_day_for_judge = get_appointments_in_timeslot_range_in_day(
-        schedule=schedule,
-        day=day,
-        start_timeslot=1,
-        end_timeslot=schedule.timeslots_per_work_day,
-        judge_id=judge_id
-    )
-    
-    # Group room IDs by timeslotsnake
-    rooms_by_timeslot = defaultdict(set)
-    for app in appointments_in_day_for_judge:
-        rooms_by_timeslot[app.timeslot_in_day].add(app.room.room_id)
-    
-    # Get occupied timeslots and sort them
-    occupied_timeslots = sorted(rooms_by_timeslot.keys())
-    
-    # Early return if fewer than 2 occupied timeslots
-    if len(occupied_timeslots) < 2:
-        return 0
-    
-    violations = 0
-    prev_rooms = rooms_by_timeslot[occupied_timeslots[0]]
-    
-    for timeslot in occupied_timeslots[1:]:
-        current_rooms = rooms_by_timeslot[timeslot]
-        if prev_rooms != current_rooms:
-            violations += 1
-        prev_rooms = current_rooms
-    
-    return violations
+    # Kept up to date by the schedule whenever an appointment of this judge-day is added or removed
+    return schedule.room_changes_by_judge_day.get((day, judge_id), 0)
+
+def count_judge_violations_for_case(case: Case) -> int:
+    """
+    Count how many extra judges a case is spread across. Every unplanned meeting counts as an extra judge.
+    """
+    unplanned_meetings = 0
+    judges_set = set()
+    for meeting in case.meetings:
+        if meeting.judge is None:
+            unplanned_meetings += 1
+        else:
+            judges_set.add(meeting.judge)
+    
+    n_judges = len(judges_set) + unplanned_meetings
+    return n_judges - 1 if n_judges > 1 else 0
 
 def get_affected_judge_day_pairs(schedule: Schedule, move: Move) -> set:
     affected_pairs = set()
@@ -63,63 +49,72 @@ def get_affected_judge_day_pairs(schedule: Schedule, move: Move) -> set:
              affected_pairs.add((old_day, new_judge.judge_id))
              affected_pairs.add((new_day, old_judge.judge_id))
 
-    # Calculate the new_last_day if we're deleting from the end
-    new_last_day = original_work_days
-    
-    if move.is_delete_move and old_day == original_work_days:
-        # Check if we're removing the only meeting on the last day
-        other_meetings_on_last_day = False
-        if original_work_days in schedule.appointments_by_day_and_timeslot:
-            for ts_apps in schedule.appointments_by_day_and_timeslot[original_work_days].values():
-                if any(app not in move.appointments for app in ts_apps):
-                    other_meetings_on_last_day = True
-                    break
-        
-        if not other_meetings_on_last_day:
-            # Find the new last day by working backwards
-            new_last_day = original_work_days - 1
-            while new_last_day > 0:
-                has_meetings = False
-                if new_last_day in schedule.appointments_by_day_and_timeslot:
-                    for ts, apps in schedule.appointments_by_day_and_timeslot[new_last_day].items():
-                        if apps:
-                            has_meetings = True
-                            break
-                if has_meetings:
-                    break
-                new_last_day -= 1
-            
-            # All judges are affected for all trimmed days
-            all_judges = schedule.get_all_judges()
-            for day in range(new_last_day + 1, original_work_days + 1):
-                for judge in all_judges:
-                    affected_pairs.add((day, judge.judge_id))
-            
-            # Also add the new last day for all judges (it's now the boundary)
-            if new_last_day > 0:
-                for judge in all_judges:
-                    affected_pairs.add((new_last_day, judge.judge_id))
+    # Days the appointments are spread over, a meeting can run past the end of its start day
+    for app in move.appointments:
+        affected_pairs.add((app.day, app.judge.judge_id))
+    if not move.is_delete_move and not move.is_insert_move:
+        for day in get_days_after_move(schedule, move):
+            affected_pairs.add((day, new_judge.judge_id))
+
+    # The move can trim or extend the schedule. Every judge is affected on the days between the old and the new last day,
+    # since those days change between being counted in full, being the last day and not being counted at all
+    new_last_day = get_last_day_after_move(schedule, move)
+    if new_last_day != original_work_days:
+        all_judges = schedule.get_all_judges()
+        for day in range(max(min(new_last_day, original_work_days), 1), max(new_last_day, original_work_days) + 1):
+            for judge in all_judges:
+                affected_pairs.add((day, judge.judge_id))
 
     return affected_pairs
 
 
 
+def get_days_after_move(schedule: Schedule, move: Move) -> set[int]:
+    """The days the move's appointments are on after a regular move, without applying it."""
+    if move.new_day is None and move.new_start_timeslot is None:
+        return {app.day for app in move.appointments}
+    
+    start_day = move.new_day if move.new_day is not None else move.old_day
+    start_timeslot = move.new_start_timeslot if move.new_start_timeslot is not None else move.old_start_timeslot
+    first_global_timeslot = (start_day - 1) * schedule.timeslots_per_work_day + start_timeslot
+    last_global_timeslot = first_global_timeslot + len(move.appointments) - 1
+    first_day = (first_global_timeslot - 1) // schedule.timeslots_per_work_day + 1
+    last_day = (last_global_timeslot - 1) // schedule.timeslots_per_work_day + 1
+    return set(range(first_day, last_day + 1))
+
+def get_last_day_after_move(schedule: Schedule, move: Move) -> int:
+    """
+    The schedule's work_days after do_move, without applying the move. Reads the schedule's per-day appointment counts,
+    so it only steps over the days the move's own appointments are on.
+    """
+    # the last non-empty day, not counting the move's appointments
+    move_appointments_per_day = {}
+    if not move.is_insert_move:
+        for app in move.appointments:
+            move_appointments_per_day[app.day] = move_appointments_per_day.get(app.day, 0) + 1
+    
+    last_day = schedule.get_last_nonempty_day(schedule.work_days)
+    while last_day > 0 and schedule.appointments_per_day.get(last_day, 0) <= move_appointments_per_day.get(last_day, 0):
+        last_day = schedule.get_last_nonempty_day(last_day - 1)
+    
+    # the days the appointments end up on
+    if move.is_insert_move:
+        last_day = max([last_day] + [app.day for app in move.appointments])
+    elif not move.is_delete_move:
+        last_day = max(last_day, max(get_days_after_move(schedule, move)))
+    
+    if schedule.work_days == 1 or last_day > schedule.work_days:
+        return max(last_day, schedule.work_days) # do_move only trims schedules longer than one day
+    return max(last_day, 1)
+
 def count_unused_timeslots_in_day_for_judge_day_pair(schedule: Schedule, day: int, judge_id: int, is_last_day: bool) -> int:
-    used_timeslots = set()
-    
-    if day in schedule.appointments_by_day_and_timeslot:
-        for timeslot in range(1, schedule.timeslots_per_work_day + 1):
-            if timeslot in schedule.appointments_by_day_and_timeslot[day]:
-                for app in schedule.appointments_by_day_and_timeslot[day][timeslot]:
-                    if app.judge.judge_id == judge_id: # TODO vi kunne nok spare nogle loops her, ved at opbevare appointments i en dict med judge_id som key
-                        used_timeslots.add(timeslot)
-                        break
+    used_timeslots = schedule.count_used_timeslots_for_judge_day(day, judge_id)
     
     # hvis det er sidste dag og judge ikke har nogle appointments, så tæller vi ingen unused timeslots
     if is_last_day and not used_timeslots:
         return 0
     
-    return schedule.timeslots_per_work_day - len(used_timeslots)
+    return schedule.timeslots_per_work_day - used_timeslots
 
 
 def calculate_unused_timeslots_for_all_judge_day_pairs(schedule: Schedule, affected_pairs: set, current_last_day: int) -> int:
@@ -208,28 +203,22 @@ def get_affected_day_timeslot_pairs_for_overbookings(schedule: Schedule, move: M
     return affected_pairs
 
 def count_room_overbooking_for_day_timeslot(schedule: Schedule, day: int, timeslot: int) -> int:
-    if day not in schedule.appointments_by_day_and_timeslot or timeslot not in schedule.appointments_by_day_and_timeslot[day]:
-        return 0
-    
-    room_usage = {}
-    for app in schedule.appointments_by_day_and_timeslot[day][timeslot]:
-        room_id = app.room.room_id
-        room_usage[room_id] = room_usage.get(room_id, 0) + 1
-    
     # design choice: each room used more than once is 1 violation
-    return sum(1 for count in room_usage.values() if count > 1)
+    # read from the occupancy counters maintained by the schedule, so this is O(1) regardless of how full the timeslot is
+    return schedule.overbooked_rooms_by_slot.get((day, timeslot), 0)
 
 def count_judge_overbooking_for_day_timeslot(schedule: Schedule, day: int, timeslot: int) -> int:
-    if day not in schedule.appointments_by_day_and_timeslot or timeslot not in schedule.appointments_by_day_and_timeslot[day]:
-        return 0
-    
-    judge_usage = {}
-    for app in schedule.appointments_by_day_and_timeslot[day][timeslot]:
-        judge_id = app.judge.judge_id
-        judge_usage[judge_id] = judge_usage.get(judge_id, 0) + 1
+    # design choice: each judge used more than once is 1 violation
+    return schedule.overbooked_judges_by_slot.get((day, timeslot), 0)
 
-    # design choice: each room used more than once is 1 violation
-    return sum(1 for count in judge_usage.values() if count > 1)
+def count_overbookings_within_schedule(schedule: Schedule, overbooked_by_slot: dict[tuple[int, int], int]) -> int:
+    """
+    Sums the overbooking counters over the timeslots that are inside the schedule, 
+    i.e. day <= work_days and timeslot <= timeslots_per_work_day.
+    Only visits timeslots that actually have an overbooking.
+    """
+    return sum(count for (day, timeslot), count in overbooked_by_slot.items()
+               if day <= schedule.work_days and timeslot <= schedule.timeslots_per_work_day)
 
 
 def calculate_gaps_between_appointments(schedule: Schedule, judge_id: int, specific_day: int = None):
@@ -249,34 +238,11 @@ def calculate_gaps_between_appointments(schedule: Schedule, judge_id: int, speci
     Returns:
         The total number of gaps across all specified days
     """
-    total_gaps = 0
+    if specific_day is not None:
+        return schedule.count_gaps_for_judge_day(specific_day, judge_id)
     
-    days_to_process = [specific_day] if specific_day is not None else range(1, schedule.work_days + 1)
-    
-    for current_day in days_to_process:
-        day_appointments = get_appointments_in_timeslot_range_in_day(
-            schedule, current_day, 1, schedule.timeslots_per_work_day, judge_id
-        )
-        
-        if day_appointments:
-            # Get sorted list of occupied timeslots
-            occupied_timeslots = sorted({app.timeslot_in_day for app in day_appointments})
-            
-            # Count gaps
-            gaps = 0
-            
-            # Check if there's a gap from start of day to first meeting
-            if occupied_timeslots[0] > 1:
-                gaps += 1
-                
-            # Count gaps between meetings
-            for i in range(1, len(occupied_timeslots)):
-                if occupied_timeslots[i] > occupied_timeslots[i-1] + 1:
-                    gaps += 1
-            
-            total_gaps += gaps
-    
-    return total_gaps
+    # Read from the per (day, judge) occupied intervals the schedule keeps, instead of scanning the timeslots of every day
+    return sum(schedule.count_gaps_for_judge_day(day, judge_id) for day in range(1, schedule.work_days + 1))
                 
 def populate_insert_move_appointments(schedule: Schedule, move: Move) -> None:
     """
@@ -290,12 +256,7 @@ def populate_insert_move_appointments(schedule: Schedule, move: Move) -> None:
     """
     move.appointments.clear()
     # Find the meeting in unplanned meetings (for reference only)
-    meeting = None
-    for m in schedule.get_all_unplanned_meetings():
-        if m.meeting_id == move.meeting_id:
-            meeting = m
-            break
-            
+    meeting = schedule.get_unplanned_meeting(move.meeting_id)
     if meeting is None:
         raise ValueError(f"Meeting {move.meeting_id} not found in unplanned meetings")
         
@@ -396,16 +357,8 @@ def count_weekly_coverage_for_judge_week(schedule: Schedule, judge_id: int, week
     if total_timeslots == 0:
         return (0, 0)  # Avoid division by zero
     
-    # Count unique timeslots where the judge has appointments
-    occupied_timeslots = set()
-    
-    for day in range(start_day, end_day + 1):
-        if day in schedule.appointments_by_day_and_timeslot:
-            for timeslot in schedule.appointments_by_day_and_timeslot[day]:
-                for app in schedule.appointments_by_day_and_timeslot[day][timeslot]:
-                    if app.judge.judge_id == judge_id:
-                        occupied_timeslots.add((day, timeslot))
-                        break  # Only count each timeslot once
+    # Count unique timeslots where the judge has appointments, from the per (day, judge) counters
+    occupied_timeslots = sum(schedule.count_used_timeslots_for_judge_day(day, judge_id) for day in range(start_day, end_day + 1))
     
-    return (len(occupied_timeslots), total_timeslots)
+    return (occupied_timeslots, total_timeslots)
 
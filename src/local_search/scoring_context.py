@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+from src.base_model.case import Case
+from src.base_model.judge import Judge
+from src.base_model.room import Room
+from src.base_model.compatibility_checks import case_judge_compatibility_mask, case_room_compatibility_mask, judge_room_compatibility_mask
+
+
+@dataclass(frozen=True)
+class ScoringContext:
+    """
+    Everything the rules engine needs besides the schedule itself: the constraint weights and the compatibility of every
+    (case, judge), (case, room) and (judge, room) pair. Immutable and picklable, so it can be built once per problem instance,
+    handed to process pool workers and shared by several schedules scored in the same process.
+    Build it with rules_engine.build_scoring_context(schedule).
+
+    The scoring functions take it as an optional context argument. Without one they fall back to the module globals in
+    rules_engine (weights) and compatibility_checks (matrices).
+    """
+    hard_weight: int
+    medium_weight: int
+    soft_weight: int
+    compatible_case_judges: frozenset[tuple[int, int]] # (case_id, judge_id) pairs that are compatible
+    compatible_case_rooms: frozenset[tuple[int, int]] # (case_id, room_id)
+    compatible_judge_rooms: frozenset[tuple[int, int]] # (judge_id, room_id)
+
+    @classmethod
+    def from_entities(cls, weights: tuple[int, int, int], cases: list[Case], judges: list[Judge], rooms: list[Room]) -> "ScoringContext":
+        hard_weight, medium_weight, soft_weight = weights
+        return cls(
+            hard_weight=hard_weight,
+            medium_weight=medium_weight,
+            soft_weight=soft_weight,
+            compatible_case_judges=_compatible_pairs(case_judge_compatibility_mask(cases, judges), [case.case_id for case in cases], [judge.judge_id for judge in judges]),
+            compatible_case_rooms=_compatible_pairs(case_room_compatibility_mask(cases, rooms), [case.case_id for case in cases], [room.room_id for room in rooms]),
+            compatible_judge_rooms=_compatible_pairs(judge_room_compatibility_mask(judges, rooms), [judge.judge_id for judge in judges], [room.room_id for room in rooms]),
+        )
+
+    # Same signatures as the check_*_compatibility functions in compatibility_checks, so they can be used interchangeably
+    def check_case_judge_compatibility(self, case_id: int, judge_id: int) -> bool:
+        return (case_id, judge_id) in self.compatible_case_judges
+
+    def check_case_room_compatibility(self, case_id: int, room_id: int) -> bool:
+        return (case_id, room_id) in self.compatible_case_rooms
+
+    def check_judge_room_compatibility(self, judge_id: int, room_id: int) -> bool:
+        return (judge_id, room_id) in self.compatible_judge_rooms
+
+
+def _compatible_pairs(mask, row_ids: list[int], column_ids: list[int]) -> frozenset[tuple[int, int]]:
+    rows, columns = mask.nonzero()
+    return frozenset((row_ids[row], column_ids[column]) for row, column in zip(rows.tolist(), columns.tolist()))
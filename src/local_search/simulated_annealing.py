@@ -5,7 +5,6 @@ import time
 import multiprocessing
 from copy import deepcopy
 from typing import Dict, List
-from collections import deque
 from src.local_search.ScheduleSnapshot import ScheduleSnapshot
 
 from src.base_model.schedule import Schedule
@@ -14,14 +13,17 @@ from src.base_model.room import Room
 from src.base_model.compatibility_checks import calculate_compatible_judges, calculate_compatible_rooms
 from src.local_search.move import do_move, undo_move, Move
 from src.local_search.move_generator import generate_single_random_move, generate_list_of_random_moves, generate_compound_move, generate_specific_delete_move, generate_random_insert_move, generate_contracting_move
-from src.local_search.rules_engine import calculate_full_score, calculate_delta_score
+from src.local_search.rules_engine import calculate_full_score, calculate_delta_score, calculate_delta_scores, build_scoring_context, get_delta_evaluation_count
 from src.local_search.ruin_and_recreate import apply_ruin_and_recreate
+from src.local_search.meeting_sampler import MeetingSampler
+from src.local_search.operator_selector import AdaptiveOperatorSelector
+from src.local_search.tabu_list import TabuList
 from src.util.schedule_visualizer import visualize
-from src.local_search.rules_engine import _calculate_constraint_weights
+from src.local_search.profiling import profiler
 
 random.seed(13062025)
 
-def _add_move_to_tabu_list(move: Move, tabu_list: deque) -> None:
+def _add_move_to_tabu_list(move: Move, tabu_list: TabuList) -> None:
     """
     Adds the reverse of the accepted move to the tabu list.
     """
@@ -44,6 +46,15 @@ def _add_move_to_tabu_list(move: Move, tabu_list: deque) -> None:
          tabu_list.append(tabu_item)
          # print(f"DEBUG: Adding Tabu: {tabu_item}") # Optional debug print
          
+def _report_profile(log_output, profile_output_path: str = None) -> None:
+    """Log the rule profile and optionally write it as JSON. Does nothing when profiling is off."""
+    if not profiler.enabled:
+        return
+    log_output("Rule profile:\n" + profiler.format_table())
+    if profile_output_path:
+        profiler.dump_json(profile_output_path)
+        log_output(f"Rule profile written to {profile_output_path}")
+
 def _calculate_cooling_rate(K: int, start_temperature: float, end_temperature: float) -> float:
     """
     Calculate the cooling rate alpha for simulated annealing.
@@ -75,7 +86,28 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
                        ruin_percentage_min: float = 0.002, ruin_percentage_max: float = 0.015,
                        K: int = 75,
                        tabu_tenure: int = 20,
-                       log_file_path: str = None) -> Schedule:
+                       log_file_path: str = None,
+                       verify_running_totals: bool = False,
+                       candidate_moves_per_step: int = 1,
+                       guided_meeting_fraction: float = 0.5,
+                       adaptive_operator_selection: bool = False,
+                       operator_reaction_factor: float = 0.2,
+                       profile_output_path: str = None) -> Schedule:
+    """
+    Args:
+        verify_running_totals: Recompute the full score from scratch at every score check between phases and assert
+                               that it matches the running rule totals (slow, for debugging).
+        candidate_moves_per_step: Generate this many candidate moves per step and only consider the best one for acceptance (best-of-N).
+                                  The candidates are scored in one calculate_delta_scores batch. 1 is plain simulated annealing.
+        guided_meeting_fraction: Share of the single and compound moves whose meeting is drawn proportionally to its violations
+                                 (see MeetingSampler) instead of uniformly. 0 is uniform selection.
+        adaptive_operator_selection: Pick insert, single and compound moves with weights adapted online to each operator's
+                                     improvement per second (see AdaptiveOperatorSelector), instead of the fixed per temperature
+                                     band probabilities. The per-operator stats are logged at the end of the run either way.
+        operator_reaction_factor: How fast the adaptive operator weights follow the last temperature's results (0 to 1).
+        profile_output_path: If profiling is enabled (rules_engine.enable_profiling), the per-rule profile is written to this JSON file
+                             at the end of the run. The profile is always added to the log when profiling is enabled.
+    """
     from copy import deepcopy
     start_time = time.time()
     
@@ -94,21 +126,25 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
             log_file.write(message + "\n")
             log_file.flush()  # Ensure data is written immediately
     
-    meetings = schedule.get_all_planned_meetings()
+    meetings = schedule.get_all_planned_meetings() + list(schedule.get_all_unplanned_meetings()) # the unplanned ones for the insert moves
     judges = schedule.get_all_judges()
     rooms = schedule.get_all_rooms() 
     
     compatible_judges = calculate_compatible_judges(meetings, judges)
     compatible_rooms = calculate_compatible_rooms(meetings, rooms)
     
+    # Weights and compatibility are fixed for the run, so they are built once and passed to every scoring call (and the R&R workers)
+    context = build_scoring_context(schedule)
+    meeting_sampler = MeetingSampler(schedule, guided_meeting_fraction, context) if guided_meeting_fraction > 0 else None
 
-    current_score, hard_violations, medium_violations, soft_violations = calculate_full_score(schedule)
+    # Keep running rule totals on the schedule, so the score checks between phases are O(1)
+    current_score, hard_violations, medium_violations, soft_violations = calculate_full_score(schedule, running_totals=True, verify=verify_running_totals, context=context)
     initial_score = [current_score, hard_violations, medium_violations, soft_violations]
     best_score = current_score
     current_temperature = start_temp
     best_schedule_snapshot = ScheduleSnapshot(schedule)
 
-    hard_weight, medium_weight, soft_weight = _calculate_constraint_weights(schedule)
+    hard_weight, medium_weight, soft_weight = context.hard_weight, context.medium_weight, context.soft_weight
     
     full_temp_range = start_temp - end_temp
     high_temp_threshold = full_temp_range * high_temp_threshold_pct # from 50% to 100% of the temperature range
@@ -118,10 +154,14 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
     plateau_count = 0
     cooling_rate = _calculate_cooling_rate(K, start_temp, end_temp)  # Initial cooling rate # K is 100
     
-    tabu_list = deque(maxlen=tabu_tenure)
+    tabu_list = TabuList(tabu_tenure)
+    p_attempt_insert = 0.1
+    operator_selector = AdaptiveOperatorSelector({"insert": p_attempt_insert,
+                                                  "single": (1 - p_attempt_insert) * (1 - high_temp_compound_prob),
+                                                  "compound": (1 - p_attempt_insert) * high_temp_compound_prob},
+                                                 reaction_factor=operator_reaction_factor)
     time_used = 0
     current_iteration = 0
-    p_attempt_insert = 0.1
     #plateau_count_min, plateau_count_max = 3, 10
     #ruin_percentage_min, ruin_percentage_max = 0.01, 0.05
     
@@ -134,6 +174,38 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
     log_output(f"Initial score: {current_score}")
     log_output(f"Initial violations - Hard: {hard_violations}, Medium: {medium_violations}, Soft: {soft_violations}")
 
+    def generate_move() -> tuple[str, Move]:
+        """
+        A random insert, single or compound move and the name of its operator. The operator is picked by the operator selector
+        if adaptive_operator_selection is on, otherwise with the fixed probabilities of the current temperature band.
+        """
+        def single_or_compound() -> str:
+            if adaptive_operator_selection:
+                return operator_selector.select(["single", "compound"])
+            if current_temperature > high_temp_threshold: # HIGH TEMP
+                p_do_compound_move = high_temp_compound_prob
+            elif medium_temp_threshold < current_temperature < high_temp_threshold: # MEDIUM TEMP
+                p_do_compound_move = medium_temp_compound_prob
+            else: # LOW TEMP
+                p_do_compound_move = low_temp_compound_prob
+            return "compound" if random.random() < p_do_compound_move else "single"
+
+        # After RnR, we risk having unplanned meetings due to the regret based insertion strategy. Therefore we look at the unplanned meetings, and try to generate insert moves if its not empty.
+        if adaptive_operator_selection:
+            operator = operator_selector.select(["insert", "single", "compound"] if schedule.unplanned_meetings else ["single", "compound"])
+        else:
+            operator = "insert" if schedule.unplanned_meetings and random.random() < p_attempt_insert else single_or_compound()
+
+        if operator == "insert":
+            try:
+                return operator, generate_random_insert_move(schedule, compatible_judges, compatible_rooms)
+            except ValueError: # Handle case where insert move generation fails
+                operator = single_or_compound()
+        if operator == "compound":
+            p_j, p_r, p_t, p_d = 0.5, 0.5, 0.5, 0.5
+            return operator, generate_compound_move(schedule, compatible_judges, compatible_rooms, p_j, p_r, p_t, p_d, tabu_list, current_score, best_score, context, meeting_sampler)
+        return operator, generate_single_random_move(schedule, compatible_judges, compatible_rooms, tabu_list, current_score, best_score, context, meeting_sampler)
+    
     while time_used < max_time_seconds:
         time_used = time.time() - start_time
             
@@ -152,11 +224,14 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
             # log_output(f"Applying contracting move at start of iteration {current_iteration + 1}...")
             pre_contract_score = current_score
             
-            contracting_move = generate_contracting_move(schedule, debug=False)
-            post_contract_score = calculate_full_score(schedule)[0]
+            operator_start, evaluations_start = time.perf_counter(), get_delta_evaluation_count()
+            contracting_move = generate_contracting_move(schedule, debug=False, context=context)
+            post_contract_score = calculate_full_score(schedule, running_totals=True, verify=verify_running_totals, context=context)[0]
             
             # Always accept contracting move if it improves the score
             if post_contract_score < pre_contract_score:
+                operator_selector.record("contracting", time.perf_counter() - operator_start, get_delta_evaluation_count() - evaluations_start,
+                                         accepted=True, improvement=pre_contract_score - post_contract_score)
                 current_score = post_contract_score
                 log_output(f"Contracting move accepted: {pre_contract_score} -> {post_contract_score} "
                           f"(Δ: {post_contract_score - pre_contract_score}, "
@@ -174,53 +249,35 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
                 # Contracting move didn't improve - undo it
                 from src.local_search.move import undo_contracting_move
                 undo_contracting_move(contracting_move, schedule)
+                operator_selector.record("contracting", time.perf_counter() - operator_start, get_delta_evaluation_count() - evaluations_start)
                 log_output(f"Contracting move rejected: no improvement "
                           f"(moves: {len(contracting_move.individual_moves)}, "
                           f"skipped: {len(contracting_move.skipped_meetings)})")
+            if meeting_sampler:
+                meeting_sampler.rebuild(schedule)
         
         for i in range(iterations_per_temperature):
-            move = None
-            if schedule.unplanned_meetings and random.random() < p_attempt_insert: # After RnR, we risk having unplanned meetings due to the regret based insertion strategy. Therefore we look at the unplanned meetings, and try to generate insert moves if its not empty.
-                try:
-                    move = generate_random_insert_move(schedule)
-                except ValueError: # Handle case where insert move generation fails
-                    move = None
-
-            if move is None: # No insert move was generated, so we generate a random single or compound move
-                # HIGH TEMP
-                if current_temperature > high_temp_threshold: 
-                    p_do_compound_move = high_temp_compound_prob  # Use parameter instead of hardcoded 0.2
-                    if random.random() < p_do_compound_move: 
-                        # compound move
-                        p_j, p_r, p_t, p_d = 0.5, 0.5, 0.5, 0.5
-                        move = generate_compound_move(schedule, compatible_judges, compatible_rooms, p_j, p_r, p_t, p_d, tabu_list, current_score, best_score)
-                    else: 
-                        # single move
-                        move = generate_single_random_move(schedule, compatible_judges, compatible_rooms, tabu_list, current_score, best_score)
-                        
-                # MEDIUM TEMP
-                elif medium_temp_threshold < current_temperature < high_temp_threshold: 
-                    p_do_compound_move = medium_temp_compound_prob  # Use parameter instead of hardcoded 0.6
-                    if random.random() < p_do_compound_move: 
-                        # compound move
-                        p_j, p_r, p_t, p_d = 0.5, 0.5, 0.5, 0.5
-                        move = generate_compound_move(schedule, compatible_judges, compatible_rooms, p_j, p_r, p_t, p_d, tabu_list, current_score, best_score)
-                    else: 
-                        # single move
-                        move = generate_single_random_move(schedule, compatible_judges, compatible_rooms, tabu_list, current_score, best_score)
-                        
-                # LOW TEMP
-                else: 
-                    p_do_compound_move = low_temp_compound_prob  # Use parameter instead of hardcoded 0.8
-                    if random.random() < p_do_compound_move: 
-                        # compound move
-                        p_j, p_r, p_t, p_d = 0.5, 0.5, 0.5, 0.5
-                        move = generate_compound_move(schedule, compatible_judges, compatible_rooms, p_j, p_r, p_t, p_d, tabu_list, current_score, best_score)
-                    else: 
-                        # single move
-                        move = generate_single_random_move(schedule, compatible_judges, compatible_rooms,   tabu_list, current_score, best_score)
-                
-            delta = calculate_delta_score(schedule, move)
+            step_start, evaluations_start = time.perf_counter(), get_delta_evaluation_count()
+            if candidate_moves_per_step > 1:
+                # best-of-N: score several candidates against the same schedule in one batch and go on with the best one
+                candidates, candidate_evaluations = [], [] # evaluations: the aspiration checks while generating + the batch score
+                for _ in range(candidate_moves_per_step):
+                    generation_start = get_delta_evaluation_count()
+                    candidates.append(generate_move())
+                    candidate_evaluations.append(get_delta_evaluation_count() - generation_start + 1)
+                deltas = calculate_delta_scores(schedule, [candidate_move for _, candidate_move in candidates], context)
+                delta, (operator, move), step_evaluations = min(zip(deltas, candidates, candidate_evaluations), key=lambda candidate: candidate[0])
+                moves_explored_this_iteration += len(candidates) - 1
+                # the batch time is shared evenly, the candidates that were not picked count as rejected
+                step_seconds = (time.perf_counter() - step_start) / len(candidates)
+                for (candidate_operator, candidate_move), evaluations in zip(candidates, candidate_evaluations):
+                    if candidate_move is not move:
+                        operator_selector.record(candidate_operator, step_seconds, evaluations)
+                step_start = time.perf_counter() - step_seconds # the picked move is charged its share plus applying it
+            else:
+                operator, move = generate_move()
+                delta = calculate_delta_score(schedule, move, context=context)
+                step_evaluations = get_delta_evaluation_count() - evaluations_start
                 
             moves_explored_this_iteration += 1
             if move is None:
@@ -230,10 +287,13 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
             do_move(move, schedule) 
             
             if delta < 0 or random.random() < math.exp(-delta / current_temperature): # accept move
+                operator_selector.record(operator, time.perf_counter() - step_start, step_evaluations, accepted=True, improvement=-delta)
                 moves_accepted_this_iteration += 1
                 current_score += delta
                 best_score_this_iteration = min(best_score_this_iteration, current_score) # just for printing. remove for performance
                 _add_move_to_tabu_list(move, tabu_list)
+                if meeting_sampler:
+                    meeting_sampler.update_after_move(schedule, move)
                 
                 if current_score < best_score:
                     best_score = current_score
@@ -244,6 +304,7 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
                     
             else: # reject move
                 undo_move(move, schedule)
+                operator_selector.record(operator, time.perf_counter() - step_start, step_evaluations)
         
         #Extract the bset_score violations based on score:
         best_hard, best_medium, best_soft = extract_violations_from_score(best_score, schedule, hard_weight, medium_weight, soft_weight)
@@ -254,6 +315,8 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
 
         current_iteration += 1
         current_temperature *= cooling_rate
+        if adaptive_operator_selection:
+            operator_selector.update_weights()
         
         if not best_score_improved_this_iteration:
             plateau_count += 1
@@ -272,32 +335,46 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
               f"Accepted: {moves_accepted_this_iteration}/{moves_explored_this_iteration}, Score: {current_score}, Best: {best_score}, "
               f"(Hard: {hard_violations}, Medium: {medium_violations}, Soft: {soft_violations}), "
               f"{' - Plateau detected!' if plateau_count >= 3 else ''}")
+        if adaptive_operator_selection:
+            log_output("Operator weights: " + ", ".join(f"{operator}: {weight:.2f}" for operator, weight in operator_selector.weights.items()))
 
         if time_used >= max_time_seconds:
             log_output(f"Initial score {initial_score}")
             log_output(f"Final score [{current_score}, {hard_violations}, {medium_violations}, {soft_violations}]")
-            log_output(f"Days: {schedule.work_days}, Total meetings: {len(schedule.get_all_planned_meetings())}")
+            log_output(f"Days: {schedule.work_days}, Total meetings: {len(schedule.planned_meetings)}")
 
         
         if plateau_count >= current_plateau_limit:
+            operator_start, evaluations_start = time.perf_counter(), get_delta_evaluation_count()
+            # The restored schedule shares the meeting objects with schedule, and restoring rewrites their judge and room.
+            # So the search continues on the restored schedule, or on a restored copy of schedule if R&R fails
+            current_snapshot = ScheduleSnapshot(schedule)
             temp_schedule= best_schedule_snapshot.restore_schedule(schedule)
-            r_r_success, num_inserted = apply_ruin_and_recreate(temp_schedule, compatible_judges, compatible_rooms, current_ruin_percentage, in_parallel=True)
+            r_r_success, num_inserted = apply_ruin_and_recreate(temp_schedule, compatible_judges, compatible_rooms, current_ruin_percentage, in_parallel=True, context=context)
             plateau_count = 0
             if r_r_success:
                 log_output(f"Ruin and Recreate successful! {num_inserted} meetings inserted.\n \n")
-                current_score = calculate_full_score(temp_schedule)[0]
+                schedule = temp_schedule
+                current_score = calculate_full_score(schedule, running_totals=True, verify=verify_running_totals, context=context)[0]
+                operator_selector.record("ruin_and_recreate", time.perf_counter() - operator_start, get_delta_evaluation_count() - evaluations_start,
+                                         accepted=True, improvement=best_score - current_score)
                 tabu_list.clear()
 
                 if current_score < best_score:
                     best_score = current_score
                     best_schedule_snapshot = ScheduleSnapshot(schedule)
                     log_output(f"New best score found after R&R: {best_score}")
+            else:
+                schedule = current_snapshot.restore_schedule(schedule)
+                operator_selector.record("ruin_and_recreate", time.perf_counter() - operator_start, get_delta_evaluation_count() - evaluations_start)
+            if meeting_sampler:
+                meeting_sampler.rebuild(schedule)
         
         if time_used >= max_time_seconds:
             pre_contract_score = current_score
             temp_schedule = best_schedule_snapshot.restore_schedule(schedule)
-            contracting_move = generate_contracting_move(temp_schedule, debug=False)
-            post_contract_score = calculate_full_score(temp_schedule)[0]
+            contracting_move = generate_contracting_move(temp_schedule, debug=False, context=context)
+            post_contract_score = calculate_full_score(temp_schedule, running_totals=True, verify=verify_running_totals, context=context)[0]
             
             # Always accept contracting move if it improves the score
             if post_contract_score < pre_contract_score:
@@ -306,32 +383,36 @@ def simulated_annealing(schedule: Schedule, iterations_per_temperature: int, max
                           f"(Δ: {post_contract_score - pre_contract_score}, "
                           f"moves: {len(contracting_move.individual_moves)}, "
                           f"skipped: {len(contracting_move.skipped_meetings)})")
-                best_schedule_snapshot = temp_schedule
+                best_schedule_snapshot = ScheduleSnapshot(temp_schedule)
                 
                 # Update best score if this is a new best
                 if current_score < best_score:
                     best_score = current_score
-                    best_schedule_snapshot = temp_schedule
                     best_score_improved_this_iteration = True
                     log_output(f"New best score found from contracting: {best_score}")
-                    return temp_schedule.restore_schedule(schedule)
+                    log_output("Operator stats:\n" + operator_selector.format_stats())
+                    _report_profile(log_output, profile_output_path)
+                    return temp_schedule
                     
             else:
                 # Contracting move didn't improve - undo it
                 from src.local_search.move import undo_contracting_move
-                undo_contracting_move(contracting_move, schedule)
+                undo_contracting_move(contracting_move, temp_schedule)
                 log_output(f"Contracting move rejected: no improvement "
                           f"(moves: {len(contracting_move.individual_moves)}, "
                           f"skipped: {len(contracting_move.skipped_meetings)})")
         
                 
+    log_output("Operator stats:\n" + operator_selector.format_stats())
+    _report_profile(log_output, profile_output_path)
+    
     # Close log file if it was opened
     if log_file:
         log_file.close()
                     
     return best_schedule_snapshot.restore_schedule(schedule)
 
-def run_local_search(schedule: Schedule, log_file_path: str = None, K: int = 75) -> Schedule:
+def run_local_search(schedule: Schedule, log_file_path: str = None, K: int = 75, profile_output_path: str = None) -> Schedule:
     iterations_per_temperature = 4000
     max_time_seconds = 60
     start_temp = 500
@@ -344,7 +425,8 @@ def run_local_search(schedule: Schedule, log_file_path: str = None, K: int = 75)
         start_temp=start_temp, 
         end_temp=end_temp,
         K=K,
-        log_file_path=log_file_path
+        log_file_path=log_file_path,
+        profile_output_path=profile_output_path
     )
-    s
+    
     return optimized_schedule
\ No newline at end of file
@@ -0,0 +1,43 @@
+from collections import deque
+from typing import Hashable, Iterator
+
+
+class TabuList:
+    """
+    Fixed-tenure tabu list with O(1) membership, a drop-in replacement for deque(maxlen=tenure) in the local search.
+
+    The entries are kept in insertion order in a FIFO queue, for expiry, and counted in a dict, for membership.
+    An entry added several times stays tabu until its last occurrence has expired, as with the deque.
+    """
+
+    def __init__(self, tenure: int):
+        self.tenure: int = tenure
+        self._queue: deque = deque()
+        self._counts: dict[Hashable, int] = {} # entry -> number of occurrences in _queue
+
+    def append(self, entry: Hashable) -> None:
+        """Add an entry, expiring the oldest one when the list is full."""
+        if self.tenure <= 0:
+            return
+        if len(self._queue) == self.tenure:
+            expired = self._queue.popleft()
+            count = self._counts[expired] - 1
+            if count:
+                self._counts[expired] = count
+            else:
+                del self._counts[expired]
+        self._queue.append(entry)
+        self._counts[entry] = self._counts.get(entry, 0) + 1
+
+    def clear(self) -> None:
+        self._queue.clear()
+        self._counts.clear()
+
+    def __contains__(self, entry: Hashable) -> bool:
+        return entry in self._counts
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._queue)
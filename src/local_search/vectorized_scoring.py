@@ -0,0 +1,156 @@
+import numpy as np
+
+from src.base_model.schedule import Schedule
+from src.base_model.compatibility_checks import check_case_judge_compatibility, check_case_room_compatibility
+from src.local_search import rules_engine
+from src.local_search.scoring_context import ScoringContext
+from src.local_search.rules_engine import _initialize_constraint_weights, _score_from_rule_violations, get_enabled_rules, nr19_case_has_specific_judge_full, nr21_all_meetings_planned_for_case_full
+
+
+def calculate_full_score_vectorized(schedule: Schedule, context: ScoringContext = None) -> list[int]:
+    """
+    Same result as calculate_full_score, but the rules that loop over every day, timeslot and judge (nr1, nr2, nr18, nr29, nr31)
+    are computed with array reductions over dense [day, timeslot, room] and [day, timeslot, judge] occupancy arrays.
+    Meant for large schedules, where the pure python full score takes seconds.
+
+    Returns:
+        [full_score, hard_violations, medium_violations, soft_violations]
+    """
+    if context is None and rules_engine.hard_constraint_weight is None:
+        _initialize_constraint_weights(schedule)
+    return _score_from_rule_violations(calculate_rule_violations_vectorized(schedule, context), context)
+
+def calculate_rule_violations_vectorized(schedule: Schedule, context: ScoringContext = None) -> dict[str, int]:
+    """Violations per enabled rule, same keys and values as calculate_rule_violations_full."""
+    check_room = context.check_case_room_compatibility if context is not None else check_case_room_compatibility
+    check_judge = context.check_case_judge_compatibility if context is not None else check_case_judge_compatibility
+
+    n_days = schedule.work_days
+    n_timeslots = schedule.timeslots_per_work_day
+
+    # One row per appointment (same appointments as schedule.iter_appointments()): day, timeslot, judge_id, room_id, case_id
+    appointments = [(app.day, app.timeslot_in_day, app.judge.judge_id, app.room.room_id, app.meeting.case.case_id) for app in schedule.iter_appointments()]
+    days = np.array([appointment[0] for appointment in appointments], dtype=np.int64) - 1
+    timeslots = np.array([appointment[1] for appointment in appointments], dtype=np.int64) - 1
+
+    # Compact indices, so the arrays are dense regardless of how the ids are numbered, or whether they are numbers at all.
+    # All judges are included, also the idle ones (nr18)
+    judge_index = _compact_indices([judge.judge_id for judge in schedule.get_all_judges()], [appointment[2] for appointment in appointments])
+    room_index = _compact_indices([room.room_id for room in schedule.get_all_rooms()], [appointment[3] for appointment in appointments])
+    case_index = _compact_indices([], [appointment[4] for appointment in appointments])
+    judges = np.array([judge_index[appointment[2]] for appointment in appointments], dtype=np.int64)
+    rooms = np.array([room_index[appointment[3]] for appointment in appointments], dtype=np.int64)
+    cases = np.array([case_index[appointment[4]] for appointment in appointments], dtype=np.int64)
+
+    room_occupancy = _occupancy_array(days, timeslots, rooms, n_days, n_timeslots, len(room_index))
+    judge_occupancy = _occupancy_array(days, timeslots, judges, n_days, n_timeslots, len(judge_index))
+    judge_used = judge_occupancy > 0
+
+    vectorized = {
+        "nr1": int(np.count_nonzero(room_occupancy > 1)),
+        "nr2": int(np.count_nonzero(judge_occupancy > 1)),
+        "nr6": _count_incompatible(cases, rooms, list(case_index), list(room_index), check_room),
+        "nr8": _count_incompatible(cases, judges, list(case_index), list(judge_index), check_judge),
+        "nr14": _count_incompatible(cases, judges, list(case_index), list(judge_index), check_judge),
+        "nr18": _unused_timegrains(schedule, judge_used, judge_index),
+        "nr19": nr19_case_has_specific_judge_full(schedule),
+        "nr21": nr21_all_meetings_planned_for_case_full(schedule),
+        "nr29": _room_changes(days, timeslots, judges, rooms, len(judge_index), len(room_index), n_timeslots),
+        "nr31": _gaps_between_appointments(judge_used),
+    }
+    # Follow the rule registry: leave out disabled rules, and score enabled rules without a vectorized version the normal way
+    return {rule.name: vectorized[rule.name] if rule.name in vectorized else rule.score_full(schedule, context) for rule in get_enabled_rules()}
+
+def _compact_indices(known_ids: list, used_ids: list) -> dict:
+    """
+    id -> 0, 1, 2, ... for the distinct ids of the schedule's entities, then any id only seen on an appointment.
+    The ids only need to be hashable (some inputs use strings), the dict keeps them in index order.
+    """
+    index = {}
+    for entity_id in known_ids:
+        index.setdefault(entity_id, len(index))
+    for entity_id in used_ids:
+        index.setdefault(entity_id, len(index))
+    return index
+
+def _occupancy_array(days: np.ndarray, timeslots: np.ndarray, resources: np.ndarray, n_days: int, n_timeslots: int, n_resources: int) -> np.ndarray:
+    """[day, timeslot, resource] -> number of appointments using the resource (0-indexed days and timeslots)."""
+    size = n_days * n_timeslots * n_resources
+    if size == 0:
+        return np.zeros((n_days, n_timeslots, n_resources), dtype=np.int64)
+    flat_index = (days * n_timeslots + timeslots) * n_resources + resources
+    return np.bincount(flat_index, minlength=size).reshape(n_days, n_timeslots, n_resources)
+
+def _count_incompatible(cases: np.ndarray, resources: np.ndarray, case_ids: list, resource_ids: list, check_compatibility) -> int:
+    """
+    Number of appointments whose (case, resource) pair is incompatible. cases and resources are compact indices into
+    case_ids and resource_ids. Each distinct pair is only looked up once.
+    """
+    if len(cases) == 0:
+        return 0
+    n_resources = len(resource_ids)
+    pair_keys, counts = np.unique(cases * n_resources + resources, return_counts=True)
+    incompatible = 0
+    for pair_key, count in zip(pair_keys.tolist(), counts.tolist()):
+        case, resource = divmod(pair_key, n_resources)
+        if not check_compatibility(case_ids[case], resource_ids[resource]):
+            incompatible += count
+    return incompatible
+
+def _unused_timegrains(schedule: Schedule, judge_used: np.ndarray, judge_index: dict) -> int:
+    """nr18: unused timeslots per (day, judge). On the last day only judges with appointments count."""
+    n_days, n_timeslots, n_judges = judge_used.shape
+    if n_days == 0:
+        return 0
+
+    used_per_day_and_judge = judge_used.sum(axis=1) # [day, judge]
+    total = (n_days - 1) * n_timeslots * n_judges - int(used_per_day_and_judge[:-1].sum())
+
+    # Judges on the last day, including appointments outside the regular timeslots like nr18_unused_timegrain_full
+    on_last_day = judge_used[-1].any(axis=0)
+    last_day = schedule.appointments_by_day_and_timeslot.get(n_days, {})
+    for timeslot, appointments in last_day.items():
+        if not 1 <= timeslot <= n_timeslots:
+            for app in appointments:
+                on_last_day[judge_index[app.judge.judge_id]] = True
+
+    total += int(np.sum(n_timeslots - used_per_day_and_judge[-1][on_last_day]))
+    return total
+
+def _gaps_between_appointments(judge_used: np.ndarray) -> int:
+    """
+    nr31: every run of occupied timeslots for a (day, judge) starts a gap, except a run starting in the first timeslot.
+    So the number of gaps is the number of runs minus the (day, judge) pairs that are busy in timeslot 1.
+    """
+    if judge_used.shape[0] == 0:
+        return 0
+    return int(np.count_nonzero(judge_used[:, 1:, :] & ~judge_used[:, :-1, :]))
+
+def _room_changes(days: np.ndarray, timeslots: np.ndarray, judges: np.ndarray, rooms: np.ndarray, n_judges: int, n_rooms: int, n_timeslots: int) -> int:
+    """
+    nr29: number of times the set of rooms a judge sits in changes between consecutive occupied timeslots on a day.
+    """
+    if len(days) == 0:
+        return 0
+
+    # Distinct (day, judge, timeslot, room) combinations, sorted in that order
+    keys = np.unique(((days * n_judges + judges) * n_timeslots + timeslots) * n_rooms + rooms)
+    slot_keys = keys // n_rooms # (day, judge, timeslot)
+    room_of_key = keys % n_rooms
+
+    # Group the keys per (day, judge, timeslot). The rooms within a group are sorted, so two groups hold the same set
+    # of rooms exactly when they have the same size and the same room at every offset
+    is_group_start = np.r_[True, slot_keys[1:] != slot_keys[:-1]]
+    group_starts = np.flatnonzero(is_group_start)
+    group_of_key = np.cumsum(is_group_start) - 1
+    group_sizes = np.diff(np.r_[group_starts, len(keys)])
+    group_day_judge = slot_keys[group_starts] // n_timeslots
+
+    same_size_as_previous = np.r_[False, group_sizes[1:] == group_sizes[:-1]]
+    offset_in_group = np.arange(len(keys)) - group_starts[group_of_key]
+    previous_group_key = group_starts[np.maximum(group_of_key - 1, 0)] + offset_in_group
+    differs_from_previous = same_size_as_previous[group_of_key] & (room_of_key != room_of_key[np.minimum(previous_group_key, len(keys) - 1)])
+    same_rooms_as_previous = same_size_as_previous & (np.bincount(group_of_key, weights=differs_from_previous, minlength=len(group_starts)) == 0)
+
+    same_day_judge = group_day_judge[1:] == group_day_judge[:-1]
+    return int(np.count_nonzero(same_day_judge & ~same_rooms_as_previous[1:]))
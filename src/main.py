@@ -6,9 +6,10 @@ import sys
 from src.util.parser import parse_input
 from src.base_model.schedule import Schedule, generate_schedule_using_double_flow
 from src.util.schedule_visualizer import visualize
-from src.local_search.rules_engine import calculate_full_score
+from src.local_search.rules_engine import calculate_full_score, load_rule_config, enable_profiling
+from src.local_search.profiling import profiler
 from src.local_search.simulated_annealing import run_local_search
-from src.base_model.compatibility_checks import initialize_compatibility_matricies, case_room_matrix
+from src.base_model.compatibility_checks import initialize_compatibility_matricies, case_index
 from src.construction.heuristic.linear_assignment import generate_schedule
 import random
 
@@ -39,6 +40,15 @@ def parse_arguments():
 
     parser.add_argument('--K', type=int, default=100)
     
+    parser.add_argument('--rule-config', type=str,
+                        help='Path to JSON file enabling/disabling scoring rules, e.g. {"nr20": true}')
+    
+    parser.add_argument('--profile', action='store_true',
+                        help='Record call counts and time per scoring rule and print them at the end')
+    
+    parser.add_argument('--profile-output', type=str,
+                        help='Path to JSON file for the rule profile (implies --profile)')
+    
     return parser.parse_args()
 
 def main():
@@ -46,6 +56,11 @@ def main():
     args = parse_arguments()
     
     try:
+        if args.rule_config:
+            load_rule_config(args.rule_config)
+        if args.profile or args.profile_output:
+            enable_profiling()
+        
         # Handle input data (use input file or generate test data)
         if args.input:
             input_path = Path(args.input)
@@ -71,11 +86,11 @@ def main():
         
         # --- Start: Concise Check ---
         all_case_ids = {case.case_id for case in parsed_data["cases"]}
-        if not all_case_ids.issubset(case_room_matrix.keys()):
-             missing_ids = all_case_ids - case_room_matrix.keys()
-             raise ValueError(f"Error: Case IDs missing from case_room_matrix: {missing_ids}")
+        if not all_case_ids.issubset(case_index.keys()):
+             missing_ids = all_case_ids - case_index.keys()
+             raise ValueError(f"Error: Case IDs missing from the compatibility matrices: {missing_ids}")
         else:
-            print("All case IDs are present in case_room_matrix.")
+            print("All case IDs are present in the compatibility matrices.")
         # --- End: Concise Check ---
 
         
@@ -136,7 +151,7 @@ def main():
             soft_violations = result[3]
             print(f"Hard violations: {hard_violations}, Medium violations: {medm_violations}, Soft violations: {soft_violations}")
             
-            final_schedule = run_local_search(initial_schedule, args.log)
+            final_schedule = run_local_search(initial_schedule, args.log, profile_output_path=args.profile_output)
             visualize(final_schedule)
             
             print(f"days: {final_schedule.work_days}")
@@ -150,6 +165,14 @@ def main():
         with open(output_path, 'w') as f:
            json.dump(final_schedule.to_json(), f, indent=2)
         print(f"Schedule written to {args.output}")
+        
+        # With local search, simulated annealing already reports the profile at the end of its run
+        if profiler.enabled and args.method in ('ilp', 'graph'):
+            print("Rule profile:")
+            print(profiler.format_table())
+            if args.profile_output:
+                profiler.dump_json(args.profile_output)
+                print(f"Rule profile written to {args.profile_output}")
 
         return 0
         
@@ -398,6 +398,8 @@ def generate_test_data_parsed(n_cases: int,
                 if requirement not in case.characteristics:
                     if requirement == Attribute.SHORTDURATION:
                         case.characteristics.add(requirement)
+            suitable_judge.refresh_masks() # the attribute sets were changed in place
+            case.refresh_masks()
         
         # Create meetings for this case
         for meeting_data in case_data["meetings"]:
@@ -496,6 +498,7 @@ def generate_test_data_parsed(n_cases: int,
             if not attribute_found:
                 for room_candidate in parsed_data["rooms"]:
                     room_candidate.characteristics.add(attribute_to_check)
+                    room_candidate.refresh_masks()
                     break
 
     # Set case reference in meetings
@@ -0,0 +1,81 @@
+import unittest
+import random
+
+from src.util.data_generator import generate_test_data_parsed
+from src.base_model.compatibility_checks import initialize_compatibility_matricies
+from src.base_model.interval_schedule import IntervalSchedule
+from src.construction.heuristic.linear_assignment import generate_schedule
+
+
+class TestIntervalSchedule(unittest.TestCase):
+
+    def setUp(self):
+        parsed_data = generate_test_data_parsed(n_cases=50, work_days=2, granularity=5, min_per_work_day=390)
+        initialize_compatibility_matricies(parsed_data)
+
+        self.schedule = generate_schedule(parsed_data)
+        self.schedule.initialize_appointment_chains()
+        self.schedule.move_all_dayboundary_violations()
+        self.schedule.initialize_appointment_chains()
+        self.schedule.trim_schedule_length_if_possible()
+        self.interval_schedule = IntervalSchedule.from_schedule(self.schedule)
+
+    def _appointment_keys(self, appointments) -> set:
+        return {(app.meeting.meeting_id, app.judge.judge_id, app.room.room_id, app.day, app.timeslot_in_day) for app in appointments}
+
+    def test_round_trip_keeps_appointments(self):
+        """Tests that converting to intervals and materializing again gives the same appointments, with one record per meeting."""
+        self.assertEqual(len(self.interval_schedule.planned_meetings), len(self.schedule.appointment_chains))
+        self.assertEqual(self._appointment_keys(self.interval_schedule.get_all_appointments()),
+                         self._appointment_keys(self.schedule.get_all_appointments()))
+
+        # Same json, up to the order of the appointments within a timeslot
+        interval_json, schedule_json = self.interval_schedule.to_json(), self.schedule.to_json()
+        by_slot = lambda appointment: (appointment["day"], appointment["timeslot_in_day"], appointment["meeting"]["id"])
+        self.assertEqual(sorted(interval_json.pop("appointments"), key=by_slot), sorted(schedule_json.pop("appointments"), key=by_slot))
+        self.assertEqual(interval_json, schedule_json)
+
+    def test_overlap_queries_match_materialized_slots(self):
+        """Tests the timeline overlap queries against a brute force check on the per-timeslot view, also after moves and undos."""
+        judges = self.schedule.get_all_judges()
+        rooms = self.schedule.get_all_rooms()
+        T = self.interval_schedule.timeslots_per_work_day
+        rng = random.Random(0)
+
+        for _ in range(30):
+            meeting_id = rng.choice(list(self.interval_schedule.planned_meetings))
+            previous = self.interval_schedule.move_meeting(meeting_id, judge=rng.choice(judges), room=rng.choice(rooms),
+                                                           day=rng.randint(1, self.interval_schedule.work_days), start_timeslot=rng.randint(1, T))
+            if rng.random() < 0.3:
+                self.interval_schedule.restore_meeting(previous)
+
+            day = rng.randint(1, self.interval_schedule.work_days)
+            start = rng.randint(1, T)
+            length = rng.randint(1, 30)
+            view = self.interval_schedule.appointments_by_day_and_timeslot
+            for judge in judges:
+                expected = set()
+                for timeslot in range(start, start + length):
+                    slot_day, slot = day + (timeslot - 1) // T, (timeslot - 1) % T + 1
+                    expected |= {app.meeting.meeting_id for app in view.get(slot_day, {}).get(slot, []) if app.judge.judge_id == judge.judge_id}
+                found = self.interval_schedule.overlapping_meetings(self.interval_schedule.judge_timelines, judge.judge_id, day, start, length)
+                self.assertEqual(set(found), expected)
+                self.assertEqual(self.interval_schedule.is_judge_available(judge.judge_id, day, start, length), not expected)
+
+
+    def test_changes_leave_the_source_schedule_alone(self):
+        """Tests that moving and unplanning meetings in the interval schedule does not change the meetings of the source schedule."""
+        rng = random.Random(1)
+        judges = self.schedule.get_all_judges()
+        meeting_ids = list(self.interval_schedule.planned_meetings)
+        self.interval_schedule.unplan_meeting(meeting_ids[0])
+        for meeting_id in rng.sample(meeting_ids[1:], 10):
+            self.interval_schedule.move_meeting(meeting_id, judge=rng.choice(judges))
+
+        for app in self.schedule.iter_appointments():
+            self.assertIs(app.meeting.judge, app.judge)
+            self.assertIs(app.meeting.room, app.room)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 import unittest
+import random
 
 from src.base_model.case import Case
 from src.base_model.judge import Judge
 from src.base_model.attribute_enum import Attribute
 from src.base_model.meeting import Meeting
+from src.base_model.meeting_pool import MeetingPool
 from src.base_model.capacity_calculator import calculate_all_judge_capacities
+from src.base_model.compatibility_checks import case_judge_compatible, is_compatible
 
 class TestJudgeCapacity(unittest.TestCase):
     def test_case_distribution_with_mixed_skills(self):
@@ -159,8 +162,68 @@ class TestJudgeCapacity(unittest.TestCase):
         self.assertEqual(capacities[4], 3,
                         f"Judge 4 should get 3 cases but got {capacities[4]}")    
         self.assertEqual(capacities[5], 3,
-                        f"Judge 5 should get 3 cases but got {capacities[5]}")  
-            
+                        f"Judge 5 should get 3 cases but got {capacities[5]}")
+
+
+class TestAttributeMasks(unittest.TestCase):
+    def test_masks_follow_attribute_sets(self):
+        """
+        Test that the attribute bit masks are computed on construction, follow reassignment of the sets,
+        and that the mask based compatibility checks agree with the set based subset checks.
+        """
+        case = Case(case_id=1, characteristics={Attribute.CIVIL, Attribute.VIRTUAL}, judge_requirements={Attribute.CIVIL, Attribute.VIRTUAL})
+        judge = Judge(judge_id=1, characteristics={Attribute.CIVIL})
+        self.assertEqual(case.characteristics_mask, Attribute.to_mask({Attribute.CIVIL, Attribute.VIRTUAL}))
+        self.assertFalse(case_judge_compatible(case, judge))
+
+        judge.characteristics = {Attribute.CIVIL, Attribute.VIRTUAL}
+        self.assertTrue(case_judge_compatible(case, judge))
+
+        judge.case_requirements.add(Attribute.SHORTDURATION) # in place, so the mask is only updated by refresh_masks
+        judge.refresh_masks()
+        self.assertFalse(case_judge_compatible(case, judge))
+
+        for case_attributes in ({Attribute.CIVIL}, {Attribute.CIVIL, Attribute.SHORTDURATION}, set()):
+            case.characteristics = case_attributes
+            self.assertEqual(case_judge_compatible(case, judge),
+                             is_compatible(case.judge_requirements, judge.characteristics) and is_compatible(judge.case_requirements, case.characteristics))
+
+
+class TestMeetingPool(unittest.TestCase):
+    def test_pool_matches_list(self):
+        """
+        Test that the meeting pool holds the same meetings as a plain list under random adds and pops,
+        and that lookups by id and membership agree with it.
+        """
+        case = Case(case_id=1, characteristics={Attribute.CIVIL})
+        meetings = [Meeting(meeting_id, 30, 0, None, None, case) for meeting_id in range(1, 21)]
+        pool = MeetingPool(meetings[:10])
+        expected = meetings[:10]
+
+        rng = random.Random(0)
+        for _ in range(200):
+            if len(expected) == len(meetings) or (expected and rng.random() < 0.5):
+                meeting = rng.choice(expected)
+                expected.remove(meeting)
+                self.assertIs(pool.pop(meeting.meeting_id), meeting)
+            else:
+                meeting = rng.choice([m for m in meetings if m not in expected])
+                expected.append(meeting)
+                pool.add(meeting)
+
+            self.assertEqual(len(pool), len(expected))
+            self.assertEqual({m.meeting_id for m in pool}, {m.meeting_id for m in expected})
+            for meeting in meetings:
+                self.assertEqual(meeting in pool, meeting in expected)
+                self.assertIs(pool.get(meeting.meeting_id), meeting if meeting in expected else None)
+            if pool:
+                self.assertIn(rng.choice(pool), expected)
+
+        with self.assertRaises(ValueError):
+            pool.add(pool[0])
+        with self.assertRaises(KeyError):
+            pool.pop(-1)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
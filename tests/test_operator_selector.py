@@ -0,0 +1,59 @@
+import unittest
+import random
+
+from src.local_search.operator_selector import AdaptiveOperatorSelector
+
+
+class TestAdaptiveOperatorSelector(unittest.TestCase):
+
+    def test_weights_follow_improvement_per_second(self):
+        """Tests that the weight moves to the operator with the higher improvement per second, never below min_weight."""
+        selector = AdaptiveOperatorSelector({"single": 0.8, "compound": 0.2}, reaction_factor=0.5, min_weight=0.05)
+        for _ in range(20):
+            for _ in range(10):
+                selector.record("single", 0.001, 1, accepted=True, improvement=1)
+                selector.record("compound", 0.002, 3, accepted=True, improvement=10)
+            selector.update_weights()
+
+        self.assertGreater(selector.weights["compound"], 0.8)
+        self.assertGreaterEqual(selector.weights["single"], 0.05 / (1 + 0.05))
+        self.assertAlmostEqual(sum(selector.weights.values()), 1.0)
+        self.assertEqual(selector.stats["compound"].uses, 200)
+        self.assertEqual(selector.stats["compound"].improvement, 2000)
+        self.assertEqual(selector.stats["compound"].evaluations, 600)
+        self.assertAlmostEqual(selector.stats["compound"].seconds_per_evaluation, 0.002 / 3)
+
+    def test_segments_without_improvement_or_uses_keep_weights(self):
+        """Tests that a segment without improvement changes nothing, and that an unused operator keeps its share of the others."""
+        selector = AdaptiveOperatorSelector({"insert": 0.1, "single": 0.45, "compound": 0.45})
+        selector.record("single", 0.001, 1, accepted=True, improvement=-5) # accepted but worse
+        selector.record("compound", 0.001, 2)
+        selector.update_weights()
+        self.assertEqual(selector.weights, {"insert": 0.1, "single": 0.45, "compound": 0.45})
+
+        selector.record("single", 0.001, 1, accepted=True, improvement=5)
+        selector.record("compound", 0.001, 2, accepted=True, improvement=5)
+        selector.update_weights()
+        self.assertAlmostEqual(selector.weights["insert"], 0.1)
+        self.assertAlmostEqual(selector.weights["single"], selector.weights["compound"])
+
+    def test_select_and_recorded_only_operators(self):
+        """Tests that select only returns allowed operators, and that recorded-only operators are in the stats but not selectable."""
+        state = random.getstate()
+        try:
+            random.seed(0)
+            selector = AdaptiveOperatorSelector({"insert": 0.1, "single": 0.7, "compound": 0.2})
+            self.assertTrue(all(selector.select(["single", "compound"]) != "insert" for _ in range(200)))
+            self.assertEqual({selector.select() for _ in range(500)}, {"insert", "single", "compound"})
+        finally:
+            random.setstate(state)
+
+        selector.record("ruin_and_recreate", 2.0, 500, accepted=True, improvement=100)
+        selector.update_weights()
+        self.assertNotIn("ruin_and_recreate", selector.weights)
+        self.assertEqual(selector.stats["ruin_and_recreate"].acceptance_rate, 1.0)
+        self.assertIn("ruin_and_recreate", selector.format_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
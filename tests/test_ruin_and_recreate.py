@@ -1,17 +1,22 @@
 import unittest
+import random
+import importlib
 from copy import deepcopy
+from unittest.mock import patch
 
 from src.base_model.schedule import Schedule, generate_schedule_using_double_flow
 from src.base_model.compatibility_checks import initialize_compatibility_matricies, calculate_compatible_judges, calculate_compatible_rooms
 from src.local_search.rules_engine import calculate_full_score
 from src.util.data_generator import generate_test_data_parsed
 from src.local_search.move import do_move
-from src.local_search.move_generator import generate_specific_delete_move, generate_specific_insert_move
+from src.local_search.move_generator import generate_specific_delete_move, generate_specific_insert_move, generate_random_insert_move
 from src.local_search.rules_engine import calculate_delta_score, calculate_full_score
 from src.util.schedule_visualizer import visualize
 from src.local_search.ruin_and_recreate import apply_ruin_and_recreate
 from src.construction.heuristic.linear_assignment import generate_schedule
 
+simulated_annealing_module = importlib.import_module("src.local_search.simulated_annealing") # the package exports the function under the same name
+
 
 class TestRuinAndRecreate(unittest.TestCase):
 
@@ -167,6 +172,35 @@ class TestRuinAndRecreate(unittest.TestCase):
 
         visualize(schedule_copy)
 
+    def test_random_insert_move_uses_given_compatibility(self):
+        """Test that insert moves drawn with the precomputed compatibility lists equal the ones computed per call, for the same random state."""
+        schedule_copy = deepcopy(self.schedule)
+        for meeting in schedule_copy.get_all_planned_meetings()[:5]:
+            do_move(generate_specific_delete_move(schedule_copy, meeting.meeting_id), schedule_copy)
+
+        for seed in range(20):
+            state = random.getstate() # the seeding must not leak into the tests that run after this one
+            try:
+                random.seed(seed)
+                with_lists = generate_random_insert_move(schedule_copy, self.compatible_judges, self.compatible_rooms)
+                random.seed(seed)
+                without_lists = generate_random_insert_move(schedule_copy)
+            finally:
+                random.setstate(state)
+            self.assertEqual((with_lists.meeting_id, with_lists.new_judge.judge_id, with_lists.new_room.room_id, with_lists.new_day, with_lists.new_start_timeslot),
+                             (without_lists.meeting_id, without_lists.new_judge.judge_id, without_lists.new_room.room_id, without_lists.new_day, without_lists.new_start_timeslot))
+            self.assertIn(with_lists.new_judge, self.compatible_judges[with_lists.meeting_id])
+            self.assertIn(with_lists.new_room, self.compatible_rooms[with_lists.meeting_id])
+
+    def test_running_totals_stay_valid_through_sa_ruin_and_recreate(self):
+        """Tests that SA with verify_running_totals survives R&R, which restores the best schedule onto the shared meeting objects."""
+        with patch.object(simulated_annealing_module, "apply_ruin_and_recreate", wraps=apply_ruin_and_recreate) as ruin_and_recreate:
+            # a plateau limit of 0 runs R&R after every temperature, and every full score check in the run verifies the running totals
+            result = simulated_annealing_module.simulated_annealing(deepcopy(self.schedule), iterations_per_temperature=50, max_time_seconds=5,
+                                                                    plateau_count_min=0, plateau_count_max=0, verify_running_totals=True)
+        self.assertGreater(ruin_and_recreate.call_count, 0)
+        self.assertEqual(calculate_full_score(result, running_totals=True, verify=True), calculate_full_score(result))
+
     # def test_ruin_and_recreate_process(self):
     #     """Tests the ruin and recreate process by comparing scores and printing schedules."""
     #     print("\n--- Testing Ruin and Recreate Process ---")
@@ -1,7 +1,10 @@
 import unittest
 import os
+import json
+import tempfile
 import time
 import itertools
+import pickle
 import multiprocessing
 from typing import Callable, List, Tuple, Optional
 from src.base_model.appointment import Appointment
@@ -13,10 +16,15 @@ from src.local_search.rules_engine import *
 import random
 
 from src.util.data_generator import generate_test_data_parsed
-from src.base_model.compatibility_checks import initialize_compatibility_matricies, calculate_compatible_judges, calculate_compatible_rooms
-from src.local_search.move_generator import generate_compound_move, generate_random_delete_move, generate_random_move_of_random_type
-from src.local_search.simulated_annealing import _calculate_moves_in_parallel
+from src.base_model import compatibility_checks
+from src.base_model.compatibility_checks import initialize_compatibility_matricies, calculate_compatible_judges, calculate_compatible_rooms, case_judge_compatible, case_room_compatible, judge_room_compatible, compatible_judge_indices
+from src.local_search.move_generator import generate_compound_move, generate_random_delete_move, generate_random_move_of_random_type, generate_single_random_move, check_if_move_is_tabu
+from src.local_search.tabu_list import TabuList
+from src.local_search.ScheduleSnapshot import ScheduleSnapshot
+from src.local_search.meeting_sampler import MeetingSampler, meeting_violation_weight
 from src.construction.heuristic.linear_assignment import generate_schedule
+from src.local_search.vectorized_scoring import calculate_full_score_vectorized, calculate_rule_violations_vectorized
+from src.local_search.profiling import profiler
 
 
 
@@ -87,7 +95,286 @@ class TestRulesEngine(unittest.TestCase):
             self.assertEqual(full_score_initial, full_score_after_do_undo, f"Iteration {i+1}: Full score not restored after undo ({full_score_initial} -> {full_score_after_do} -> {full_score_after_do_undo}). Move: {move}")
             self.assertEqual(schedule_initial, schedule_after_do_undo, f"Iteration {i+1}: Schedules differs after undo. Move: {move}")
          
-    def _check_delta_function_correctness(self, 
+    def test_staged_delta_matches_per_rule_delta(self):
+        """
+        Tests that the staged delta evaluation (one do/undo for all rules) gives the same score
+        as calling every rule's delta function on its own.
+        """
+        iterations = 100
+        calculate_full_score(self.schedule) # initializes the constraint weights
+
+        for i in range(iterations):
+            try:
+                move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+            except ValueError: # picked a meeting that has no appointment chain
+                continue
+            staged_delta = calculate_delta_score(self.schedule, move)
+            per_rule_delta = calculate_delta_score(self.schedule, move, staged=False)
+            self.assertEqual(staged_delta, per_rule_delta, f"Iteration {i}: Staged delta ({staged_delta}) != per rule delta ({per_rule_delta}). Move: {move}")
+
+            do_move(move, self.schedule)
+
+    def test_batch_delta_scores_match_single_deltas(self):
+        """
+        Tests that scoring a batch of candidate moves against the same schedule, with shared before-counts,
+        gives the same deltas as scoring every move on its own.
+        """
+        iterations = 10
+        calculate_full_score(self.schedule) # initializes the constraint weights
+
+        for i in range(iterations):
+            candidates = []
+            while len(candidates) < 20:
+                try:
+                    candidates.append(generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms))
+                except ValueError: # picked a meeting that has no appointment chain
+                    continue
+
+            single_deltas = [calculate_delta_score(self.schedule, move) for move in candidates]
+            batch_deltas = calculate_delta_scores(self.schedule, candidates)
+            self.assertEqual(single_deltas, batch_deltas, f"Iteration {i}: batch deltas differ from single deltas")
+
+            do_move(candidates[0], self.schedule)
+
+    def test_sampled_single_moves_respect_tabu(self):
+        """
+        Tests that the sampled single moves change exactly one thing to a different, compatible value and are never tabu
+        without aspiration, also when most alternatives are tabu.
+        """
+        tabu_list = TabuList(5000)
+        for meeting_id in self.schedule.appointment_chains:
+            for judge in self.judges[1:]:
+                tabu_list.append((meeting_id, 'judge', judge.judge_id))
+            for day in range(1, self.schedule.work_days + 1):
+                for timeslot in range(1, self.schedule.timeslots_per_work_day, 2):
+                    tabu_list.append((meeting_id, 'position', day, timeslot))
+
+        for _ in range(300):
+            try:
+                move = generate_single_random_move(self.schedule, self.compatible_judges, self.compatible_rooms, tabu_list)
+            except ValueError: # every alternative of the meeting is tabu
+                continue
+            self.assertFalse(check_if_move_is_tabu(move, tabu_list), f"Tabu move generated: {move}")
+            changes = [move.new_judge, move.new_room, move.new_day, move.new_start_timeslot]
+            self.assertEqual(sum(change is not None for change in changes), 1, f"Not a single move: {move}")
+            if move.new_judge is not None:
+                self.assertNotEqual(move.new_judge.judge_id, move.old_judge.judge_id)
+                self.assertIn(move.new_judge, self.compatible_judges[move.meeting_id])
+            if move.new_room is not None:
+                self.assertNotEqual(move.new_room.room_id, move.old_room.room_id)
+                self.assertIn(move.new_room, self.compatible_rooms[move.meeting_id])
+            if move.new_day is not None:
+                self.assertNotEqual(move.new_day, move.old_day)
+            if move.new_start_timeslot is not None:
+                self.assertNotEqual(move.new_start_timeslot, move.old_start_timeslot)
+
+    def test_meeting_sampler_weights_match_rebuild(self):
+        """
+        Tests that the violation weights updated incrementally after each kept move equal freshly computed ones,
+        and that guided sampling only picks planned meetings with violations.
+        """
+        sampler = MeetingSampler(self.schedule, guided_fraction=1.0)
+        for i in range(300):
+            try:
+                move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+            except ValueError:
+                continue
+            do_move(move, self.schedule)
+            if random.random() < 0.3:
+                undo_move(move, self.schedule)
+            else:
+                sampler.update_after_move(self.schedule, move)
+
+            expected = [meeting_violation_weight(self.schedule, meeting_id) for meeting_id in sampler.meeting_ids]
+            self.assertEqual(sampler.tree.weights, expected, f"Weights differ after move {i}: {move}")
+            self.assertEqual(sampler.tree.total, sum(expected))
+
+            meeting_id = sampler.sample_meeting_id(self.schedule)
+            self.assertIn(meeting_id, self.schedule.planned_meetings)
+            if sampler.tree.total:
+                self.assertGreater(meeting_violation_weight(self.schedule, meeting_id), 0)
+
+    def test_scoring_context_matches_global_scoring(self):
+        """
+        Tests that scoring with a ScoringContext gives the same full and delta scores as the module globals,
+        and that the context survives a pickle round trip (it is sent to the R&R process pool workers).
+        """
+        iterations = 50
+        calculate_full_score(self.schedule) # initializes the constraint weights
+        context = pickle.loads(pickle.dumps(build_scoring_context(self.schedule)))
+        self.assertEqual(context, build_scoring_context(self.schedule))
+
+        self.assertEqual(calculate_full_score(self.schedule, context=context), calculate_full_score(self.schedule))
+        self.assertEqual(calculate_full_score_vectorized(self.schedule, context), calculate_full_score(self.schedule))
+        for i in range(iterations):
+            try:
+                move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+            except ValueError: # picked a meeting that has no appointment chain
+                continue
+            context_delta = calculate_delta_score(self.schedule, move, context=context)
+            global_delta = calculate_delta_score(self.schedule, move)
+            self.assertEqual(context_delta, global_delta, f"Iteration {i}: context delta ({context_delta}) != global delta ({global_delta}). Move: {move}")
+            self.assertEqual(calculate_delta_score(self.schedule, move, staged=False, context=context), global_delta)
+
+            do_move(move, self.schedule)
+
+    def test_compatibility_matrices_match_attribute_checks(self):
+        """Tests that the dense compatibility matrices and the compatible judge/room lists agree with the attribute set checks."""
+        for case in self.cases:
+            for judge in self.judges:
+                self.assertEqual(check_case_judge_compatibility(case.case_id, judge.judge_id), case_judge_compatible(case, judge))
+            for room in self.rooms:
+                self.assertEqual(check_case_room_compatibility(case.case_id, room.room_id), case_room_compatible(case, room))
+            self.assertEqual(set(compatibility_checks.judge_ids[compatible_judge_indices(case.case_id)].tolist()),
+                             {judge.judge_id for judge in self.judges if case_judge_compatible(case, judge)})
+        for judge in self.judges:
+            for room in self.rooms:
+                self.assertEqual(check_judge_room_compatibility(judge.judge_id, room.room_id), judge_room_compatible(judge, room))
+
+        for meeting in self.meetings:
+            self.assertEqual(self.compatible_judges[meeting.meeting_id], [judge for judge in self.judges if case_judge_compatible(meeting.case, judge)])
+            self.assertEqual(self.compatible_rooms[meeting.meeting_id], [room for room in self.rooms if case_room_compatible(meeting.case, room)])
+
+        # Meetings of cases with the same requirement signature share one list
+        first_meeting_by_signature = {}
+        for meeting in self.meetings:
+            first = first_meeting_by_signature.setdefault(meeting.case.requirement_signature, meeting)
+            self.assertIs(self.compatible_judges[meeting.meeting_id], self.compatible_judges[first.meeting_id])
+        self.assertLess(len(first_meeting_by_signature), len(self.cases))
+
+    def test_occupancy_indexes_match_rebuild(self):
+        """
+        Tests that the occupancy counters updated by do_move/undo_move stay identical
+        to counters rebuilt from scratch.
+        """
+        iterations = 100
+
+        for i in range(iterations):
+            if random.random() < 0.1:
+                move: Move = generate_random_delete_move(self.schedule)
+            else:
+                try:
+                    move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+                except ValueError: # picked a meeting that has no appointment chain
+                    continue
+            do_move(move, self.schedule)
+            if random.random() < 0.3:
+                undo_move(move, self.schedule)
+
+            rebuilt = deepcopy(self.schedule)
+            rebuilt.initialize_indexes()
+            self.assertEqual(self.schedule.room_occupancy, rebuilt.room_occupancy, f"Iteration {i}: room counters out of sync. Move: {move}")
+            self.assertEqual(self.schedule.judge_occupancy, rebuilt.judge_occupancy, f"Iteration {i}: judge counters out of sync. Move: {move}")
+            self.assertEqual(self.schedule.overbooked_rooms_by_slot, rebuilt.overbooked_rooms_by_slot)
+            self.assertEqual(self.schedule.overbooked_judges_by_slot, rebuilt.overbooked_judges_by_slot)
+            self.assertEqual(self.schedule.room_overbookings, rebuilt.room_overbookings)
+            self.assertEqual(self.schedule.judge_overbookings, rebuilt.judge_overbookings)
+            self.assertEqual(self.schedule.judge_day_intervals, rebuilt.judge_day_intervals, f"Iteration {i}: judge intervals out of sync. Move: {move}")
+            self.assertEqual(self.schedule.judge_slot_rooms, rebuilt.judge_slot_rooms)
+            self.assertEqual(self.schedule.room_changes_by_judge_day, rebuilt.room_changes_by_judge_day, f"Iteration {i}: room changes out of sync. Move: {move}")
+            self.assertEqual(self.schedule.used_slots_by_judge_day, rebuilt.used_slots_by_judge_day)
+            self.assertEqual(self.schedule.used_slots_by_day, rebuilt.used_slots_by_day)
+            self.assertEqual(self.schedule.judge_appointments_by_day, rebuilt.judge_appointments_by_day)
+            self.assertEqual(self.schedule.appointments_per_day, rebuilt.appointments_per_day)
+            self.assertEqual(self.schedule.nonempty_days, rebuilt.nonempty_days, f"Iteration {i}: non-empty days out of sync. Move: {move}")
+            self.assertEqual(self.schedule.appointments_per_meeting, rebuilt.appointments_per_meeting)
+            self.assertEqual({m.meeting_id for m in self.schedule.planned_meetings}, {m.meeting_id for m in rebuilt.planned_meetings},
+                             f"Iteration {i}: planned meetings out of sync. Move: {move}")
+            self.assertEqual(self.schedule.meetings_by_judge_day, rebuilt.meetings_by_judge_day, f"Iteration {i}: judge meetings out of sync. Move: {move}")
+            self.assertEqual(self.schedule.meetings_by_room_day, rebuilt.meetings_by_room_day, f"Iteration {i}: room meetings out of sync. Move: {move}")
+            in_schedule = move.is_applied == move.is_insert_move if move.is_insert_move or move.is_delete_move else True
+            for app in move.appointments if in_schedule else []: # the moved appointments went through append_to_slot
+                slot = self.schedule.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day]
+                self.assertIs(slot[app.slot_index], app, f"Iteration {i}: appointment not at its slot index. Move: {move}")
+
+    def test_snapshot_restore_matches_indexes(self):
+        """Tests that a restored snapshot, which loads its appointments without indexing them one by one, has the same indexes."""
+        for _ in range(30):
+            try:
+                do_move(generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms), self.schedule)
+            except ValueError:
+                continue
+        restored = ScheduleSnapshot(self.schedule).restore_schedule(self.schedule)
+        for index in ("room_occupancy", "judge_occupancy", "judge_day_intervals", "judge_slot_rooms", "room_changes_by_judge_day",
+                      "used_slots_by_judge_day", "appointments_per_day", "nonempty_days", "appointments_per_meeting",
+                      "meetings_by_judge_day", "meetings_by_room_day"):
+            self.assertEqual(getattr(restored, index), getattr(self.schedule, index), f"{index} differs after restoring")
+        self.assertEqual(restored.room_overbookings, self.schedule.room_overbookings)
+        self.assertEqual(restored.judge_overbookings, self.schedule.judge_overbookings)
+        for app in restored.iter_appointments():
+            self.assertIs(restored.appointments_by_day_and_timeslot[app.day][app.timeslot_in_day][app.slot_index], app)
+
+    def test_running_totals_match_full_score(self):
+        """
+        Tests that the running rule totals, updated by accepted and undone moves,
+        give the same score as a full recomputation.
+        """
+        iterations = 100
+        calculate_full_score(self.schedule, running_totals=True)
+
+        for i in range(iterations):
+            if random.random() < 0.1:
+                move: Move = generate_random_delete_move(self.schedule)
+            else:
+                try:
+                    move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+                except ValueError: # picked a meeting that has no appointment chain
+                    continue
+            calculate_delta_score(self.schedule, move)
+            do_move(move, self.schedule)
+            if random.random() < 0.3: # rejected move
+                undo_move(move, self.schedule)
+
+            self.assertIsNotNone(self.schedule.rule_violations, f"Iteration {i}: running totals were dropped. Move: {move}")
+            running_score = calculate_full_score(self.schedule, running_totals=True, verify=True)
+            self.assertEqual(running_score, calculate_full_score(self.schedule), f"Iteration {i}: running totals out of sync. Move: {move}")
+
+    def test_vectorized_full_score_matches_full_score(self):
+        """
+        Tests that the numpy full score gives the same violations per rule as the python full score.
+        """
+        iterations = 50
+
+        for i in range(iterations):
+            self.assertEqual(calculate_rule_violations_vectorized(self.schedule), calculate_rule_violations_full(self.schedule), f"Iteration {i}")
+            self.assertEqual(calculate_full_score_vectorized(self.schedule), calculate_full_score(self.schedule), f"Iteration {i}")
+
+            if random.random() < 0.1:
+                move: Move = generate_random_delete_move(self.schedule)
+            else:
+                try:
+                    move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+                except ValueError: # picked a meeting that has no appointment chain
+                    continue
+            do_move(move, self.schedule)
+
+    def test_vectorized_full_score_with_string_ids(self):
+        """
+        Tests the numpy full score on a schedule with string judge, room and case ids, like some inputs have.
+        """
+        expected = calculate_rule_violations_full(self.schedule)
+        schedule = deepcopy(self.schedule)
+        for judge in schedule.get_all_judges():
+            judge.judge_id = f"J{judge.judge_id}"
+        for room in schedule.get_all_rooms():
+            room.room_id = f"R{room.room_id}"
+        for case in schedule.get_all_cases():
+            case.case_id = f"C{case.case_id}"
+        schedule.initialize_indexes() # the schedule indexes and compatibility lookups are keyed by id
+        initialize_compatibility_matricies(schedule=schedule)
+
+        self.assertEqual(calculate_rule_violations_full(schedule), expected)
+        self.assertEqual(calculate_rule_violations_vectorized(schedule), expected)
+
+    def test_unscored_move_invalidates_running_totals(self):
+        calculate_full_score(self.schedule, running_totals=True)
+        move: Move = generate_random_delete_move(self.schedule)
+        do_move(move, self.schedule) # not scored with calculate_delta_score
+
+        self.assertIsNone(self.schedule.rule_violations)
+        self.assertEqual(calculate_full_score(self.schedule, running_totals=True), calculate_full_score(self.schedule))
+
+    def _check_delta_function_correctness(self,
                                        delta_function: Callable, 
                                        full_function: Callable,
                                        schedule: Optional[Schedule] = None,
@@ -181,8 +468,81 @@ class TestRulesEngine(unittest.TestCase):
             nr31_distance_between_meetings_delta,
             nr31_distance_between_meetings_full
         )
-        
-        
+
+    def test_room_move_only_affects_room_rules(self):
+        meeting_id, appointments = next(iter(self.schedule.appointment_chains.items()))
+        first_app = appointments[0]
+        new_room = next(room for room in self.rooms if room.room_id != first_app.room.room_id)
+        move = Move(meeting_id, appointments, old_judge=first_app.judge, old_room=first_app.room, new_room=new_room,
+                    old_day=first_app.day, old_start_timeslot=first_app.timeslot_in_day)
+
+        affected = {rule.name for rule in get_rules_affected_by_move(move)}
+        self.assertEqual(affected, {"nr1", "nr6", "nr29"})
+
+        # the cached rule lists follow rules being turned off and on
+        try:
+            set_rule_enabled("nr29", False)
+            self.assertEqual({rule.name for rule in get_rules_affected_by_move(move)}, {"nr1", "nr6"})
+            self.assertNotIn("nr29", [rule.name for rule in get_enabled_rules("soft")])
+        finally:
+            set_rule_enabled("nr29", True)
+        self.assertEqual({rule.name for rule in get_rules_affected_by_move(move)}, affected)
+        self.assertIn("nr29", [rule.name for rule in get_enabled_rules("soft")])
+
+    def test_disabled_rule_is_not_scored(self):
+        calculate_full_score(self.schedule) # initializes the constraint weights
+        try:
+            set_rule_enabled("nr31", False)
+            self.assertNotIn("nr31", calculate_rule_violations_full(self.schedule))
+            expected_soft = sum(rule.full(self.schedule) for rule in get_enabled_rules("soft"))
+            self.assertEqual(calculate_full_score(self.schedule)[3], expected_soft)
+        finally:
+            set_rule_enabled("nr31", True)
+
+    def test_load_rule_config(self):
+        config_path = os.path.join(tempfile.mkdtemp(), "rules.json")
+        with open(config_path, "w") as f:
+            json.dump({"nr20": True, "nr29": False}, f)
+        try:
+            load_rule_config(config_path)
+            self.assertTrue(RULES["nr20"].enabled)
+            self.assertFalse(RULES["nr29"].enabled)
+        finally:
+            set_rule_enabled("nr20", False)
+            set_rule_enabled("nr29", True)
+
+        with open(config_path, "w") as f:
+            json.dump({"nr999": True}, f)
+        with self.assertRaises(ValueError):
+            load_rule_config(config_path)
+
+    def test_profiling_records_rule_calls(self):
+        """Tests that the profiler counts full and delta calls while enabled, and that disabling it restores the rule functions."""
+        original_full = RULES["nr1"].full
+        enable_profiling()
+        try:
+            calculate_full_score(self.schedule)
+            moves_scored = 0
+            while moves_scored < 10:
+                try:
+                    move: Move = generate_random_move_of_random_type(self.schedule, self.compatible_judges, self.compatible_rooms)
+                except ValueError: # picked a meeting that has no appointment chain
+                    continue
+                calculate_delta_score(self.schedule, move)
+                do_move(move, self.schedule)
+                moves_scored += 1
+            profile = profiler.to_dict()
+        finally:
+            disable_profiling()
+
+        self.assertEqual(profile["nr1_overbooked_room_in_timeslot_full"]["calls"], 1)
+        self.assertEqual(profile["calculate_delta_score"]["calls"], 10)
+        self.assertGreaterEqual(profile["do_move"]["calls"], 10) # the applied moves, plus the do/undo of the staged evaluations
+        self.assertEqual(profile["do_move"]["calls"] - profile["undo_move"]["calls"], 10)
+        self.assertIn("avg_abs_delta", profile["nr18_unused_timegrain_delta"])
+        self.assertIs(RULES["nr1"].full, original_full)
+
+
 
 
    # def test_calculate_delta_in_parallel(self):
@@ -0,0 +1,28 @@
+import unittest
+import random
+from collections import deque
+
+from src.local_search.tabu_list import TabuList
+
+
+class TestTabuList(unittest.TestCase):
+
+    def test_matches_bounded_deque(self):
+        """Tests that membership, length and order match deque(maxlen=tenure), including repeated entries and tenure 0."""
+        rng = random.Random(0)
+        for tenure in (0, 1, 5, 50):
+            tabu_list = TabuList(tenure)
+            expected = deque(maxlen=tenure)
+            for _ in range(500):
+                entry = (rng.randint(1, 10), rng.choice(['judge', 'room']), rng.randint(1, 5))
+                tabu_list.append(entry)
+                expected.append(entry)
+
+                self.assertEqual(len(tabu_list), len(expected))
+                self.assertEqual(list(tabu_list), list(expected))
+                probe = (rng.randint(1, 10), rng.choice(['judge', 'room']), rng.randint(1, 5))
+                self.assertEqual(probe in tabu_list, probe in expected, f"tenure {tenure}, entry {probe}")
+
+
+if __name__ == '__main__':
+    unittest.main()